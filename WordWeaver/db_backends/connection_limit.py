@@ -0,0 +1,116 @@
+import weakref
+from collections import defaultdict
+from threading import BoundedSemaphore, Lock
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import OperationalError, connections
+
+_semaphores = {}
+_semaphores_lock = Lock()
+
+_metrics = defaultdict(lambda: defaultdict(int))
+_metrics_lock = Lock()
+
+
+def count(alias, name):
+    with _metrics_lock:
+        _metrics[alias][name] += 1
+
+
+def get_connection_metrics():
+    """
+    per database alias counters of this worker. checkouts counts the
+    requests (or management commands) that used the alias, reuse_rate is
+    the share of them served by an already open connection
+    """
+    with _metrics_lock:
+        metrics = {alias: dict(counters) for alias, counters in _metrics.items()}
+    for counters in metrics.values():
+        checkouts = counters.get('checkouts', 0)
+        counters['reuse_rate'] = (
+            counters.get('reused', 0) / checkouts if checkouts else None
+        )
+    return metrics
+
+
+def reset_connection_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def get_connection_semaphore(alias):
+    limit = settings.DB_MAX_CONNECTIONS_PER_WORKER
+    if not limit:
+        return None
+    with _semaphores_lock:
+        if (alias, limit) not in _semaphores:
+            _semaphores[(alias, limit)] = BoundedSemaphore(limit)
+        return _semaphores[(alias, limit)]
+
+
+def start_checkouts(**kwargs):
+    for connection in connections.all(initialized_only=True):
+        if isinstance(connection, ConnectionLimitMixin):
+            connection.checked_out = False
+
+
+request_started.connect(start_checkouts)
+
+
+class ConnectionLimitMixin:
+    """
+    DatabaseWrapper mixin that caps the connections a worker process opens
+    per alias at DB_MAX_CONNECTIONS_PER_WORKER (0 disables the cap) and
+    counts how often a request finds its connection already open.
+    Connections are still one per thread as in Django, combined with
+    CONN_MAX_AGE the cap bounds workers * threads against max_connections
+    of the server. A thread that finds no free slot waits
+    DB_CONNECTION_WAIT_TIMEOUT seconds before giving up with
+    OperationalError
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection_slot = None
+        self.checked_out = False
+
+    def ensure_connection(self):
+        if not self.checked_out:
+            self.checked_out = True
+            count(self.alias, 'checkouts')
+            if self.connection is not None:
+                count(self.alias, 'reused')
+        super().ensure_connection()
+
+    def get_new_connection(self, conn_params):
+        semaphore = get_connection_semaphore(self.alias)
+        if semaphore is not None:
+            if not semaphore.acquire(timeout=settings.DB_CONNECTION_WAIT_TIMEOUT):
+                count(self.alias, 'wait_timeouts')
+                raise OperationalError(
+                    f'all {settings.DB_MAX_CONNECTIONS_PER_WORKER} connections '
+                    f'of this worker to {self.alias} are in use'
+                )
+            # the slot is also given back when the wrapper of a finished
+            # thread is garbage collected without being closed
+            self.connection_slot = weakref.finalize(self, semaphore.release)
+        try:
+            connection = super().get_new_connection(conn_params)
+        except Exception:
+            self.release_connection_slot()
+            raise
+        count(self.alias, 'opened')
+        return connection
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_connection_slot()
+            count(self.alias, 'closed')
+
+    def release_connection_slot(self):
+        if self.connection_slot is not None:
+            self.connection_slot()
+            self.connection_slot = None
@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from ..connection_limit import ConnectionLimitMixin
+
+
+class DatabaseWrapper(ConnectionLimitMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,156 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+_read_alias = ContextVar('read_alias', default=None)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+_active_requests = {}
+_active_requests_lock = Lock()
+
+
+def choose_replica():
+    """
+    the replica with the fewest requests of this process in flight, ties
+    are broken at random so idle replicas share the load
+    """
+    replicas = settings.REPLICA_DATABASES
+    if not replicas:
+        return None
+    with _active_requests_lock:
+        fewest = min(_active_requests.get(alias, 0) for alias in replicas)
+        alias = random.choice([
+            alias for alias in replicas
+            if _active_requests.get(alias, 0) == fewest
+        ])
+        _active_requests[alias] = _active_requests.get(alias, 0) + 1
+    return alias
+
+
+def release_replica(alias):
+    with _active_requests_lock:
+        _active_requests[alias] -= 1
+
+
+def get_active_requests(alias):
+    return _active_requests.get(alias, 0)
+
+
+def activate_replica():
+    """
+    route the reads of the current context to a replica until
+    deactivate_replica is called with the returned tokens
+    """
+    alias = choose_replica()
+    if alias is None:
+        return None
+    return (
+        alias,
+        _read_alias.set(alias),
+        _pinned_to_primary.set(False)
+    )
+
+
+def deactivate_replica(activation):
+    if activation is None:
+        return
+    alias, read_alias_token, pinned_token = activation
+    _read_alias.reset(read_alias_token)
+    _pinned_to_primary.reset(pinned_token)
+    release_replica(alias)
+
+
+@contextmanager
+def primary_reads():
+    """
+    reads inside the block go to the primary, for data that is cached
+    beyond the request and must not be taken from a lagging replica
+    """
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+class ReplicaRouter:
+    """
+    reads go to the replica activated for the current request (see
+    ReplicaReadMixin), everything else to the primary. The first write of
+    a request pins its remaining reads to the primary so that a request
+    always reads its own writes. Migrations run on the primary only, the
+    replicas receive the schema through replication
+    """
+
+    def db_for_read(self, model, **hints):
+        if _pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if _read_alias.get() is not None:
+            _pinned_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    serves the safe requests of the actions listed in replica_read_actions
+    from a replica. The replica is chosen once the request is authenticated
+    and its permissions are checked, a token or user created moments ago
+    may not have reached the replica yet, and it is released when the
+    response is finalized. retrieve is not a replica read, the cached
+    object data is validated against the row on the primary
+    (services/object_cache.py)
+    """
+    replica_read_actions = ['list']
+
+    def initialize_request(self, request, *args, **kwargs):
+        request = super().initialize_request(request, *args, **kwargs)
+        self.replica_activation = None
+        return request
+
+    def check_permissions(self, request):
+        # the last step of initial (and ainitial) that reads the database,
+        # throttling only uses the cache
+        super().check_permissions(request)
+        if (
+            self.replica_activation is None
+            and request.method in SAFE_METHODS
+            and getattr(self, 'action', None) in self.replica_read_actions
+        ):
+            self.replica_activation = activate_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        try:
+            return super().finalize_response(request, response, *args, **kwargs)
+        finally:
+            self.release_replica()
+
+    def handle_exception(self, exc):
+        # an unhandled exception skips finalize_response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self.release_replica()
+            raise
+
+    def release_replica(self):
+        deactivate_replica(getattr(self, 'replica_activation', None))
+        self.replica_activation = None
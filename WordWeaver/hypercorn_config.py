@@ -0,0 +1,28 @@
+"""
+Hypercorn configuration for serving WordWeaver over ASGI.
+
+    hypercorn --config python:WordWeaver.hypercorn_config WordWeaver.asgi:application
+
+HTTP/2 is negotiated through ALPN when HYPERCORN_CERTFILE and
+HYPERCORN_KEYFILE are set. Without TLS, Hypercorn still accepts HTTP/2 from
+clients that send the h2c prior knowledge preface or ask for an h2c upgrade,
+which is what a TLS terminating proxy in front of it uses.
+"""
+from decouple import config
+
+bind = [config('HYPERCORN_BIND', default='0.0.0.0:8000')]
+workers = config('HYPERCORN_WORKERS', default=2, cast=int)
+worker_class = 'asyncio'
+backlog = config('HYPERCORN_BACKLOG', default=2048, cast=int)
+keep_alive_timeout = config('HYPERCORN_KEEP_ALIVE_TIMEOUT', default=5, cast=int)
+graceful_timeout = config('HYPERCORN_GRACEFUL_TIMEOUT', default=10, cast=int)
+
+certfile = config('HYPERCORN_CERTFILE', default=None)
+keyfile = config('HYPERCORN_KEYFILE', default=None)
+alpn_protocols = ['h2', 'http/1.1']
+h2_max_concurrent_streams = config(
+    'HYPERCORN_H2_MAX_CONCURRENT_STREAMS', default=100, cast=int
+)
+
+accesslog = '-'
+errorlog = '-'
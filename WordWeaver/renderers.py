@@ -1,8 +1,21 @@
+import orjson
 from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from services.metrics import timed_render
 
 
 class CustomJSONRenderer(JSONRenderer):
+    @timed_render
     def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(
+            self.get_custom_data(data, renderer_context),
+            accepted_media_type,
+            renderer_context
+        )
+
+    @staticmethod
+    def get_custom_data(data, renderer_context):
         custom_data = {
             'message': None,
             'status': None,
@@ -16,8 +29,45 @@ class CustomJSONRenderer(JSONRenderer):
             custom_data['error'] = data['detail'] if 'detail' in data else data
         else:
             custom_data['data'] = data['detail'] if 'detail' in data else data
-        return super().render(
-            custom_data,
-            accepted_media_type,
-            renderer_context
-        )
+        return custom_data
+
+
+class FastCustomJSONRenderer(CustomJSONRenderer):
+    """
+    Renders the same {message, status, data, error} envelope as
+    CustomJSONRenderer with orjson. Values orjson does not handle natively
+    (datetimes, Decimal, lazy translations ...) go through DRF's JSONEncoder
+    so the output stays identical; indented, ascii-only or non-compact
+    output and payloads orjson rejects use the stdlib encoder
+    """
+    orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    default_encoder = encoders.JSONEncoder()
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        custom_data = self.get_custom_data(data, renderer_context)
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return JSONRenderer.render(
+                self, custom_data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                custom_data,
+                default=self.default_encoder.default,
+                option=self.orjson_options
+            )
+        except orjson.JSONEncodeError:
+            return JSONRenderer.render(
+                self, custom_data, accepted_media_type, renderer_context)
+        # same strict javascript subset escaping as JSONRenderer, the single
+        # byte lookup keeps the common all-ascii payload off the slow path
+        if b'\xe2' in ret:
+            ret = ret.replace(
+                b'\xe2\x80\xa8', b'\\u2028'
+            ).replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+        return ret
@@ -8,14 +8,16 @@ SECRET_KEY = env('SECRET_KEY')
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'WordWeaver.db_backends.mysql',
         'NAME': env('DB_NAME'),
         'HOST': env('DB_HOST'),
         'PORT': env('DB_PORT'),
         'USER': env('DB_USER'),
-        'PASSWORD': env('DB_PASS')
+        'PASSWORD': env('DB_PASS'),
+        **DATABASE_CONNECTION_SETTINGS
     }
 }
+DATABASES.update(get_replica_databases())
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'public/static')
 
@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from services.metrics_view import MetricsView
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -26,6 +27,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('blog-management/', include('blog.urls')),
+    path('payment-management/', include('payment_jobs.urls')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     path('schema/swagger/', SpectacularSwaggerView.as_view(), name='swagger'),
     path('schema/redoc/', SpectacularRedocView.as_view(), name='redoc'),
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import django
+from decouple import config
+
+
+def setup_django():
+    """
+    configure Django the same way manage.py does, so a benchmark runs
+    against the settings module from the .env file
+    """
+    settings_module = config("DJANGO_SETTINGS_MODULE", default=None)
+    if settings_module is None:
+        print(
+            "Error: no DJANGO_SETTINGS_MODULE found. Will NOT run benchmark. "
+            "Remember to create .env file at project root. "
+            "Check README for more info."
+        )
+        sys.exit(1)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
@@ -0,0 +1,112 @@
+"""
+Load benchmark of the sync blog-management read endpoints served by WSGI
+workers against their async versions served by Hypercorn over ASGI.
+
+Start both servers against the same database, for example
+
+    hypercorn --workers 2 --bind 127.0.0.1:8001 WordWeaver.wsgi:application
+    hypercorn --config python:WordWeaver.hypercorn_config \\
+        --bind 127.0.0.1:8002 WordWeaver.asgi:application
+
+then run, with the token of a staff user
+
+    python -m benchmarks.asgi_benchmark --token <key> \\
+        --wsgi-url http://127.0.0.1:8001 --asgi-url http://127.0.0.1:8002 \\
+        --concurrency 1 16 64 256
+
+Each concurrency level sends --requests requests per endpoint and reports
+throughput and latency percentiles. The gap grows with the concurrency and
+with the database latency, a WSGI worker holds a thread for the whole
+request while an async view releases the event loop on every query.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ENDPOINTS = [
+    ('blog list', '/blog-management/blogs/', '/blog-management/async/blogs/'),
+    (
+        'auth user blogs',
+        '/blog-management/blogs/auth-user-blogs/',
+        '/blog-management/async/blogs/auth-user-blogs/'
+    ),
+    ('comment list', '/blog-management/comments/', '/blog-management/async/comments/'),
+]
+
+
+def percentile(latencies, percent):
+    index = max(0, int(round(percent / 100 * len(latencies))) - 1)
+    return latencies[index]
+
+
+def run(url, token, concurrency, total_requests):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=concurrency
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    headers = {'Authorization': f'Token {token}'}
+
+    def fetch(_):
+        started = time.perf_counter()
+        response = session.get(url, headers=headers, timeout=30)
+        elapsed = time.perf_counter() - started
+        return elapsed, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(total_requests)))
+    wall_time = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, status_code in results)
+    errors = sum(1 for elapsed, status_code in results if status_code != 200)
+    return {
+        'rps': total_requests / wall_time,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'mean': statistics.mean(latencies) * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--wsgi-url', default='http://127.0.0.1:8001')
+    parser.add_argument('--asgi-url', default='http://127.0.0.1:8002')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--query', default='page_size=20')
+    args = parser.parse_args()
+
+    row = '{:<16} {:>5} {:>6} {:>9} {:>9} {:>9} {:>9} {:>7}'
+    print(row.format('endpoint', 'conc', 'server', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for name, wsgi_path, asgi_path in ENDPOINTS:
+        for concurrency in args.concurrency:
+            for server, base_url, path in [
+                ('wsgi', args.wsgi_url, wsgi_path),
+                ('asgi', args.asgi_url, asgi_path),
+            ]:
+                result = run(
+                    f'{base_url}{path}?{args.query}',
+                    args.token,
+                    concurrency,
+                    args.requests
+                )
+                print(row.format(
+                    name, concurrency, server,
+                    f"{result['rps']:.1f}",
+                    f"{result['p50']:.1f}",
+                    f"{result['p95']:.1f}",
+                    f"{result['p99']:.1f}",
+                    result['errors']
+                ))
+
+
+if __name__ == '__main__':
+    main()
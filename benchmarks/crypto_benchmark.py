@@ -0,0 +1,85 @@
+"""
+Encrypt/decrypt throughput of payment processor payloads inline against
+the process pool of CryptoExecutor, across payload sizes.
+
+    python -m benchmarks.crypto_benchmark --sizes 1,16,256,1024 --threads 4
+
+Payloads are MDM billers lists of roughly the given size in KiB. The
+functions are CRYPTO_EXECUTOR_ENCRYPT/CRYPTO_EXECUTOR_DECRYPT unless
+--encrypt/--decrypt name other dotted paths. Each thread encrypts and then
+decrypts its payload --repeat times, which is how concurrent requests share
+one worker. The crossover size is where CRYPTO_EXECUTOR_PROCESS_THRESHOLD
+belongs.
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import setup_django
+
+
+def build_payload(size_kib):
+    biller = {
+        'bllr_id': 'b000',
+        'bllr_nm': 'Dhaka Power Distribution Company',
+        'bllr_ctgry': 'ELECTRICITY',
+        'bll_typ': 'PREPAID',
+        'fields': [{'nm': 'acnt_no', 'typ': 'NUMBER', 'mndtry': 'Y'}],
+    }
+    count = max(size_kib * 1024 // 180, 1)
+    return {
+        'hdrs': {'nm': 'FETCH_MDM_DATA_RESP', 'ver': 'v1.3.0'},
+        'bllrs': [dict(biller, bllr_id=f'b{index:05}') for index in range(count)],
+    }
+
+
+def run(executor, payload, threads, repeat):
+    def worker():
+        for _ in range(repeat):
+            encrypted = executor.encrypt(payload)
+            if isinstance(encrypted, bytes):
+                encrypted = encrypted.decode('utf-8')
+            executor.decrypt(encrypted)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * repeat / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='1,16,256,1024,4096')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--encrypt', default=None)
+    parser.add_argument('--decrypt', default=None)
+    args = parser.parse_args()
+    setup_django()
+    from services.crypto_executor import CryptoExecutor, get_payload_size
+
+    inline = CryptoExecutor(args.encrypt, args.decrypt, max_workers=0)
+    pooled = CryptoExecutor(args.encrypt, args.decrypt, threshold=0, max_workers=args.workers)
+    # start the pool processes outside of the measurement
+    pooled.encrypt(build_payload(1))
+
+    row = '{:>10} {:>14} {:>14}'
+    print(row.format('KiB', 'inline ops/s', 'pool ops/s'))
+    try:
+        for size_kib in map(int, args.sizes.split(',')):
+            payload = build_payload(size_kib)
+            print(row.format(
+                f'{get_payload_size(payload) / 1024:.1f}',
+                f'{run(inline, payload, args.threads, args.repeat):.1f}',
+                f'{run(pooled, payload, args.threads, args.repeat):.1f}'
+            ))
+    finally:
+        pooled.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Requests/sec of a database bound request with and without persistent
+connections (CONN_MAX_AGE) against the database of the configured settings.
+
+    python -m benchmarks.db_connection_benchmark --requests 2000 --threads 4
+
+Every simulated request goes through the request_started/request_finished
+signals, exactly like a real one, so Django opens and closes (or keeps)
+the connection the same way. Run it against a local MySQL to see the TCP
+and authentication handshake that persistent connections save.
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import setup_django
+
+
+def run(requests, threads, conn_max_age, query):
+    from django.core.signals import request_finished, request_started
+    from django.db import connections
+    from WordWeaver.db_backends.connection_limit import (
+        get_connection_metrics,
+        reset_connection_metrics
+    )
+
+    connections['default'].close()
+    connections.settings['default']['CONN_MAX_AGE'] = conn_max_age
+    reset_connection_metrics()
+    per_thread = requests // threads
+
+    def worker():
+        connection = connections['default']
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        for _ in range(per_thread):
+            request_started.send(sender=None)
+            with connection.cursor() as cursor:
+                cursor.execute(query)
+                cursor.fetchall()
+            request_finished.send(sender=None)
+        connections.close_all()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    metrics = get_connection_metrics().get('default', {})
+    return per_thread * threads / elapsed, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--conn-max-age', type=int, default=60)
+    parser.add_argument('--query', default='SELECT 1')
+    args = parser.parse_args()
+    setup_django()
+
+    row = '{:<14} {:>10} {:>10} {:>11}'
+    print(row.format('CONN_MAX_AGE', 'req/s', 'opened', 'reuse rate'))
+    for conn_max_age in (0, args.conn_max_age):
+        rps, metrics = run(args.requests, args.threads, conn_max_age, args.query)
+        reuse_rate = metrics.get('reuse_rate')
+        print(row.format(
+            conn_max_age,
+            f'{rps:.0f}',
+            metrics.get('opened', '-'),
+            '-' if reuse_rate is None else f'{reuse_rate:.1%}'
+        ))
+
+
+if __name__ == '__main__':
+    main()
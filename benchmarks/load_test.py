@@ -0,0 +1,431 @@
+"""
+Load test of the REST API routes under blog-management/ and auth/, with
+latency percentiles and requests/sec per endpoint compared to a baseline.
+
+Seed the database once (seed_data with the load test users, hot blogs and
+power commenters), then run the load test against a local server
+
+    python -m benchmarks.load_test seed --users 5000 --blogs 100000 --comments 2000000
+    python -m benchmarks.load_test run --start-server --concurrency 16 --requests 2000
+
+--start-server serves the project with runserver on --url with the
+throttles turned off, to test another server start it with
+THROTTLE_RATE_ANON= and THROTTLE_RATE_USER= in the environment and pass
+its --url. The tokens, blogs and comments requested are read from the
+database of the configured settings, which must be the one of the server.
+
+Every endpoint gets --warmup requests, then --requests requests from
+--concurrency threads. --save-baseline stores the results in --baseline,
+later runs are compared to it and exit with status 1 when the p95 or p99
+latency of an endpoint grew, or its requests/sec dropped, by more than
+--tolerance, or when an endpoint answered with errors. The random choices
+(pages, blogs, comments, users) follow --seed so runs are reproducible.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from benchmarks import setup_django
+from benchmarks.asgi_benchmark import percentile
+
+USERNAME_PREFIX = 'loadtest_user_'
+STAFF_USERNAME = 'loadtest_staff'
+PASSWORD = 'loadtest@word_weaver'
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baselines', 'load_test.json')
+WORDS = (
+    'django rest framework query index cache latency throughput replica '
+    'cursor page token comment blog worker thread process pool request '
+    'response serializer renderer payload batch signal counter database'
+).split()
+
+Fixtures = namedtuple(
+    'Fixtures',
+    ['staff_token', 'users', 'blog_pks', 'comment_pks', 'user_pks', 'blog_pages', 'comment_pages']
+)
+Endpoint = namedtuple('Endpoint', ['name', 'method', 'build', 'auth'])
+
+
+def get_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(users, blogs, comments, batch_size, random_seed):
+    from django.core.management import call_command
+
+    call_command(
+        'seed_data',
+        users=users,
+        blogs=blogs,
+        comments=comments,
+        batch_size=batch_size,
+        seed=random_seed,
+        username_prefix=USERNAME_PREFIX,
+        staff_username=STAFF_USERNAME,
+        password=PASSWORD
+    )
+
+
+def sample_pks(model, rng, size):
+    """
+    up to size random pks of model without ORDER BY RAND() over the table
+    """
+    from django.db.models import Max, Min
+
+    bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    candidates = range(bounds['low'], bounds['high'] + 1)
+    picked = rng.sample(candidates, min(size, len(candidates)))
+    return sorted(model.objects.filter(pk__in=picked).values_list('pk', flat=True))
+
+
+def load_fixtures(rng, sample_size, page_size):
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+    from blog.models import Blog, Comment
+
+    try:
+        staff_token = Token.objects.get(user__username=STAFF_USERNAME).key
+    except Token.DoesNotExist:
+        sys.exit('No load test data, run the seed command first.')
+    users = list(
+        Token.objects.filter(user__username__startswith=USERNAME_PREFIX).order_by(
+            'user_id').values_list('user_id', 'user__username', 'key')[:sample_size]
+    )
+    blog_pks = sample_pks(Blog, rng, sample_size)
+    comment_pks = sample_pks(Comment, rng, sample_size)
+    if not (users and blog_pks and comment_pks):
+        sys.exit('No load test data, run the seed command first.')
+    return Fixtures(
+        staff_token=staff_token,
+        users=users,
+        blog_pks=blog_pks,
+        comment_pks=comment_pks,
+        user_pks=sample_pks(get_user_model(), rng, sample_size),
+        blog_pages=max(Blog.objects.count() // page_size, 1),
+        comment_pages=max(Comment.objects.count() // page_size, 1),
+    )
+
+
+def get_endpoints(page_size):
+    """
+    (name, method, build(fixtures, rng, user) -> (path, json body), auth)
+    where auth is staff, user (a random load test user) or anon
+    """
+    def deep_page(pages):
+        # mostly the first pages with a long tail of deep ones, the latency
+        # of page number pagination grows with the page depth
+        return lambda f, rng, user: min(pages(f), int(rng.paretovariate(1.2)))
+
+    blog_page = deep_page(lambda f: f.blog_pages)
+    comment_page = deep_page(lambda f: f.comment_pages)
+    return [
+        Endpoint(
+            'blog list', 'GET',
+            lambda f, rng, user: (
+                f'/blog-management/blogs/?page_size={page_size}'
+                f'&page={blog_page(f, rng, user)}', None),
+            'staff'
+        ),
+        Endpoint(
+            'blog list cursor', 'GET',
+            lambda f, rng, user: (
+                f'/blog-management/blogs/?page_size={page_size}&pagination=cursor', None),
+            'staff'
+        ),
+        Endpoint(
+            'blog detail', 'GET',
+            lambda f, rng, user: (f'/blog-management/blogs/{rng.choice(f.blog_pks)}/', None),
+            'staff'
+        ),
+        Endpoint(
+            'auth user blogs', 'GET',
+            lambda f, rng, user: (
+                f'/blog-management/blogs/auth-user-blogs/?page_size={page_size}', None),
+            'user'
+        ),
+        Endpoint(
+            'comment list', 'GET',
+            lambda f, rng, user: (
+                f'/blog-management/comments/?page_size={page_size}'
+                f'&page={comment_page(f, rng, user)}', None),
+            'staff'
+        ),
+        Endpoint(
+            'comment detail', 'GET',
+            lambda f, rng, user: (
+                f'/blog-management/comments/{rng.choice(f.comment_pks)}/', None),
+            'staff'
+        ),
+        Endpoint(
+            'auth user blog comments', 'GET',
+            lambda f, rng, user: (
+                '/blog-management/comments/auth-user-all-comments-for-specific-blog/'
+                f'?blog_pk={rng.choice(f.blog_pks)}&page_size={page_size}', None),
+            'user'
+        ),
+        Endpoint(
+            'comment create', 'POST',
+            lambda f, rng, user: ('/blog-management/comments/', {
+                'author': user[0],
+                'blog': rng.choice(f.blog_pks),
+                'content': get_text(rng, 20),
+            }),
+            'user'
+        ),
+        Endpoint(
+            'user list', 'GET',
+            lambda f, rng, user: (f'/auth/users/?page_size={page_size}', None),
+            'staff'
+        ),
+        Endpoint(
+            'user detail', 'GET',
+            lambda f, rng, user: (f'/auth/users/{rng.choice(f.user_pks)}/', None),
+            'staff'
+        ),
+        Endpoint(
+            'token login', 'POST',
+            lambda f, rng, user: (
+                '/auth/api-token-auth/', {'username': user[1], 'password': PASSWORD}),
+            'anon'
+        ),
+    ]
+
+
+def build_requests(endpoint, fixtures, rng, count):
+    """
+    the (method, path, headers, body) of count requests, built up front so
+    the random choices do not depend on the thread scheduling
+    """
+    built = []
+    for _ in range(count):
+        user = rng.choice(fixtures.users)
+        path, body = endpoint.build(fixtures, rng, user)
+        headers = {}
+        if endpoint.auth == 'staff':
+            headers['Authorization'] = f'Token {fixtures.staff_token}'
+        elif endpoint.auth == 'user':
+            headers['Authorization'] = f'Token {user[2]}'
+        built.append((endpoint.method, path, headers, body))
+    return built
+
+
+def send_requests(base_url, built, concurrency):
+    local = threading.local()
+
+    def send(request):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, headers, body = request
+        started = time.perf_counter()
+        try:
+            response = session.request(
+                method, f'{base_url}{path}', headers=headers, json=body, timeout=60)
+            status_code = response.status_code
+        except requests.RequestException:
+            status_code = None
+        return time.perf_counter() - started, status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, built))
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall_time):
+    latencies = sorted(elapsed for elapsed, status_code in results)
+    return {
+        'requests': len(results),
+        'rps': len(results) / wall_time,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'mean': statistics.mean(latencies) * 1000,
+        'errors': sum(
+            1 for elapsed, status_code in results
+            if status_code is None or status_code >= 400
+        ),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    the regressions of results against baseline, as lines of text
+    """
+    regressions = []
+    for name, result in results.items():
+        if result['errors']:
+            regressions.append(f'{name}: {result["errors"]} errors')
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for metric in ('p95', 'p99'):
+            if result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: {metric} {result[metric]:.1f} ms, '
+                    f'baseline {expected[metric]:.1f} ms'
+                )
+        if result['rps'] < expected['rps'] * (1 - tolerance):
+            regressions.append(
+                f'{name}: {result["rps"]:.1f} req/s, baseline {expected["rps"]:.1f} req/s'
+            )
+    return regressions
+
+
+def format_change(value, expected):
+    if not expected:
+        return ''
+    return f'{(value - expected) / expected * 100:+.0f}%'
+
+
+def wait_for_server(url, timeout):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((parts.hostname, parts.port or 80), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit(f'The server did not start on {url} within {timeout}s.')
+
+
+def start_server(url):
+    parts = urlsplit(url)
+    env = dict(os.environ, THROTTLE_RATE_ANON='', THROTTLE_RATE_USER='')
+    server = subprocess.Popen(
+        [
+            sys.executable, os.path.join(BASE_DIR, 'manage.py'), 'runserver',
+            '--noreload', f'{parts.hostname}:{parts.port or 80}'
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    wait_for_server(url, timeout=30)
+    return server
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    fixtures = load_fixtures(rng, args.sample_size, args.page_size)
+    endpoints = [
+        endpoint for endpoint in get_endpoints(args.page_size)
+        if not args.endpoints or endpoint.name in args.endpoints
+    ]
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['concurrency'] != args.concurrency:
+            print(
+                f'Warning: the baseline was recorded with concurrency '
+                f'{baseline["concurrency"]}, not {args.concurrency}'
+            )
+
+    server = start_server(args.url) if args.start_server else None
+    results = {}
+    try:
+        row = '{:<24} {:>9} {:>9} {:>9} {:>9} {:>7} {:>8} {:>8}'
+        print(row.format(
+            'endpoint', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors', 'p95', 'req/s'))
+        for endpoint in endpoints:
+            send_requests(
+                args.url, build_requests(endpoint, fixtures, rng, args.warmup), args.concurrency)
+            result = summarize(*send_requests(
+                args.url,
+                build_requests(endpoint, fixtures, rng, args.requests),
+                args.concurrency
+            ))
+            results[endpoint.name] = result
+            expected = baseline.get('endpoints', {}).get(endpoint.name, {})
+            print(row.format(
+                endpoint.name,
+                f'{result["rps"]:.1f}',
+                f'{result["p50"]:.1f}',
+                f'{result["p95"]:.1f}',
+                f'{result["p99"]:.1f}',
+                result['errors'],
+                format_change(result['p95'], expected.get('p95')),
+                format_change(result['rps'], expected.get('rps'))
+            ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'concurrency': args.concurrency,
+        'requests': args.requests,
+        'page_size': args.page_size,
+        'seed': args.seed,
+        'endpoints': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f'Baseline saved to {args.baseline}')
+        return
+
+    regressions = compare(results, baseline.get('endpoints', {}), args.tolerance)
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print(f'  {regression}')
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='seed an empty database')
+    seed_parser.add_argument('--users', type=int, default=5000)
+    seed_parser.add_argument('--blogs', type=int, default=100000)
+    seed_parser.add_argument('--comments', type=int, default=2000000)
+    seed_parser.add_argument('--batch-size', type=int, default=10000)
+    seed_parser.add_argument('--seed', type=int, default=0)
+
+    run_parser = subparsers.add_parser('run', help='run the load test')
+    run_parser.add_argument('--url', default='http://127.0.0.1:8000')
+    run_parser.add_argument('--start-server', action='store_true')
+    run_parser.add_argument('--concurrency', type=int, default=16)
+    run_parser.add_argument('--requests', type=int, default=1000)
+    run_parser.add_argument('--warmup', type=int, default=50)
+    run_parser.add_argument('--page-size', type=int, default=20)
+    run_parser.add_argument('--sample-size', type=int, default=1000)
+    run_parser.add_argument('--endpoints', nargs='+', default=None)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    run_parser.add_argument('--save-baseline', action='store_true')
+    run_parser.add_argument('--tolerance', type=float, default=0.2)
+    run_parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    setup_django()
+    if args.command == 'seed':
+        seed(args.users, args.blogs, args.comments, args.batch_size, args.seed)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
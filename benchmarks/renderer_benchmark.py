@@ -0,0 +1,99 @@
+"""
+Microbenchmark of CustomJSONRenderer against FastCustomJSONRenderer on
+realistic blog and comment list pages.
+
+    python -m benchmarks.renderer_benchmark --page-size 100 --repeat 200
+"""
+import argparse
+import timeit
+from collections import OrderedDict
+from datetime import timedelta
+
+from benchmarks import setup_django
+
+
+def build_pages(page_size):
+    from django.utils import timezone
+    from django.utils.translation import gettext_lazy as _
+    from blog.models import Blog, Comment
+    from blog.serializers import BlogSerializer, CommentSerializer
+
+    now = timezone.now()
+    blogs = [
+        Blog(
+            pk=index,
+            user_id=index % 50 + 1,
+            title=f'Blog post number {index} about weaving words',
+            content='Lorem ipsum dolor sit amet, consectetur adipiscing. ' * 40,
+            creation_date=now - timedelta(minutes=index),
+            last_update_date=now - timedelta(seconds=index)
+        )
+        for index in range(1, page_size + 1)
+    ]
+    comments = [
+        Comment(
+            pk=index,
+            author_id=index % 500 + 1,
+            blog_id=index % 20 + 1,
+            content='Great post, thanks for sharing! ' * 4,
+            creation_date=now - timedelta(seconds=index * 7),
+            last_update_date=None
+        )
+        for index in range(1, page_size + 1)
+    ]
+
+    def page(serializer_class, objects, message):
+        return {
+            'detail': OrderedDict([
+                ('count', 1000000),
+                ('next', 'http://localhost:8000/blog-management/?page=3'),
+                ('previous', 'http://localhost:8000/blog-management/?page=1'),
+                ('results', serializer_class(objects, many=True).data),
+            ]),
+            'message': message,
+        }
+
+    return {
+        'blogs': page(BlogSerializer, blogs, _('list of all blogs')),
+        'comments': page(CommentSerializer, comments, _('list of all comments')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.response import Response
+    from WordWeaver.renderers import CustomJSONRenderer, FastCustomJSONRenderer
+
+    renderer_context = {'response': Response()}
+    renderers = [CustomJSONRenderer(), FastCustomJSONRenderer()]
+    for name, data in build_pages(args.page_size).items():
+        outputs = [
+            renderer.render(data, 'application/json', renderer_context)
+            for renderer in renderers
+        ]
+        if outputs[0] != outputs[1]:
+            raise SystemExit(f'{name}: renderers produced different output')
+        timings = [
+            min(timeit.repeat(
+                lambda renderer=renderer: renderer.render(
+                    data, 'application/json', renderer_context),
+                number=args.repeat,
+                repeat=5
+            )) / args.repeat
+            for renderer in renderers
+        ]
+        print(
+            f'{name:<10} {len(outputs[0]):>8} bytes  '
+            f'{type(renderers[0]).__name__}: {timings[0] * 1e6:9.1f} us  '
+            f'{type(renderers[1]).__name__}: {timings[1] * 1e6:9.1f} us  '
+            f'speedup: {timings[0] / timings[1]:.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from blog.models import Blog, Comment
+from services.constants import CacheKey
+from services.object_cache import invalidate_object_data
+
+
+class Command(BaseCommand):
+    help = 'Recompute comment_count and last_comment_at of every blog in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='number of blogs updated per transaction'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='seconds to pause between batches'
+        )
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        comments = Comment.objects.filter(blog=OuterRef('pk')).order_by()
+        comment_count = Coalesce(
+            Subquery(
+                comments.values('blog').annotate(
+                    count=Count('pk')
+                ).values('count')
+            ),
+            0
+        )
+        last_comment_at = Subquery(
+            comments.order_by('-creation_date').values('creation_date')[:1]
+        )
+
+        last_pk = 0
+        updated = 0
+        while True:
+            pks = list(
+                Blog.objects.filter(pk__gt=last_pk).order_by(
+                    'pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                updated += Blog.objects.filter(pk__in=pks).update(
+                    comment_count=comment_count,
+                    last_comment_at=last_comment_at
+                )
+            for pk in pks:
+                invalidate_object_data(CacheKey.BLOG_DETAIL.value, pk)
+            last_pk = pks[-1]
+            if kwargs['sleep']:
+                time.sleep(kwargs['sleep'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Recomputed comment counters of {updated} blogs.')
+        )
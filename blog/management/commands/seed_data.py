@@ -0,0 +1,270 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from blog.models import Blog, Comment
+from users.tokens import get_or_create_token, provision_tokens
+
+User = get_user_model()
+
+WORDS = (
+    'django rest framework query index cache latency throughput replica '
+    'cursor page token comment blog worker thread process pool request '
+    'response serializer renderer payload batch signal counter database '
+    'python async event loop connection transaction migration model view'
+).split()
+
+
+def get_cum_weights(count, skew):
+    """
+    cumulative Zipf weights, the item of rank r is picked in proportion to
+    1 / r ** skew (0 is uniform)
+    """
+    return list(accumulate(rank ** -skew for rank in range(1, count + 1)))
+
+
+def get_texts(rng, count, min_words, max_words):
+    return [
+        ' '.join(rng.choices(WORDS, k=rng.randint(min_words, max_words)))
+        for _ in range(count)
+    ]
+
+
+def bulk_insert(model, field_names, rows):
+    """
+    the INSERT of bulk_create without building a model instance and
+    compiling the SQL of every row, rows are tuples of database values in
+    the order of field_names
+    """
+    quote_name = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in field_names]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote_name(model._meta.db_table),
+        ', '.join(quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns))
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """
+    turn auto_now_add/auto_now of fields off, so the dates set on the
+    instances are written by bulk_create instead of the current time
+    """
+    saved = [(field, field.auto_now_add, field.auto_now) for field in fields]
+    for field in fields:
+        field.auto_now_add = field.auto_now = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add, auto_now in saved:
+            field.auto_now_add = auto_now_add
+            field.auto_now = auto_now
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk create users (with tokens), blogs and comments for performance '
+        'work, deterministic for a given --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='number of users')
+        parser.add_argument('--blogs', type=int, default=10000, help='number of blogs')
+        parser.add_argument('--comments', type=int, default=100000, help='number of comments')
+        parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='number of rows inserted per bulk_create and transaction'
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.0,
+            help='Zipf exponent of the hot blogs, prolific bloggers and power '
+                 'commenters, 0 spreads blogs and comments uniformly'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='blogs and comments are dated over this many days before --until'
+        )
+        parser.add_argument(
+            '--until',
+            default=None,
+            help='latest date of the data (ISO 8601, now by default), pass it '
+                 'for the same dates on every run'
+        )
+        parser.add_argument('--username-prefix', default='seed_user_')
+        parser.add_argument(
+            '--password',
+            default='seed@word_weaver',
+            help='password of every seeded user, hashed once'
+        )
+        parser.add_argument(
+            '--staff-username',
+            default=None,
+            help='also create a staff user (with a token) of this username'
+        )
+
+    def handle(self, *args, **kwargs):
+        prefix = kwargs['username_prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'users starting with {prefix} already exist, pass another --username-prefix'
+            )
+        self.rng = random.Random(kwargs['seed'])
+        self.batch_size = kwargs['batch_size']
+        self.started = time.perf_counter()
+        self.now = timezone.now()
+        if kwargs['until']:
+            self.now = parse_datetime(kwargs['until'])
+            if self.now is None:
+                raise CommandError(f'--until {kwargs["until"]} is not an ISO 8601 date')
+            if timezone.is_naive(self.now):
+                self.now = timezone.make_aware(self.now)
+        self.window = timedelta(days=kwargs['days'])
+
+        if kwargs['staff_username']:
+            staff = User.objects.create_user(
+                username=kwargs['staff_username'],
+                password=kwargs['password'],
+                is_staff=True
+            )
+            get_or_create_token(staff)
+
+        user_pks = self.create_users(kwargs['users'], prefix, kwargs['password'])
+        blogs = self.create_blogs(kwargs['blogs'], user_pks, kwargs['skew'])
+        self.create_comments(kwargs['comments'], user_pks, blogs, kwargs['skew'])
+        call_command(
+            'recompute_blog_comment_counters',
+            batch_size=self.batch_size,
+            stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {kwargs["users"]} users, {kwargs["blogs"]} blogs and '
+            f'{kwargs["comments"]} comments in {time.perf_counter() - self.started:.1f}s.'
+        ))
+
+    def log(self, message):
+        self.stdout.write(f'[{time.perf_counter() - self.started:7.1f}s] {message}')
+
+    def get_last_pk(self, model):
+        return model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+
+    def get_past_date(self):
+        return self.now - self.window * self.rng.random()
+
+    def create_users(self, count, prefix, password):
+        """
+        users and their tokens, both bulk created
+        """
+        last_pk = self.get_last_pk(User)
+        hashed_password = make_password(password)
+        for start in range(0, count, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(
+                        username=f'{prefix}{index:07}',
+                        email=f'{prefix}{index:07}@example.com',
+                        password=hashed_password,
+                        date_joined=self.get_past_date()
+                    )
+                    for index in range(start, min(start + self.batch_size, count))
+                ])
+        user_pks = list(
+            User.objects.filter(pk__gt=last_pk, username__startswith=prefix).order_by(
+                'pk').values_list('pk', flat=True)
+        )
+        provision_tokens(user_pks, self.batch_size)
+        self.log(f'{len(user_pks)} users with tokens')
+        return user_pks
+
+    def create_blogs(self, count, user_pks, skew):
+        """
+        blogs of prolific bloggers, in creation date order, returns the
+        (pk, creation_date) of the created blogs
+        """
+        bloggers = user_pks[:]
+        self.rng.shuffle(bloggers)
+        blogger_weights = get_cum_weights(len(bloggers), skew)
+        titles = get_texts(self.rng, 1000, 3, 10)
+        contents = get_texts(self.rng, 1000, 50, 300)
+        dates = sorted(self.get_past_date() for _ in range(count))
+
+        last_pk = self.get_last_pk(Blog)
+        with explicit_dates(Blog._meta.get_field('creation_date')):
+            for start in range(0, count, self.batch_size):
+                batch_dates = dates[start:start + self.batch_size]
+                authors = self.rng.choices(
+                    bloggers, cum_weights=blogger_weights, k=len(batch_dates))
+                with transaction.atomic():
+                    Blog.objects.bulk_create([
+                        Blog(
+                            user_id=author,
+                            title=self.rng.choice(titles),
+                            content=self.rng.choice(contents),
+                            creation_date=creation_date
+                        )
+                        for author, creation_date in zip(authors, batch_dates)
+                    ])
+        blogs = list(
+            Blog.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'creation_date')
+        )
+        self.log(f'{len(blogs)} blogs')
+        return blogs
+
+    def create_comments(self, count, user_pks, blogs, skew):
+        """
+        comments of power commenters on hot blogs, each dated between the
+        creation of its blog and now. They are most of the rows, so they go
+        through bulk_insert rather than bulk_create
+        """
+        if not blogs:
+            return
+        commenters = user_pks[:]
+        self.rng.shuffle(commenters)
+        commenter_weights = get_cum_weights(len(commenters), skew)
+        hot_blogs = blogs[:]
+        self.rng.shuffle(hot_blogs)
+        blog_weights = get_cum_weights(len(hot_blogs), skew)
+        contents = get_texts(self.rng, 5000, 5, 40)
+
+        adapt_date = connection.ops.adapt_datetimefield_value
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            authors = self.rng.choices(commenters, cum_weights=commenter_weights, k=size)
+            targets = self.rng.choices(hot_blogs, cum_weights=blog_weights, k=size)
+            texts = self.rng.choices(contents, k=size)
+            with transaction.atomic():
+                bulk_insert(
+                    Comment,
+                    ['author', 'blog', 'content', 'creation_date'],
+                    [
+                        (
+                            author,
+                            blog_pk,
+                            content,
+                            adapt_date(blog_date + (self.now - blog_date) * self.rng.random())
+                        )
+                        for author, (blog_pk, blog_date), content in zip(authors, targets, texts)
+                    ]
+                )
+            if (start // self.batch_size) % 10 == 9:
+                self.log(f'{start + size} comments')
+        self.log(f'{count} comments')
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_blog_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='comment_count',
+            field=models.IntegerField(default=0, help_text='number of comments on the blog', verbose_name='comment count'),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='last_comment_at',
+            field=models.DateTimeField(help_text='creation date of the latest comment on the blog', null=True, verbose_name='last comment at'),
+        ),
+    ]
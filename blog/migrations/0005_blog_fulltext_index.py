@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'CREATE FULLTEXT INDEX blog_title_content_ft ON blog_blog (title, content)'
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX blog_title_content_ft ON blog_blog')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_blog_comment_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -1,20 +1,72 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
+from services.bulk import bulk_create_with_pks
+from services.constants import CacheKey
+from services.object_cache import invalidate_object_data
 
 User = get_user_model()
 
 
 class BlogManager(models.Manager):
-    def create(self, *args, **kwargs):
+    def get_valid_kwargs(self, kwargs):
         model_field_names = [field.name for field in self.model._meta.fields]
-        valid_kwargs = {key: value for key,
-                        value in kwargs.items() if key in model_field_names}
+        return {key: value for key,
+                value in kwargs.items() if key in model_field_names}
+
+    def create(self, *args, **kwargs):
         blog = super(BlogManager, self).create(
-            **valid_kwargs
+            **self.get_valid_kwargs(kwargs)
         )
         return blog
 
+    def bulk_create_from_kwargs(self, items, batch_size=None):
+        """
+        bulk counterpart of create, unknown kwargs of every item are dropped
+        """
+        return bulk_create_with_pks(
+            self,
+            [self.model(**self.get_valid_kwargs(item)) for item in items],
+            batch_size=batch_size
+        )
+
+    def record_comment_added(self, blog_id, creation_date, count=1):
+        """
+        increment the comment counters of a blog in a single UPDATE
+        """
+        self.filter(pk=blog_id).update(
+            comment_count=F('comment_count') + count,
+            last_comment_at=Greatest(
+                Coalesce(F('last_comment_at'), Value(creation_date)),
+                Value(creation_date)
+            )
+        )
+        self.invalidate_blog_data(blog_id)
+
+    def record_comment_removed(self, blog_id, count=1):
+        """
+        decrement the comment counter of a blog and move last_comment_at
+        back to the latest remaining comment in a single UPDATE
+        """
+        self.filter(pk=blog_id).update(
+            comment_count=Greatest(F('comment_count') - count, Value(0)),
+            last_comment_at=Subquery(
+                Comment.objects.filter(
+                    blog=OuterRef('pk')
+                ).order_by('-creation_date').values('creation_date')[:1]
+            )
+        )
+        self.invalidate_blog_data(blog_id)
+
+    def invalidate_blog_data(self, blog_id):
+        # after the commit of the comment, the counters are updated inside
+        # its transaction
+        transaction.on_commit(
+            lambda: invalidate_object_data(CacheKey.BLOG_DETAIL.value, blog_id))
+
 
 class Blog(models.Model):
     user = models.ForeignKey(
@@ -60,22 +112,75 @@ class Blog(models.Model):
         verbose_name=_('last update date'),
         null=True
     )
+    comment_count = models.IntegerField(
+        default=0,
+        help_text=_("number of comments on the blog"),
+        verbose_name=_('comment count')
+    )
+    last_comment_at = models.DateTimeField(
+        help_text=_("creation date of the latest comment on the blog"),
+        verbose_name=_('last comment at'),
+        null=True
+    )
     objects = BlogManager()
 
     class Meta:
         ordering = ['-creation_date']
+        indexes = [
+            models.Index(
+                fields=['-creation_date', '-id'],
+                name='blog_created_idx'
+            ),
+            models.Index(
+                fields=['user', '-creation_date', '-id'],
+                name='blog_user_created_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # the retrieve validators and object cache keys are built from
+        # last_update_date (services/object_cache.py), so every update of
+        # a saved row moves it
+        if not self._state.adding:
+            self.last_update_date = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'last_update_date'}
+        super().save(*args, **kwargs)
 
 
 class CommentManager(models.Manager):
-    def create(self, *args, **kwargs):
+    def get_valid_kwargs(self, kwargs):
         model_field_names = [field.name for field in self.model._meta.fields]
-        valid_kwargs = {key: value for key,
-                        value in kwargs.items() if key in model_field_names}
+        return {key: value for key,
+                value in kwargs.items() if key in model_field_names}
+
+    def create(self, *args, **kwargs):
         comment = super(CommentManager, self).create(
-            **valid_kwargs
+            **self.get_valid_kwargs(kwargs)
         )
         return comment
 
+    def bulk_create_from_kwargs(self, items, batch_size=None):
+        """
+        bulk counterpart of create, unknown kwargs of every item are dropped
+        and the counters of every touched blog are updated once
+        """
+        comments = bulk_create_with_pks(
+            self,
+            [self.model(**self.get_valid_kwargs(item)) for item in items],
+            batch_size=batch_size
+        )
+        blog_comments = {}
+        for comment in comments:
+            blog_comments.setdefault(comment.blog_id, []).append(comment)
+        for blog_id, added in blog_comments.items():
+            Blog.objects.record_comment_added(
+                blog_id,
+                max(comment.creation_date for comment in added),
+                count=len(added)
+            )
+        return comments
+
 
 class Comment(models.Model):
     author = models.ForeignKey(
@@ -125,3 +230,25 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-creation_date']
+        indexes = [
+            models.Index(
+                fields=['-creation_date', '-id'],
+                name='comment_created_idx'
+            ),
+            models.Index(
+                fields=['blog', '-creation_date', '-id'],
+                name='comment_blog_created_idx'
+            ),
+            models.Index(
+                fields=['author', 'blog', '-creation_date', '-id'],
+                name='comment_author_blog_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # see Blog.save
+        if not self._state.adding:
+            self.last_update_date = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'last_update_date'}
+        super().save(*args, **kwargs)
@@ -0,0 +1,158 @@
+import math
+import re
+from collections import Counter, defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+
+from blog.models import Blog
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class FullTextSearchBackend:
+    """
+    MariaDB/MySQL search over the FULLTEXT index on (title, content),
+    ranked by the MATCH ... AGAINST relevance
+    """
+    match_sql = 'MATCH ({table}.title, {table}.content) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+
+    def search(self, queryset, query):
+        match = self.match_sql.format(
+            table=connection.ops.quote_name(Blog._meta.db_table)
+        )
+        return queryset.filter(
+            RawSQL(match, (query,), output_field=BooleanField())
+        ).annotate(
+            relevance=RawSQL(match, (query,), output_field=FloatField())
+        ).order_by('-relevance', '-creation_date', '-id')
+
+    def index_blog(self, blog):
+        pass
+
+    def remove_blog(self, pk):
+        pass
+
+
+class InvertedIndexSearchBackend:
+    """
+    pure python BM25 inverted index over title and content for databases
+    without a FULLTEXT index (SQLite test runs). It is built lazily from
+    the database on the first search and kept in sync by the Blog signals
+    of this process only
+    """
+    k1 = 1.2
+    b = 0.75
+    title_weight = 2
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.built = False
+            self.postings = defaultdict(dict)
+            self.document_terms = {}
+            self.document_lengths = {}
+            self.total_length = 0
+
+    def build(self):
+        with self.lock:
+            if self.built:
+                return
+            for pk, title, content in Blog.objects.order_by().values_list(
+                'pk', 'title', 'content'
+            ).iterator():
+                self._add(pk, title, content)
+            self.built = True
+
+    def _add(self, pk, title, content):
+        self._remove(pk)
+        terms = Counter(tokenize(content))
+        for term in tokenize(title):
+            terms[term] += self.title_weight
+        for term, frequency in terms.items():
+            self.postings[term][pk] = frequency
+        self.document_terms[pk] = terms
+        self.document_lengths[pk] = sum(terms.values())
+        self.total_length += self.document_lengths[pk]
+
+    def _remove(self, pk):
+        terms = self.document_terms.pop(pk, None)
+        if terms is None:
+            return
+        for term in terms:
+            self.postings[term].pop(pk, None)
+            if not self.postings[term]:
+                del self.postings[term]
+        self.total_length -= self.document_lengths.pop(pk)
+
+    def index_blog(self, blog):
+        with self.lock:
+            if self.built:
+                self._add(blog.pk, blog.title, blog.content)
+
+    def remove_blog(self, pk):
+        with self.lock:
+            if self.built:
+                self._remove(pk)
+
+    def rank(self, query):
+        self.build()
+        with self.lock:
+            document_count = len(self.document_terms)
+            if not document_count:
+                return []
+            average_length = self.total_length / document_count
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(
+                    1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for pk, frequency in postings.items():
+                    scores[pk] += idf * frequency * (self.k1 + 1) / (
+                        frequency + self.k1 * (
+                            1 - self.b + self.b *
+                            self.document_lengths[pk] / average_length
+                        )
+                    )
+        return sorted(
+            scores.items(), key=lambda item: item[1], reverse=True
+        )[:settings.SEARCH_MAX_RESULTS]
+
+    def search(self, queryset, query):
+        ranked = self.rank(query)
+        if not ranked:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=[pk for pk, score in ranked]
+        ).annotate(
+            relevance=Case(
+                *[When(pk=pk, then=Value(score)) for pk, score in ranked],
+                output_field=FloatField()
+            )
+        ).order_by('-relevance', '-creation_date', '-id')
+
+
+_search_backend = None
+
+
+def get_search_backend():
+    global _search_backend
+    if _search_backend is None:
+        if connection.vendor == 'mysql':
+            _search_backend = FullTextSearchBackend()
+        else:
+            _search_backend = InvertedIndexSearchBackend()
+    return _search_backend
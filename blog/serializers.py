@@ -1,29 +1,38 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 from blog.models import (
     Blog,
     Comment
 )
 from django.utils import timezone
+from services.bulk import BulkCreateListSerializer
+from services.metrics import TimedSerializerMixin
 
 User = get_user_model()
 
 
-class BlogSerializer(serializers.ModelSerializer):
+class BlogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Blog
         fields = '__all__'
+        read_only_fields = ['comment_count', 'last_comment_at']
 
 
-class BlogCreateSerializer(serializers.ModelSerializer):
+class BlogSearchSerializer(BlogSerializer):
+    relevance = serializers.FloatField(read_only=True)
+
+
+class BlogCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Blog
         fields = ['pk', 'user', 'title', 'content',
                   'creation_date', 'last_update_date']
         read_only_fields = ['pk', 'creation_date', 'last_update_date']
+        list_serializer_class = BulkCreateListSerializer
 
 
-class BlogUpdateSerializer(serializers.ModelSerializer):
+class BlogUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Blog
         fields = ['pk', 'user', 'title', 'content',
@@ -38,21 +47,31 @@ class BlogUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = '__all__'
 
 
-class CommentCreateSerializer(serializers.ModelSerializer):
+class CommentCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ['pk', 'author', 'blog', 'content',
                   'creation_date']
         read_only_fields = ['pk', 'creation_date']
+        list_serializer_class = BulkCreateListSerializer
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            comment = super().create(validated_data)
+            Blog.objects.record_comment_added(
+                comment.blog_id,
+                comment.creation_date
+            )
+        return comment
 
 
-class CommentUpdateSerializer(serializers.ModelSerializer):
+class CommentUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ['pk', 'author', 'blog', 'content',
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from blog.models import (
+    Blog,
+    Comment
+)
+from blog.search import get_search_backend
+from services.constants import CacheKey
+from services.object_cache import invalidate_object_data
+
+
+@receiver([post_save, post_delete], sender=Blog)
+def invalidate_blog_cache(sender, instance=None, **kwargs):
+    # after the commit, a request in between would cache the old row
+    # under the new version
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: invalidate_object_data(CacheKey.BLOG_DETAIL.value, pk))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comment_cache(sender, instance=None, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: invalidate_object_data(CacheKey.COMMENT_DETAIL.value, pk))
+
+
+@receiver(post_save, sender=Blog)
+def index_blog(sender, instance=None, **kwargs):
+    transaction.on_commit(lambda: get_search_backend().index_blog(instance))
+
+
+@receiver(post_delete, sender=Blog)
+def remove_blog_from_index(sender, instance=None, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: get_search_backend().remove_blog(pk))
@@ -1,9 +1,50 @@
-from django.test import TestCase
+import csv
+import gc
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.signals import request_started
+from django.db import OperationalError, connection, connections
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from rest_framework.response import Response
+from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory, force_authenticate
-from rest_framework import status
+from rest_framework import serializers, status
 from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
 from blog.models import Blog, Comment
+from blog.search import get_search_backend
 from blog.views import BlogGenericViewSet, CommentGenericViewSet
+from services import streaming_export
+from services.constants import CacheKey
+from services.object_cache import get_object_version
+from services.pagination import KeysetCursorPagination
+from users.tokens import get_or_create_token
+from services.query_optimizer import optimize_queryset
+from WordWeaver.db_backends.connection_limit import (
+    get_connection_metrics,
+    reset_connection_metrics
+)
+from WordWeaver.db_backends.sqlite3.base import DatabaseWrapper as LimitedSQLiteWrapper
+from WordWeaver.db_routers import (
+    ReplicaRouter,
+    activate_replica,
+    deactivate_replica,
+    get_active_requests,
+    primary_reads
+)
+from WordWeaver.renderers import CustomJSONRenderer, FastCustomJSONRenderer
 
 
 User = get_user_model()
@@ -123,3 +164,994 @@ class CommentGenericViewSetTestCase(TestCase):
         force_authenticate(request, user=self.user)
         response = view(request, comment_id=self.comment.pk)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class KeysetCursorPaginationTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        for index in range(25):
+            Blog.objects.create(
+                user=self.user, title=f'Blog {index}', content='Test Content')
+        self.ordered_pks = list(Blog.objects.order_by(
+            '-creation_date', '-pk').values_list('pk', flat=True))
+
+    def get_page(self, url):
+        view = BlogGenericViewSet.as_view({'get': 'list'})
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['detail']
+
+    def test_walk_forward_and_backward(self):
+        page = self.get_page('/blogs/?pagination=cursor')
+        self.assertNotIn('count', page)
+        self.assertIsNone(page['previous'])
+        seen = [blog['id'] for blog in page['results']]
+        pages = [page]
+        while page['next']:
+            page = self.get_page(page['next'])
+            pages.append(page)
+            seen += [blog['id'] for blog in page['results']]
+        self.assertEqual(seen, self.ordered_pks)
+        self.assertEqual(len(pages), 3)
+
+        page = self.get_page(pages[-1]['previous'])
+        self.assertEqual(
+            [blog['id'] for blog in page['results']],
+            [blog['id'] for blog in pages[1]['results']]
+        )
+
+    def test_no_count_query(self):
+        view = BlogGenericViewSet.as_view({'get': 'list'})
+        request = self.factory.get('/blogs/?pagination=cursor&page_size=5')
+        force_authenticate(request, user=self.user)
+        with self.assertNumQueries(1):
+            response = view(request)
+        self.assertEqual(len(response.data['detail']['results']), 5)
+
+    def test_invalid_cursor(self):
+        view = BlogGenericViewSet.as_view({'get': 'list'})
+        request = self.factory.get('/blogs/?cursor=invalid')
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class QuerySetOptimizationTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.users = [
+            User.objects.create_user(
+                username=f'testuser{index}', email=f'test{index}@example.com',
+                password='testpassword', is_staff=True)
+            for index in range(3)
+        ]
+        for index in range(12):
+            blog = Blog.objects.create(
+                user=self.users[index % 3], title=f'Blog {index}', content='Test Content')
+            Comment.objects.create(
+                author=self.users[(index + 1) % 3], blog=blog, content='Test Comment')
+
+    def get_num_queries(self, viewset, url):
+        view = viewset.as_view({'get': 'list'})
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.users[0])
+        with CaptureQueriesContext(connection) as context:
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_constant_query_count(self):
+        for viewset, url in [
+            (BlogGenericViewSet, '/blogs/'),
+            (BlogGenericViewSet, '/blogs/?pagination=cursor&'),
+            (CommentGenericViewSet, '/comments/'),
+        ]:
+            separator = '' if url.endswith('&') else '?'
+            self.assertEqual(
+                self.get_num_queries(viewset, f'{url}{separator}page_size=2'),
+                self.get_num_queries(viewset, f'{url}{separator}page_size=10'),
+            )
+
+    def test_nested_serializer(self):
+        class AuthorSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = User
+                fields = ['id', 'username']
+
+        class BlogTitleSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Blog
+                fields = ['id', 'title']
+
+        class CommentWithAuthorSerializer(serializers.ModelSerializer):
+            author = AuthorSerializer()
+            blog = BlogTitleSerializer()
+
+            class Meta:
+                model = Comment
+                fields = ['id', 'author', 'blog', 'content']
+
+        queryset = optimize_queryset(
+            Comment.objects.all(), CommentWithAuthorSerializer)
+        with self.assertNumQueries(1):
+            data = CommentWithAuthorSerializer(queryset, many=True).data
+        self.assertEqual(len(data), 12)
+        self.assertEqual(
+            {comment['author']['username'] for comment in data},
+            {user.username for user in self.users}
+        )
+        self.assertNotIn('password', str(queryset.query))
+
+    def test_nested_many_serializer(self):
+        class CommentContentSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Comment
+                fields = ['id', 'content']
+
+        class BlogWithCommentsSerializer(serializers.ModelSerializer):
+            comments = CommentContentSerializer(many=True, source='blog_comments')
+
+            class Meta:
+                model = Blog
+                fields = ['id', 'title', 'comments']
+
+        queryset = optimize_queryset(Blog.objects.all(), BlogWithCommentsSerializer)
+        with self.assertNumQueries(2):
+            data = BlogWithCommentsSerializer(queryset, many=True).data
+        self.assertTrue(all(len(blog['comments']) == 1 for blog in data))
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    runs EXPLAIN on the querysets the list endpoints send to the database
+    and fails as soon as one of them needs a full table scan or a filesort
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword')
+        self.blog = Blog.objects.create(
+            user=self.user, title='Test Blog', content='Test Content')
+        Comment.objects.create(
+            author=self.user, blog=self.blog, content='Test Comment')
+
+    def get_queryset(self, viewset, action):
+        view = viewset()
+        view.action = action
+        view.request = Request(self.factory.get('/'))
+        view.request.user = self.user
+        view.format_kwarg = None
+        return view.filter_queryset(view.get_queryset())
+
+    def get_action_querysets(self):
+        blogs = self.get_queryset(BlogGenericViewSet, 'list')
+        user_blogs = self.get_queryset(
+            BlogGenericViewSet, 'auth_user_blogs').filter(user=self.user)
+        comments = self.get_queryset(CommentGenericViewSet, 'list')
+        user_blog_comments = self.get_queryset(
+            CommentGenericViewSet, 'auth_user_all_comments_for_specific_blog'
+        ).filter(author=self.user, blog_id=self.blog.pk)
+        blog_comments = Comment.objects.filter(blog=self.blog)
+        for queryset in [blogs, user_blogs, comments, user_blog_comments, blog_comments]:
+            yield queryset[:10]
+            yield KeysetCursorPagination.order_queryset(queryset)[:11]
+
+    def assert_no_full_scan_or_filesort(self, queryset):
+        if connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            self.assertNotIn('USE TEMP B-TREE', plan, plan)
+            for line in plan.splitlines():
+                if ' SCAN ' in f' {line} ':
+                    self.assertIn('INDEX', line, plan)
+        elif connection.vendor == 'mysql':
+            plan = queryset.explain(format='JSON')
+            self.assertNotIn('"access_type": "ALL"', plan, plan)
+            self.assertNotIn('"using_filesort": true', plan, plan)
+            self.assertNotIn('"filesort"', plan, plan)
+        else:
+            self.skipTest(f'no query plan checks for {connection.vendor}')
+
+    def test_list_query_plans(self):
+        for queryset in self.get_action_querysets():
+            with self.subTest(query=str(queryset.query)):
+                self.assert_no_full_scan_or_filesort(queryset)
+
+
+class ObjectCacheTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        self.blog = Blog.objects.create(
+            user=self.user, title='Test Blog', content='Test Content')
+        self.comment = Comment.objects.create(
+            author=self.user, blog=self.blog, content='Test Comment')
+
+    def retrieve_blog(self):
+        view = BlogGenericViewSet.as_view({'get': 'retrieve'})
+        request = self.factory.get(f'/blogs/{self.blog.pk}/')
+        force_authenticate(request, user=self.user)
+        return view(request, blog_id=self.blog.pk)
+
+    def test_retrieve_blog_cache_hit_reads_only_the_state(self):
+        self.retrieve_blog()
+        with self.assertNumQueries(1):
+            response = self.retrieve_blog()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['detail']['title'], 'Test Blog')
+
+    def test_blog_update_invalidates_cache(self):
+        self.retrieve_blog()
+        self.blog.title = 'Updated Blog Title'
+        self.blog.save()
+        response = self.retrieve_blog()
+        self.assertEqual(response.data['detail']['title'], 'Updated Blog Title')
+
+    def test_blog_cache_is_invalidated_on_commit(self):
+        prefix = CacheKey.BLOG_DETAIL.value
+        version = get_object_version(prefix, self.blog.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.save()
+            self.assertEqual(get_object_version(prefix, self.blog.pk), version)
+        self.assertNotEqual(get_object_version(prefix, self.blog.pk), version)
+
+    def test_blog_changed_without_invalidation_is_not_served_from_cache(self):
+        # another worker with its own cache saved the blog
+        self.retrieve_blog()
+        Blog.objects.filter(pk=self.blog.pk).update(
+            title='Updated Blog Title', last_update_date=datetime.now(timezone.utc))
+        response = self.retrieve_blog()
+        self.assertEqual(response.data['detail']['title'], 'Updated Blog Title')
+
+    def test_blog_delete_invalidates_cache(self):
+        self.retrieve_blog()
+        self.blog.delete()
+        response = self.retrieve_blog()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_comment_update_invalidates_cache(self):
+        view = CommentGenericViewSet.as_view({'get': 'retrieve'})
+        request = self.factory.get(f'/comments/{self.comment.pk}/')
+        force_authenticate(request, user=self.user)
+        view(request, comment_id=self.comment.pk)
+        self.comment.content = 'Updated Comment Content'
+        self.comment.save()
+        response = view(request, comment_id=self.comment.pk)
+        self.assertEqual(
+            response.data['detail']['content'], 'Updated Comment Content')
+
+
+class ConditionalResponseTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        self.blogs = [
+            Blog.objects.create(user=self.user, title=f'Blog {index}', content='Test Content')
+            for index in range(3)
+        ]
+
+    def get(self, action, url, headers=None, **kwargs):
+        view = BlogGenericViewSet.as_view({'get': action})
+        request = self.factory.get(url, headers=headers)
+        force_authenticate(request, user=self.user)
+        response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_list_not_modified(self):
+        response = self.get('list', '/blogs/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        # the count and the rows of the page, no whole table aggregate
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('list', '/blogs/', {'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('MAX(' in query['sql'] for query in queries))
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        response = self.get('list', '/blogs/?page_size=2', {'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_changes(self):
+        etag = self.get('list', '/blogs/')['ETag']
+        Comment.objects.create(author=self.user, blog=self.blogs[0], content='Test Comment')
+        Blog.objects.record_comment_added(self.blogs[0].pk, datetime.now(timezone.utc))
+        response = self.get('list', '/blogs/', {'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        self.blogs[1].delete()
+        response = self.get('list', '/blogs/', {'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['detail']['count'], 2)
+
+    def test_list_if_modified_since_is_not_evaluated(self):
+        last_modified = self.get('list', '/blogs/')['Last-Modified']
+        self.blogs[1].delete()
+        response = self.get('list', '/blogs/', {'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cursor_pages_have_no_validators(self):
+        response = self.get('list', '/blogs/?pagination=cursor')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_retrieve_not_modified(self):
+        blog = self.blogs[0]
+        response = self.get('retrieve', f'/blogs/{blog.pk}/', blog_id=blog.pk)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.get(
+                'retrieve', f'/blogs/{blog.pk}/', {'If-None-Match': etag}, blog_id=blog.pk)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(
+            response['Last-Modified'], http_date(blog.creation_date.timestamp()))
+
+        response = self.get(
+            'retrieve', f'/blogs/{blog.pk}/',
+            {'If-Modified-Since': response['Last-Modified']}, blog_id=blog.pk)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        blog.title = 'Updated Blog Title'
+        blog.save()
+        response = self.get(
+            'retrieve', f'/blogs/{blog.pk}/', {'If-None-Match': etag}, blog_id=blog.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['detail']['title'], 'Updated Blog Title')
+
+
+@override_settings(REPLICA_DATABASES=['replica_0', 'replica_1'])
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_the_activated_replica(self):
+        self.assertEqual(self.router.db_for_read(Blog), 'default')
+        activation = activate_replica()
+        alias = activation[0]
+        self.assertIn(alias, ['replica_0', 'replica_1'])
+        self.assertEqual(self.router.db_for_read(Blog), alias)
+        with primary_reads():
+            self.assertEqual(self.router.db_for_read(Blog), 'default')
+        self.assertEqual(self.router.db_for_read(Blog), alias)
+        deactivate_replica(activation)
+        self.assertEqual(self.router.db_for_read(Blog), 'default')
+        self.assertEqual(get_active_requests(alias), 0)
+
+    def test_write_pins_reads_to_primary(self):
+        activation = activate_replica()
+        self.assertEqual(self.router.db_for_write(Blog), 'default')
+        self.assertEqual(self.router.db_for_read(Comment), 'default')
+        deactivate_replica(activation)
+        activation = activate_replica()
+        self.assertEqual(self.router.db_for_read(Blog), activation[0])
+        deactivate_replica(activation)
+
+    def test_least_loaded_replica(self):
+        first = activate_replica()
+        second = activate_replica()
+        self.assertNotEqual(first[0], second[0])
+        deactivate_replica(second)
+        third = activate_replica()
+        self.assertNotEqual(first[0], third[0])
+        deactivate_replica(third)
+        deactivate_replica(first)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica_0', 'blog'))
+        self.assertIsNone(self.router.allow_migrate('default', 'blog'))
+
+
+@override_settings(REPLICA_DATABASES=['replica_test'])
+class ReplicaReadTestCase(TransactionTestCase):
+    """
+    the replica is a second connection to the test database added after the
+    test runner set the databases up, rows have to be committed for it to
+    see them
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings['replica_test'] = dict(
+            connections['default'].settings_dict)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica_test'].close()
+        del connections['replica_test']
+        del connections.settings['replica_test']
+        super().tearDownClass()
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        Blog.objects.create(user=self.user, title='Test Blog', content='Test Content')
+
+    def test_reads_from_replica_writes_to_primary(self):
+        view = BlogGenericViewSet.as_view({'get': 'list', 'post': 'create'})
+        request = self.factory.get('/blogs/')
+        force_authenticate(request, user=self.user)
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_test']) as replica:
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['detail']['count'], 1)
+        self.assertEqual(len(primary.captured_queries), 0)
+        self.assertGreater(len(replica.captured_queries), 0)
+        self.assertEqual(get_active_requests('replica_test'), 0)
+
+        request = self.factory.post(
+            '/blogs/', {'user': self.user.pk, 'title': 'New Blog', 'content': 'Test'},
+            format='json')
+        force_authenticate(request, user=self.user)
+        with CaptureQueriesContext(connections['replica_test']) as replica:
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica.captured_queries), 0)
+
+    def test_retrieve_reads_from_primary(self):
+        blog = Blog.objects.get()
+        view = BlogGenericViewSet.as_view({'get': 'retrieve'})
+        request = self.factory.get(f'/blogs/{blog.pk}/')
+        force_authenticate(request, user=self.user)
+        with mock.patch('WordWeaver.db_routers.activate_replica') as activate, \
+                CaptureQueriesContext(connections['replica_test']) as replica:
+            response = view(request, blog_id=blog.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        activate.assert_not_called()
+        self.assertEqual(len(replica.captured_queries), 0)
+
+    def test_authentication_reads_from_primary(self):
+        cache.clear()
+        token = get_or_create_token(self.user)
+        view = BlogGenericViewSet.as_view({'get': 'list'})
+        request = self.factory.get('/blogs/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_test']) as replica:
+            response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(any(
+            'authtoken_token' in query['sql'] for query in primary.captured_queries))
+        self.assertFalse(any(
+            'authtoken_token' in query['sql'] for query in replica.captured_queries))
+        self.assertEqual(response.data['detail']['count'], 1)
+
+
+@override_settings(DB_MAX_CONNECTIONS_PER_WORKER=1, DB_CONNECTION_WAIT_TIMEOUT=0.01)
+class ConnectionLimitTestCase(TestCase):
+    def setUp(self):
+        reset_connection_metrics()
+
+    def get_wrapper(self, **settings_dict):
+        return LimitedSQLiteWrapper({
+            **connections['default'].settings_dict,
+            'NAME': ':memory:',
+            'CONN_MAX_AGE': 60,
+            **settings_dict
+        }, alias='limit_test')
+
+    def test_connections_per_worker_are_capped(self):
+        first, second = self.get_wrapper(), self.get_wrapper()
+        first.ensure_connection()
+        with self.assertRaises(OperationalError):
+            second.ensure_connection()
+        # in memory sqlite connections are never closed by close()
+        first._close()
+        second.ensure_connection()
+        # a wrapper is a reference cycle, the slot comes back on collection
+        del second
+        gc.collect()
+        third = self.get_wrapper()
+        third.ensure_connection()
+        third._close()
+        metrics = get_connection_metrics()['limit_test']
+        self.assertEqual(metrics['opened'], 3)
+        self.assertEqual(metrics['wait_timeouts'], 1)
+
+    def test_reuse_rate(self):
+        wrapper = self.get_wrapper()
+        connections.settings['limit_test'] = wrapper.settings_dict
+        connections['limit_test'] = wrapper
+        try:
+            for _ in range(4):
+                request_started.send(sender=self.__class__)
+                wrapper.ensure_connection()
+                wrapper.ensure_connection()
+        finally:
+            wrapper._close()
+            del connections['limit_test']
+            del connections.settings['limit_test']
+        metrics = get_connection_metrics()['limit_test']
+        self.assertEqual(metrics['checkouts'], 4)
+        self.assertEqual(metrics['opened'], 1)
+        self.assertEqual(metrics['reuse_rate'], 0.75)
+
+
+class AsyncViewSetTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        self.other_user = User.objects.create_user(
+            username='otheruser', email='other@example.com', password='testpassword')
+        for index in range(15):
+            blog = Blog.objects.create(
+                user=self.user if index % 3 else self.other_user,
+                title=f'Blog {index}', content='Test Content')
+            Comment.objects.create(
+                author=self.user, blog=blog, content=f'Comment {index}')
+        self.blog = blog
+        self.comment = Comment.objects.filter(blog=blog).get()
+        self.headers = {
+            'Authorization': f'Token {get_or_create_token(self.user).key}'
+        }
+
+    async def test_blog_list(self):
+        response = await self.async_client.get(
+            reverse('async-blog-list'), {'page_size': 4}, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()['data']
+        self.assertEqual(data['count'], 15)
+        self.assertEqual(len(data['results']), 4)
+
+    async def test_blog_list_cursor_pagination(self):
+        response = await self.async_client.get(
+            reverse('async-blog-list'), {'pagination': 'cursor', 'page_size': 10},
+            headers=self.headers)
+        page = response.json()['data']
+        response = await self.async_client.get(page['next'], headers=self.headers)
+        next_page = response.json()['data']
+        self.assertEqual(len(page['results'] + next_page['results']), 15)
+        self.assertIsNone(next_page['next'])
+
+    async def test_blog_retrieve(self):
+        url = reverse('async-blog-detail', kwargs={'blog_id': self.blog.pk})
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['title'], self.blog.title)
+
+        url = reverse('async-blog-detail', kwargs={'blog_id': 0})
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_auth_user_blogs(self):
+        response = await self.async_client.get(
+            reverse('async-blog-auth-user-blogs'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['count'], 10)
+
+    async def test_comment_list_and_retrieve(self):
+        response = await self.async_client.get(
+            reverse('async-comment-list'), headers=self.headers)
+        self.assertEqual(response.json()['data']['count'], 15)
+
+        url = reverse('async-comment-detail', kwargs={'comment_id': self.comment.pk})
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['content'], self.comment.content)
+
+    async def test_permissions(self):
+        response = await self.async_client.get(reverse('async-blog-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        token, _ = await Token.objects.aget_or_create(user=self.other_user)
+        response = await self.async_client.get(
+            reverse('async-blog-list'),
+            headers={'Authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = await self.async_client.get(
+            reverse('async-blog-list'), headers={'Authorization': 'Token invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FastCustomJSONRendererTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        for index in range(15):
+            Blog.objects.create(
+                user=self.user, title=f'ব্লগ {index}',
+                content='Test Content\u2028with separators\u2029')
+
+    def assert_same_rendering(self, data, renderer_context):
+        self.assertEqual(
+            FastCustomJSONRenderer().render(
+                data, 'application/json', renderer_context),
+            CustomJSONRenderer().render(
+                data, 'application/json', renderer_context)
+        )
+
+    def test_blog_page_rendering(self):
+        view = BlogGenericViewSet.as_view({'get': 'list'})
+        request = self.factory.get('/blogs/')
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        self.assert_same_rendering(response.data, {'response': response})
+
+    def test_native_types_rendering(self):
+        response = Response(status=status.HTTP_400_BAD_REQUEST)
+        data = {
+            'detail': {
+                'utc': datetime(2024, 4, 7, 15, 46, 1, 123456, tzinfo=timezone.utc),
+                'dhaka': datetime(2024, 4, 7, 21, 46, tzinfo=ZoneInfo('Asia/Dhaka')),
+                'date': date(2024, 4, 7),
+                'decimal': Decimal('10.50'),
+                'uuid': uuid4(),
+                'lazy': gettext_lazy('blog title'),
+                1: 'non string key',
+            },
+            'message': gettext_lazy('blog retrieval failed'),
+        }
+        self.assert_same_rendering(data, {'response': response})
+
+    def test_indented_rendering_falls_back(self):
+        response = Response()
+        data = {'detail': {'title': 'Test Blog'}, 'message': ''}
+        self.assertEqual(
+            FastCustomJSONRenderer().render(
+                data, 'application/json; indent=4', {'response': response}),
+            CustomJSONRenderer().render(
+                data, 'application/json; indent=4', {'response': response})
+        )
+
+
+class CommentCounterTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword')
+        self.blog = Blog.objects.create(
+            user=self.user, title='Test Blog', content='Test Content')
+
+    def create_comment(self, content):
+        view = CommentGenericViewSet.as_view({'post': 'create'})
+        data = {'author': self.user.id, 'blog': self.blog.id, 'content': content}
+        request = self.factory.post('/comments/', data)
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Comment.objects.get(pk=response.data['detail']['pk'])
+
+    def test_counters_follow_create_and_destroy(self):
+        first = self.create_comment('First Comment')
+        second = self.create_comment('Second Comment')
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comment_count, 2)
+        self.assertEqual(self.blog.last_comment_at, second.creation_date)
+
+        view = CommentGenericViewSet.as_view({'delete': 'destroy'})
+        request = self.factory.delete(f'/comments/{second.pk}/')
+        force_authenticate(request, user=self.user)
+        response = view(request, comment_id=second.pk)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comment_count, 1)
+        self.assertEqual(self.blog.last_comment_at, first.creation_date)
+
+    def test_counter_update_invalidates_blog_on_commit(self):
+        prefix = CacheKey.BLOG_DETAIL.value
+        version = get_object_version(prefix, self.blog.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Blog.objects.record_comment_added(self.blog.pk, datetime.now(timezone.utc))
+            self.assertEqual(get_object_version(prefix, self.blog.pk), version)
+        self.assertNotEqual(get_object_version(prefix, self.blog.pk), version)
+
+    def test_counters_exposed_in_blog_serializer(self):
+        self.create_comment('First Comment')
+        self.user.is_staff = True
+        view = BlogGenericViewSet.as_view({'get': 'retrieve'})
+        request = self.factory.get(f'/blogs/{self.blog.pk}/')
+        force_authenticate(request, user=self.user)
+        response = view(request, blog_id=self.blog.pk)
+        self.assertEqual(response.data['detail']['comment_count'], 1)
+        self.assertIsNotNone(response.data['detail']['last_comment_at'])
+
+    def test_recompute_command_repairs_drift(self):
+        comment = Comment.objects.create(
+            author=self.user, blog=self.blog, content='Test Comment')
+        Blog.objects.filter(pk=self.blog.pk).update(comment_count=7)
+        call_command('recompute_blog_comment_counters',
+                     batch_size=1, stdout=StringIO())
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comment_count, 1)
+        self.assertEqual(self.blog.last_comment_at, comment.creation_date)
+
+
+class BulkCreateTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword')
+        self.blog = Blog.objects.create(
+            user=self.user, title='Test Blog', content='Test Content')
+
+    def bulk_create(self, viewset, data, url='/bulk/'):
+        view = viewset.as_view({'post': 'bulk'})
+        request = self.factory.post(url, data, format='json')
+        force_authenticate(request, user=self.user)
+        return view(request)
+
+    def test_bulk_create_blogs(self):
+        data = [{'user': self.user.id, 'title': f'Blog {index}', 'content': 'Content'}
+                for index in range(5)]
+        response = self.bulk_create(BlogGenericViewSet, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['detail']), 5)
+        self.assertEqual(Blog.objects.count(), 6)
+
+    def test_bulk_create_comments_in_batches(self):
+        data = [{'author': self.user.id, 'blog': self.blog.id, 'content': f'Comment {index}'}
+                for index in range(50)]
+        with self.assertNumQueries(10):
+            response = self.bulk_create(
+                CommentGenericViewSet, data, '/bulk/?batch_size=10')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.filter(blog=self.blog).count(), 50)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comment_count, 50)
+
+    def test_bulk_create_reports_per_item_errors(self):
+        data = [
+            {'author': self.user.id, 'blog': self.blog.id, 'content': 'Valid Comment'},
+            {'author': self.user.id, 'blog': 0, 'content': 'Unknown Blog'},
+            {'author': self.user.id, 'blog': self.blog.id},
+        ]
+        response = self.bulk_create(CommentGenericViewSet, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data['detail']
+        self.assertEqual(errors[0], {})
+        self.assertIn('blog', errors[1])
+        self.assertIn('content', errors[2])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_bulk_create_sets_pks_without_returning_rows(self):
+        data = [{'author': self.user.id, 'blog': self.blog.id, 'content': f'Comment {index}'}
+                for index in range(25)]
+        # MySQL
+        with mock.patch.object(
+                type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.bulk_create(
+                CommentGenericViewSet, data, '/bulk/?batch_size=10')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            [item['pk'] for item in response.data['detail']],
+            list(Comment.objects.order_by('pk').values_list('pk', flat=True))
+        )
+        self.assertEqual(
+            {item['pk']: item['content'] for item in response.data['detail']},
+            dict(Comment.objects.values_list('pk', 'content'))
+        )
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.comment_count, 25)
+
+    def test_bulk_create_filters_unknown_kwargs(self):
+        comments = Comment.objects.bulk_create_from_kwargs([
+            {'author': self.user, 'blog': self.blog, 'content': 'Comment',
+             'unknown': 'dropped'}
+        ])
+        self.assertEqual(len(comments), 1)
+        self.assertEqual(Comment.objects.get().content, 'Comment')
+
+
+@override_settings(EXPORT_CHUNK_SIZE=4)
+class StreamingExportTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        self.blog = Blog.objects.create(
+            user=self.user, title='Test Blog', content='Test Content')
+        Comment.objects.bulk_create_from_kwargs([
+            {'author': self.user, 'blog': self.blog, 'content': f'Comment {index}'}
+            for index in range(10)
+        ])
+
+    def export(self, url):
+        view = CommentGenericViewSet.as_view({'get': 'export'})
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user)
+        return view(request)
+
+    def test_ndjson_export_in_list_order(self):
+        response = self.export('/comments/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        with self.assertNumQueries(3):
+            rows = [json.loads(line) for line in
+                    b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            list(Comment.objects.order_by(
+                '-creation_date', '-pk').values_list('pk', flat=True))
+        )
+
+    def test_csv_export(self):
+        response = self.export('/comments/export/?export_format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(
+            b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['blog'], str(self.blog.pk))
+
+    def test_export_streams_chunk_by_chunk_under_asgi(self):
+        fetched = []
+        fetch_chunks = streaming_export.iterate_in_chunks
+
+        def iterate_in_chunks(queryset, chunk_size):
+            for chunk in fetch_chunks(queryset, chunk_size):
+                fetched.append(chunk)
+                yield chunk
+
+        async def read_chunks(response):
+            # the chunks fetched so far after every chunk sent, nothing is
+            # read ahead
+            return [
+                (len(chunk.splitlines()), len(fetched))
+                async for chunk in response
+            ]
+
+        view = CommentGenericViewSet.as_view({'get': 'export'})
+        request = AsyncRequestFactory().get('/comments/export/')
+        force_authenticate(request, user=self.user)
+        with mock.patch(
+                'services.streaming_export.iterate_in_chunks', iterate_in_chunks):
+            response = view(request)
+            self.assertTrue(response.is_async)
+            chunks = async_to_sync(read_chunks)(response)
+        self.assertEqual(chunks, [(4, 1), (4, 2), (2, 3)])
+
+    def test_invalid_export_format(self):
+        response = self.export('/comments/export/?export_format=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BlogSearchTestCase(TestCase):
+    def setUp(self):
+        get_search_backend().reset()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+            is_staff=True)
+        self.weaving = Blog.objects.create(
+            user=self.user, title='Weaving words',
+            content='Weaving words into stories, weaving stories into words')
+        self.mention = Blog.objects.create(
+            user=self.user, title='Gardening',
+            content='A note about tomatoes and one mention of weaving')
+        Blog.objects.create(
+            user=self.user, title='Cooking', content='Rice and lentils')
+
+    def search(self, url):
+        view = BlogGenericViewSet.as_view({'get': 'search'})
+        request = self.factory.get(url)
+        force_authenticate(request, user=self.user)
+        return view(request)
+
+    def test_search_ranks_by_relevance(self):
+        response = self.search('/blogs/search/?q=weaving')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['detail']['results']
+        self.assertEqual(
+            [blog['id'] for blog in results],
+            [self.weaving.pk, self.mention.pk]
+        )
+        self.assertGreater(results[0]['relevance'], results[1]['relevance'])
+        self.assertEqual(response.data['detail']['count'], 2)
+
+    def test_search_does_not_scan_content_with_like(self):
+        self.search('/blogs/search/?q=tomatoes')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.search('/blogs/search/?q=tomatoes')
+        self.assertEqual(
+            [blog['id'] for blog in response.data['detail']['results']],
+            [self.mention.pk]
+        )
+        for query in queries.captured_queries:
+            self.assertNotIn('LIKE', query['sql'])
+
+    def test_index_follows_updates(self):
+        self.search('/blogs/search/?q=weaving')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mention.content = 'A note about tomatoes'
+            self.mention.save()
+        response = self.search('/blogs/search/?q=weaving')
+        self.assertEqual(
+            [blog['id'] for blog in response.data['detail']['results']],
+            [self.weaving.pk]
+        )
+
+    def test_search_requires_query(self):
+        response = self.search('/blogs/search/?q=')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_is_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.search('/blogs/search/?q=weaving')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SeedDataTestCase(TestCase):
+    def seed(self, prefix, **kwargs):
+        options = {
+            'users': 20, 'blogs': 50, 'comments': 500, 'seed': 3, 'batch_size': 64,
+            'until': '2024-06-01T00:00:00Z', 'username_prefix': prefix,
+        }
+        options.update(kwargs)
+        call_command('seed_data', stdout=StringIO(), **options)
+
+    def get_seeded(self, prefix):
+        # usernames without the prefix, so two runs can be compared
+        def name(username):
+            return username[len(prefix):]
+
+        users = User.objects.filter(username__startswith=prefix)
+        blogs = [
+            (name(username), title, creation_date)
+            for username, title, creation_date in Blog.objects.filter(
+                user__in=users).order_by('pk').values_list(
+                'user__username', 'title', 'creation_date')
+        ]
+        comments = [
+            (name(username), blog_title, content, creation_date)
+            for username, blog_title, content, creation_date in Comment.objects.filter(
+                author__in=users).order_by('pk').values_list(
+                'author__username', 'blog__title', 'content', 'creation_date')
+        ]
+        return blogs, comments
+
+    def test_seed_data(self):
+        self.seed('seed_user_', staff_username='seed_staff')
+        users = User.objects.filter(username__startswith='seed_user')
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(Token.objects.filter(user__in=users).count(), 20)
+        self.assertTrue(Token.objects.filter(user__username='seed_staff', user__is_staff=True).exists())
+        self.assertEqual(Blog.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 500)
+        self.assertTrue(users.first().check_password('seed@word_weaver'))
+
+        counts = sorted(Blog.objects.values_list('comment_count', flat=True), reverse=True)
+        self.assertEqual(sum(counts), 500)
+        # hot blogs, the hottest has several times the average
+        self.assertGreater(counts[0], 5 * 500 / 50)
+
+        until = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        for comment in Comment.objects.select_related('blog'):
+            self.assertLessEqual(comment.blog.creation_date, comment.creation_date)
+            self.assertLessEqual(comment.creation_date, until)
+
+    def test_seed_data_is_deterministic(self):
+        self.seed('first_')
+        self.seed('second_')
+        self.assertEqual(self.get_seeded('first_'), self.get_seeded('second_'))
+
+    def test_seed_data_refuses_existing_prefix(self):
+        self.seed('seed_', comments=0)
+        with self.assertRaises(CommandError):
+            self.seed('seed_')
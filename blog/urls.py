@@ -2,7 +2,9 @@ from django.urls import path, include
 from rest_framework import routers
 from .views import (
     BlogGenericViewSet,
-    CommentGenericViewSet
+    CommentGenericViewSet,
+    BlogAsyncViewSet,
+    CommentAsyncViewSet
 )
 
 blog_router = routers.DefaultRouter()
@@ -11,8 +13,37 @@ blog_router.register('', BlogGenericViewSet, 'blog')
 comment_router = routers.DefaultRouter()
 comment_router.register('', CommentGenericViewSet, 'comment')
 
+async_urlpatterns = [
+    path(
+        'blogs/',
+        BlogAsyncViewSet.as_view({'get': 'list'}),
+        name='async-blog-list'
+    ),
+    path(
+        'blogs/auth-user-blogs/',
+        BlogAsyncViewSet.as_view({'get': 'auth_user_blogs'}),
+        name='async-blog-auth-user-blogs'
+    ),
+    path(
+        'blogs/<str:blog_id>/',
+        BlogAsyncViewSet.as_view({'get': 'retrieve'}),
+        name='async-blog-detail'
+    ),
+    path(
+        'comments/',
+        CommentAsyncViewSet.as_view({'get': 'list'}),
+        name='async-comment-list'
+    ),
+    path(
+        'comments/<str:comment_id>/',
+        CommentAsyncViewSet.as_view({'get': 'retrieve'}),
+        name='async-comment-detail'
+    ),
+]
+
 
 urlpatterns = [
     path('blogs/', include(blog_router.urls)),
-    path('comments/', include(comment_router.urls))
+    path('comments/', include(comment_router.urls)),
+    path('async/', include(async_urlpatterns))
 ]
@@ -1,2 +1,3 @@
 from .blog_views import *
 from .comment_views import *
+from .async_views import *
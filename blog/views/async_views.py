@@ -0,0 +1,139 @@
+from django.core.exceptions import MultipleObjectsReturned
+from django.utils.translation import gettext_lazy as _
+from django.http import Http404
+from rest_framework.response import Response
+
+from services.async_views import AsyncViewSetMixin
+from services.customize_response import customize_response
+from services.exception_handler import exception_handler
+from services.constants import ErrorTypes
+from .blog_views import BlogGenericViewSet
+from .comment_views import CommentGenericViewSet
+
+
+class BlogAsyncViewSet(AsyncViewSetMixin, BlogGenericViewSet):
+    """
+    async versions of the read endpoints of BlogGenericViewSet, served
+    under async/ when the project runs under ASGI
+    """
+
+    async def list(self, request, *args, **kwargs):
+        """
+        list of all blogs
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            validators = self.get_list_validators(page)
+            not_modified = self.get_not_modified_response(
+                *validators, evaluate_last_modified=False)
+            if not_modified is not None:
+                return not_modified
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            return self.set_validators(
+                customize_response(response, _('list of all blogs')),
+                *validators
+            )
+        serializer = self.get_serializer([blog async for blog in queryset], many=True)
+        return customize_response(Response(serializer.data), _('list of all blogs'))
+
+    async def retrieve(self, request, *args, **kwargs):
+        """
+        retrieve a blog by blog pk
+        """
+        validators = await self.aget_object_validators()
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+        try:
+            response = Response(await self.aget_cached_object_data())
+            return self.set_validators(
+                customize_response(response, _('blog details with this pk')),
+                *validators
+            )
+        except Http404 as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('blog retrieval failed'),
+                error_type=ErrorTypes.OBJECT_DOES_NOT_EXIST.value
+            )
+        except MultipleObjectsReturned as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('Multiple blog returned for same blog pk'),
+                error_type=ErrorTypes.MULTIPLE_OBJECT_RETURNED.value
+            )
+
+    async def auth_user_blogs(self, request, *args, **kwargs):
+        """
+        list of all blog posts for the authenticated user
+        """
+        queryset = self.filter_queryset(
+            self.get_queryset()).filter(user=request.user)
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            return customize_response(
+                response,
+                'list of all rewards for the authenticated user'
+            )
+        serializer = self.get_serializer([blog async for blog in queryset], many=True)
+        response = Response(serializer.data)
+        return customize_response(response, 'list of all rewards for the authenticated user')
+
+
+class CommentAsyncViewSet(AsyncViewSetMixin, CommentGenericViewSet):
+    """
+    async versions of the read endpoints of CommentGenericViewSet, served
+    under async/ when the project runs under ASGI
+    """
+
+    async def list(self, request, *args, **kwargs):
+        """
+        list of all comments
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            validators = self.get_list_validators(page)
+            not_modified = self.get_not_modified_response(
+                *validators, evaluate_last_modified=False)
+            if not_modified is not None:
+                return not_modified
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            return self.set_validators(
+                customize_response(response, _('list of all comments')),
+                *validators
+            )
+        serializer = self.get_serializer([comment async for comment in queryset], many=True)
+        return customize_response(Response(serializer.data), _('list of all comments'))
+
+    async def retrieve(self, request, *args, **kwargs):
+        """
+        retrieve a comment by comment pk
+        """
+        validators = await self.aget_object_validators()
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+        try:
+            response = Response(await self.aget_cached_object_data())
+            return self.set_validators(
+                customize_response(response, _('comment details with this pk')),
+                *validators
+            )
+        except Http404 as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('comment retrieval failed'),
+                error_type=ErrorTypes.OBJECT_DOES_NOT_EXIST.value
+            )
+        except MultipleObjectsReturned as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('Multiple comment returned for same blog pk'),
+                error_type=ErrorTypes.MULTIPLE_OBJECT_RETURNED.value
+            )
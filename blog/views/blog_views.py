@@ -1,6 +1,8 @@
 from django.core.exceptions import MultipleObjectsReturned
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
 from django.http import Http404
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
@@ -9,12 +11,23 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 from rest_framework import status
 
-from services.pagination import CustomPageNumberPagination
+from services.bulk import get_bulk_batch_size
+from services.streaming_export import streaming_export_response
+from services.pagination import (
+    CustomPageNumberPagination,
+    PaginationModeMixin
+)
 from services.customize_response import customize_response
 from services.exception_handler import exception_handler
-from services.constants import ErrorTypes
+from services.constants import ErrorTypes, CacheKey
+from services.object_cache import ObjectCacheMixin
+from services.conditional import ConditionalResponseMixin
+from WordWeaver.db_routers import ReplicaReadMixin
+from services.query_optimizer import QuerySetOptimizationMixin
+from ..search import get_search_backend
 from ..serializers import (
     BlogSerializer,
+    BlogSearchSerializer,
     BlogCreateSerializer,
     BlogUpdateSerializer,
 )
@@ -31,7 +44,14 @@ from blog.models import (
 User = get_user_model()
 
 
-class BlogGenericViewSet(GenericViewSet):
+class BlogGenericViewSet(
+    ReplicaReadMixin,
+    QuerySetOptimizationMixin,
+    ConditionalResponseMixin,
+    PaginationModeMixin,
+    ObjectCacheMixin,
+    GenericViewSet
+):
     queryset = Blog.objects.all()
     pagination_class = CustomPageNumberPagination
     search_fields = ['=user']
@@ -39,6 +59,13 @@ class BlogGenericViewSet(GenericViewSet):
     ordering = ['-creation_date']
     lookup_field = 'pk'
     lookup_url_kwarg = 'blog_id'
+    object_cache_prefix = CacheKey.BLOG_DETAIL.value
+    object_state_fields = [
+        'creation_date', 'last_update_date', 'comment_count', 'last_comment_at'
+    ]
+    replica_read_actions = ['list', 'auth_user_blogs', 'search']
+    optimized_actions = ['list', 'retrieve', 'auth_user_blogs', 'search', 'export']
+    cursor_pagination_actions = ['list', 'auth_user_blogs']
 
     def list(self, request, *args, **kwargs):
         """
@@ -47,11 +74,16 @@ class BlogGenericViewSet(GenericViewSet):
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         if page is not None:
+            validators = self.get_list_validators(page)
+            not_modified = self.get_not_modified_response(
+                *validators, evaluate_last_modified=False)
+            if not_modified is not None:
+                return not_modified
             serializer = self.get_serializer(page, many=True)
             response = self.get_paginated_response(serializer.data)
-            return customize_response(
-                response,
-                _('list of all blogs')
+            return self.set_validators(
+                customize_response(response, _('list of all blogs')),
+                *validators
             )
 
     def create(self, request, *args, **kwargs):
@@ -78,11 +110,16 @@ class BlogGenericViewSet(GenericViewSet):
         """
         retrieve a blog by blog pk
         """
+        validators = self.get_object_validators()
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
         try:
-            user = self.get_object()
-            serializer = self.get_serializer(user)
-            response = Response(serializer.data)
-            return customize_response(response, _('blog details with this pk'))
+            response = Response(self.get_cached_object_data())
+            return self.set_validators(
+                customize_response(response, _('blog details with this pk')),
+                *validators
+            )
         except Http404 as excpt:
             return exception_handler(
                 exc=excpt,
@@ -180,11 +217,87 @@ class BlogGenericViewSet(GenericViewSet):
         response = Response(serializer.data)
         return customize_response(response, 'list of all rewards for the authenticated user')
 
+    @action(methods=['post'], detail=False, url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        create blogs in bulk, pass a list of blogs as payload and optionally batch_size in query param
+        """
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.BULK_CREATE_MAX_ITEMS
+        )
+        serializer.context['batch_size'] = get_bulk_batch_size(request)
+        try:
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                serializer.save()
+            response = Response(
+                data=serializer.data,
+                status=status.HTTP_201_CREATED
+            )
+            return customize_response(response, _('New blogs created successfully'))
+        except ValidationError as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('New blogs creation failed'),
+                error_type=ErrorTypes.FORM_FIELD_ERROR.value
+            )
+
+    @action(methods=['get'], detail=False, url_path='export')
+    def export(self, request, *args, **kwargs):
+        """
+        stream all blogs as ndjson or csv, pass export_format=ndjson or export_format=csv in query param
+        """
+        try:
+            return streaming_export_response(
+                request,
+                self.filter_queryset(self.get_queryset()),
+                self.get_serializer_class(),
+                request.query_params.get('export_format', 'ndjson'),
+                'blogs'
+            )
+        except ValidationError as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('blogs export failed'),
+                error_type=ErrorTypes.FORM_FIELD_ERROR.value
+            )
+
+    @action(methods=['get'], detail=False, url_path='search')
+    def search(self, request, *args, **kwargs):
+        """
+        full text search over blog title and content ranked by relevance, pass the search text as q in query param
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return exception_handler(
+                exc=ValidationError({'q': _('search text must be provided')}),
+                message=_('blog search failed'),
+                error_type=ErrorTypes.FORM_FIELD_ERROR.value
+            )
+        queryset = get_search_backend().search(
+            self.filter_queryset(self.get_queryset()),
+            query
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            return customize_response(
+                response,
+                _('list of blogs matching the search text')
+            )
+        serializer = self.get_serializer(queryset, many=True)
+        response = Response(serializer.data)
+        return customize_response(response, _('list of blogs matching the search text'))
+
     def get_permissions(self):
         permission_classes = [IsAuthenticated]
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'search', 'export']:
             permission_classes += [CustomIsAdminUser]
-        elif self.action == 'create':
+        elif self.action in ['create', 'bulk']:
             permission_classes = [IsAuthenticated]
         elif self.action in ['update', 'partial_update', 'destroy']:
             permission_classes += [IsBlogPostOwner]
@@ -195,9 +308,11 @@ class BlogGenericViewSet(GenericViewSet):
         Returns the serializer class that this view requires based on
         different action
         """
-        if self.action in ['list', 'retrieve', 'auth_user_blogs']:
+        if self.action in ['list', 'retrieve', 'auth_user_blogs', 'export']:
             return BlogSerializer
-        elif self.action == 'create':
+        elif self.action == 'search':
+            return BlogSearchSerializer
+        elif self.action in ['create', 'bulk']:
             return BlogCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return BlogUpdateSerializer
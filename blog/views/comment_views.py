@@ -1,6 +1,8 @@
 from django.core.exceptions import MultipleObjectsReturned
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
 from django.http import Http404
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
@@ -9,10 +11,19 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 from rest_framework import status
 
-from services.pagination import CustomPageNumberPagination
+from services.bulk import get_bulk_batch_size
+from services.streaming_export import streaming_export_response
+from services.pagination import (
+    CustomPageNumberPagination,
+    PaginationModeMixin
+)
 from services.customize_response import customize_response
 from services.exception_handler import exception_handler
-from services.constants import ErrorTypes
+from services.constants import ErrorTypes, CacheKey
+from services.object_cache import ObjectCacheMixin
+from services.conditional import ConditionalResponseMixin
+from WordWeaver.db_routers import ReplicaReadMixin
+from services.query_optimizer import QuerySetOptimizationMixin
 from ..serializers import (
     CommentSerializer,
     CommentCreateSerializer,
@@ -25,13 +36,21 @@ from users.permissions import (
     CustomIsAdminUser
 )
 from blog.models import (
+    Blog,
     Comment
 )
 
 User = get_user_model()
 
 
-class CommentGenericViewSet(GenericViewSet):
+class CommentGenericViewSet(
+    ReplicaReadMixin,
+    QuerySetOptimizationMixin,
+    ConditionalResponseMixin,
+    PaginationModeMixin,
+    ObjectCacheMixin,
+    GenericViewSet
+):
     queryset = Comment.objects.all()
     pagination_class = CustomPageNumberPagination
     search_fields = ['=author']
@@ -39,6 +58,17 @@ class CommentGenericViewSet(GenericViewSet):
     ordering = ['-creation_date']
     lookup_field = 'pk'
     lookup_url_kwarg = 'comment_id'
+    object_cache_prefix = CacheKey.COMMENT_DETAIL.value
+    replica_read_actions = [
+        'list',
+        'auth_user_all_comments_for_specific_blog',
+    ]
+    optimized_actions = [
+        'list',
+        'retrieve',
+        'auth_user_all_comments_for_specific_blog',
+        'export',
+    ]
 
     def list(self, request, *args, **kwargs):
         """
@@ -47,11 +77,16 @@ class CommentGenericViewSet(GenericViewSet):
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         if page is not None:
+            validators = self.get_list_validators(page)
+            not_modified = self.get_not_modified_response(
+                *validators, evaluate_last_modified=False)
+            if not_modified is not None:
+                return not_modified
             serializer = self.get_serializer(page, many=True)
             response = self.get_paginated_response(serializer.data)
-            return customize_response(
-                response,
-                _('list of all comments')
+            return self.set_validators(
+                customize_response(response, _('list of all comments')),
+                *validators
             )
 
     def create(self, request, *args, **kwargs):
@@ -78,11 +113,16 @@ class CommentGenericViewSet(GenericViewSet):
         """
         retrieve a comment by comment pk
         """
+        validators = self.get_object_validators()
+        not_modified = self.get_not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
         try:
-            user = self.get_object()
-            serializer = self.get_serializer(user)
-            response = Response(serializer.data)
-            return customize_response(response, _('comment details with this pk'))
+            response = Response(self.get_cached_object_data())
+            return self.set_validators(
+                customize_response(response, _('comment details with this pk')),
+                *validators
+            )
         except Http404 as excpt:
             return exception_handler(
                 exc=excpt,
@@ -150,8 +190,10 @@ class CommentGenericViewSet(GenericViewSet):
         delete a comment
         """
         try:
-            user = self.get_object()
-            user.delete()
+            comment = self.get_object()
+            with transaction.atomic():
+                comment.delete()
+                Blog.objects.record_comment_removed(comment.blog_id)
             response = Response(status=status.HTTP_204_NO_CONTENT)
             return customize_response(response, _('comment Delete Successful'))
         except Http404 as excpt:
@@ -180,11 +222,59 @@ class CommentGenericViewSet(GenericViewSet):
         response = Response(serializer.data)
         return customize_response(response, 'list of all comments on a specific blog post for the authenticated user')
 
+    @action(methods=['post'], detail=False, url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        create comments in bulk, pass a list of comments as payload and optionally batch_size in query param
+        """
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.BULK_CREATE_MAX_ITEMS
+        )
+        serializer.context['batch_size'] = get_bulk_batch_size(request)
+        try:
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                serializer.save()
+            response = Response(
+                data=serializer.data,
+                status=status.HTTP_201_CREATED
+            )
+            return customize_response(response, _('New comments created successfully'))
+        except ValidationError as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('New comments creation failed'),
+                error_type=ErrorTypes.FORM_FIELD_ERROR.value
+            )
+
+    @action(methods=['get'], detail=False, url_path='export')
+    def export(self, request, *args, **kwargs):
+        """
+        stream all comments as ndjson or csv, pass export_format=ndjson or export_format=csv in query param
+        """
+        try:
+            return streaming_export_response(
+                request,
+                self.filter_queryset(self.get_queryset()),
+                self.get_serializer_class(),
+                request.query_params.get('export_format', 'ndjson'),
+                'comments'
+            )
+        except ValidationError as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('comments export failed'),
+                error_type=ErrorTypes.FORM_FIELD_ERROR.value
+            )
+
     def get_permissions(self):
         permission_classes = [IsAuthenticated]
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'export']:
             permission_classes += [CustomIsAdminUser]
-        elif self.action == 'create':
+        elif self.action in ['create', 'bulk']:
             permission_classes = [IsAuthenticated]
         elif self.action in ['update', 'partial_update', 'destroy']:
             permission_classes += [IsCommentOwner]
@@ -195,9 +285,9 @@ class CommentGenericViewSet(GenericViewSet):
         Returns the serializer class that this view requires based on
         different action
         """
-        if self.action in ['list', 'retrieve', 'auth_user_all_comments_for_specific_blog']:
+        if self.action in ['list', 'retrieve', 'auth_user_all_comments_for_specific_blog', 'export']:
             return CommentSerializer
-        elif self.action == 'create':
+        elif self.action in ['create', 'bulk']:
             return CommentCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return CommentUpdateSerializer
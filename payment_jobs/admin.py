@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import PaymentJob
+
+
+@admin.register(PaymentJob)
+class PaymentJobAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'user', 'kind', 'ref_id', 'status', 'attempts',
+                    'run_after', 'creation_date']
+    list_filter = ['kind', 'status']
+    search_fields = ['=ref_id']
@@ -0,0 +1,39 @@
+def is_bill_paid(bill_status):
+    # the bill status carries the is_bll_pd flag of the fetch bill response
+    bill_information = bill_status.get('bllr_inf') or bill_status.get('bll_inf') or {}
+    return bill_information.get('is_bll_pd') == 'Y'
+
+
+def pay_bill(job):
+    # payment_processor_manager needs the payment processor configuration,
+    # only the worker imports it
+    from services.payment_processor_manager import (
+        PaymentProcessorCheckBillStatus,
+        PaymentProcessorPayBill
+    )
+
+    if job.attempts > 1:
+        # an earlier attempt may have been paid before it failed, the
+        # transaction is checked instead of paying the bill twice
+        bill_status = PaymentProcessorCheckBillStatus.check_bill_status(
+            ref_id=job.ref_id,
+            trx_id=job.trx_id,
+            bllr_id=job.payload['bllr_inf'].get('bllr_id')
+        )
+        if is_bill_paid(bill_status):
+            return bill_status
+    return PaymentProcessorPayBill.pay_bill(
+        ref_id=job.ref_id,
+        trx_id=job.trx_id,
+        **job.payload
+    )
+
+
+def check_bill_status(job):
+    from services.payment_processor_manager import PaymentProcessorCheckBillStatus
+
+    return PaymentProcessorCheckBillStatus.check_bill_status(
+        ref_id=job.ref_id,
+        trx_id=job.trx_id,
+        **job.payload
+    )
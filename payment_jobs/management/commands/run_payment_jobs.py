@@ -0,0 +1,75 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from payment_jobs.worker import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Run payment jobs (pay bill, check bill status) in worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='number of worker processes'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1,
+            help='jobs claimed by a worker at a time'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='seconds a worker sleeps when no job is due'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='exit as soon as no job is due'
+        )
+
+    def handle(self, *args, **kwargs):
+        worker_kwargs = {
+            'batch_size': kwargs['batch_size'],
+            'poll_interval': kwargs['poll_interval'],
+            'once': kwargs['once'],
+        }
+        if kwargs['workers'] <= 1:
+            processed = run_worker(**worker_kwargs)
+            self.stdout.write(self.style.SUCCESS(f'Ran {processed} payment jobs.'))
+            return
+
+        # the forked workers must not share the connections of the parent
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        workers = [
+            context.Process(
+                target=run_worker,
+                kwargs={**worker_kwargs, 'stop': stop},
+                daemon=True
+            )
+            for _ in range(kwargs['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Payment job workers stopped.'))
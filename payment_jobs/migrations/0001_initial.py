@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-18 20:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('pay_bill', 'pay bill'), ('check_bill_status', 'check bill status')], help_text='payment processor operation of the job', max_length=32, verbose_name='kind')),
+                ('ref_id', models.CharField(help_text='reference id of the operation, a job per kind and reference id', max_length=64, verbose_name='reference id')),
+                ('payload', models.JSONField(default=dict, help_text='arguments of the payment processor operation', verbose_name='payload')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('succeeded', 'succeeded'), ('failed', 'failed')], default='pending', max_length=16, verbose_name='status')),
+                ('result', models.JSONField(blank=True, help_text='response of the payment processor', null=True, verbose_name='result')),
+                ('error', models.TextField(blank=True, default='', help_text='error of the last failed attempt', verbose_name='error')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('max_attempts', models.PositiveIntegerField(default=5, verbose_name='max attempts')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='the job is not claimed before this time', verbose_name='run after')),
+                ('locked_by', models.CharField(blank=True, default='', help_text='worker running the job', max_length=128, verbose_name='locked by')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='end of the lease of the worker running the job', null=True, verbose_name='locked until')),
+                ('version', models.PositiveIntegerField(default=0, help_text='incremented by every state change, for optimistic claims', verbose_name='version')),
+                ('creation_date', models.DateTimeField(auto_now_add=True, verbose_name='creation date')),
+                ('last_update_date', models.DateTimeField(null=True, verbose_name='last update date')),
+                ('user', models.ForeignKey(blank=True, help_text='User who enqueued the job', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_jobs', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'ordering': ['-creation_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='paymentjob',
+            index=models.Index(fields=['status', 'run_after'], name='payment_job_claim_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentjob',
+            index=models.Index(fields=['user', '-creation_date'], name='payment_job_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentjob',
+            constraint=models.UniqueConstraint(fields=('kind', 'ref_id'), name='payment_job_kind_ref_id_uniq'),
+        ),
+    ]
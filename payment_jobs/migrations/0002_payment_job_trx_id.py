@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+def set_trx_ids(apps, schema_editor):
+    # every existing job gets its own transaction id
+    from payment_jobs.models import new_trx_id
+
+    PaymentJob = apps.get_model('payment_jobs', 'PaymentJob')
+    for pk in PaymentJob.objects.filter(trx_id='').values_list('pk', flat=True):
+        PaymentJob.objects.filter(pk=pk).update(trx_id=new_trx_id())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment_jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentjob',
+            name='trx_id',
+            field=models.CharField(blank=True, default='', help_text='transaction id sent to the payment processor, the same for every attempt', max_length=64, verbose_name='transaction id'),
+        ),
+        migrations.RunPython(set_trx_ids, migrations.RunPython.noop),
+    ]
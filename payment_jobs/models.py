@@ -0,0 +1,263 @@
+import string
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from django.utils.translation import gettext_lazy as _
+
+User = get_user_model()
+
+
+def new_trx_id():
+    return get_random_string(22, string.ascii_uppercase + string.digits)
+
+
+class PaymentJobManager(models.Manager):
+    def enqueue(self, kind, ref_id, payload, user=None):
+        """
+        the job of kind for ref_id, created if there is none yet. Returns
+        (job, created), a second enqueue of the same ref_id returns the
+        existing job instead of paying twice. The transaction id of the job
+        is sent with every attempt
+        """
+        return self.get_or_create(
+            kind=kind,
+            ref_id=ref_id,
+            defaults={
+                'payload': payload,
+                'user': user,
+                'trx_id': new_trx_id(),
+                'max_attempts': settings.PAYMENT_JOB_MAX_ATTEMPTS
+            }
+        )
+
+    def get_claimable(self, now):
+        # a running job whose lease ran out belongs to a worker that died
+        return self.filter(
+            Q(status=PaymentJob.Status.PENDING, run_after__lte=now)
+            | Q(status=PaymentJob.Status.RUNNING, locked_until__lt=now),
+            attempts__lt=F('max_attempts')
+        )
+
+    def fail_exhausted(self, now):
+        """
+        fail the jobs whose worker died during their last attempt, they
+        are not claimable anymore
+        """
+        return self.filter(
+            status=PaymentJob.Status.RUNNING,
+            locked_until__lt=now,
+            attempts__gte=F('max_attempts')
+        ).update(
+            status=PaymentJob.Status.FAILED,
+            error='the lease of the last attempt expired',
+            locked_by='',
+            locked_until=None,
+            version=F('version') + 1,
+            last_update_date=now
+        )
+
+    def claim(self, worker_id, limit=1):
+        """
+        claim up to limit due jobs for worker_id without locking rows: a
+        job is claimed by the UPDATE that still finds the version it read,
+        a worker that lost the race for a job moves on to the next one
+        """
+        now = timezone.now()
+        self.fail_exhausted(now)
+        candidates = self.get_claimable(now).order_by(
+            'run_after', 'pk').values_list('pk', 'version')[:limit * 4]
+        claimed = []
+        for pk, version in candidates:
+            if len(claimed) == limit:
+                break
+            updated = self.filter(
+                pk=pk,
+                version=version,
+                attempts__lt=F('max_attempts')
+            ).update(
+                status=PaymentJob.Status.RUNNING,
+                locked_by=worker_id,
+                locked_until=now + timedelta(
+                    seconds=settings.PAYMENT_JOB_LEASE_SECONDS),
+                attempts=F('attempts') + 1,
+                version=version + 1,
+                last_update_date=now
+            )
+            if updated:
+                claimed.append(pk)
+        return list(self.filter(pk__in=claimed).order_by('run_after', 'pk'))
+
+    def finish(self, job, **fields):
+        """
+        write the outcome of a claimed job, False if the lease was lost
+        and another worker owns the job by now
+        """
+        fields.update(
+            locked_by='',
+            locked_until=None,
+            version=job.version + 1,
+            last_update_date=timezone.now()
+        )
+        updated = self.filter(
+            pk=job.pk,
+            version=job.version,
+            status=PaymentJob.Status.RUNNING
+        ).update(**fields)
+        return bool(updated)
+
+    def succeed(self, job, result):
+        return self.finish(
+            job,
+            status=PaymentJob.Status.SUCCEEDED,
+            result=result,
+            error=''
+        )
+
+    def retry_or_fail(self, job, error):
+        """
+        put the job back with exponential backoff, or fail it once
+        max_attempts are used up
+        """
+        if job.attempts >= job.max_attempts:
+            return self.finish(job, status=PaymentJob.Status.FAILED, error=error)
+        delay = min(
+            settings.PAYMENT_JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1),
+            settings.PAYMENT_JOB_RETRY_BACKOFF_MAX
+        )
+        return self.finish(
+            job,
+            status=PaymentJob.Status.PENDING,
+            error=error,
+            run_after=timezone.now() + timedelta(seconds=delay)
+        )
+
+
+class PaymentJob(models.Model):
+    class Kind(models.TextChoices):
+        PAY_BILL = 'pay_bill', _('pay bill')
+        CHECK_BILL_STATUS = 'check_bill_status', _('check bill status')
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('pending')
+        RUNNING = 'running', _('running')
+        SUCCEEDED = 'succeeded', _('succeeded')
+        FAILED = 'failed', _('failed')
+
+    user = models.ForeignKey(
+        to=User,
+        on_delete=models.SET_NULL,
+        related_name='payment_jobs',
+        verbose_name=_('User'),
+        null=True,
+        blank=True,
+        help_text=_('User who enqueued the job')
+    )
+    kind = models.CharField(
+        max_length=32,
+        choices=Kind.choices,
+        verbose_name=_('kind'),
+        help_text=_('payment processor operation of the job')
+    )
+    ref_id = models.CharField(
+        max_length=64,
+        verbose_name=_('reference id'),
+        help_text=_('reference id of the operation, a job per kind and reference id')
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name=_('payload'),
+        help_text=_('arguments of the payment processor operation')
+    )
+    trx_id = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name=_('transaction id'),
+        help_text=_('transaction id sent to the payment processor, the same for every attempt')
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name=_('status')
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name=_('result'),
+        help_text=_('response of the payment processor')
+    )
+    error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name=_('error'),
+        help_text=_('error of the last failed attempt')
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('attempts')
+    )
+    max_attempts = models.PositiveIntegerField(
+        default=5,
+        verbose_name=_('max attempts')
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_('run after'),
+        help_text=_('the job is not claimed before this time')
+    )
+    locked_by = models.CharField(
+        max_length=128,
+        blank=True,
+        default='',
+        verbose_name=_('locked by'),
+        help_text=_('worker running the job')
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_('locked until'),
+        help_text=_('end of the lease of the worker running the job')
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('version'),
+        help_text=_('incremented by every state change, for optimistic claims')
+    )
+    creation_date = models.DateTimeField(
+        verbose_name=_('creation date'),
+        auto_now_add=True
+    )
+    last_update_date = models.DateTimeField(
+        verbose_name=_('last update date'),
+        null=True
+    )
+    objects = PaymentJobManager()
+
+    class Meta:
+        ordering = ['-creation_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'ref_id'],
+                name='payment_job_kind_ref_id_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='payment_job_claim_idx'
+            ),
+            models.Index(
+                fields=['user', '-creation_date'],
+                name='payment_job_user_created_idx'
+            ),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
@@ -0,0 +1,10 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import BasePermission
+
+
+class IsPaymentJobOwner(BasePermission):
+    message = _('You are not the owner of this payment job')
+    code = 403
+
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff or request.user.pk == obj.user_id
@@ -0,0 +1,48 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from services.metrics import TimedSerializerMixin
+from payment_jobs.models import PaymentJob
+
+
+class PaymentJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PaymentJob
+        fields = ['pk', 'user', 'kind', 'ref_id', 'payload', 'status',
+                  'result', 'error', 'attempts', 'max_attempts', 'run_after',
+                  'creation_date', 'last_update_date']
+        read_only_fields = fields
+
+
+class PaymentJobCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PaymentJob
+        fields = ['kind', 'ref_id', 'payload']
+        # uniqueness of kind and ref_id is resolved by enqueue
+        validators = []
+
+    def validate(self, attrs):
+        """
+        ref_id and trx_id are the job's own, a payload can not replace
+        them. A bill is paid to the biller of bllr_inf
+        """
+        payload = attrs.get('payload', {})
+        if not isinstance(payload, dict):
+            raise serializers.ValidationError({'payload': [_('payload must be an object')]})
+        reserved = sorted({'ref_id', 'trx_id'} & set(payload))
+        if reserved:
+            raise serializers.ValidationError({
+                'payload': [_('payload can not contain %s') % ', '.join(reserved)]
+            })
+        if attrs['kind'] == PaymentJob.Kind.PAY_BILL and not isinstance(
+                payload.get('bllr_inf'), dict):
+            raise serializers.ValidationError({
+                'payload': [_('bllr_inf is required to pay a bill')]
+            })
+        return attrs
+
+    def create(self, validated_data):
+        job, self.created = PaymentJob.objects.enqueue(
+            user=self.context['request'].user,
+            **validated_data
+        )
+        return job
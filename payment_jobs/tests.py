@@ -0,0 +1,198 @@
+import sys
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from payment_jobs.handlers import pay_bill
+from payment_jobs.models import PaymentJob
+from payment_jobs.worker import run_job
+
+User = get_user_model()
+
+
+def paid_handler(job):
+    return {'ref_id': job.ref_id, 'pyd_amnt': job.payload.get('pyd_amnt')}
+
+
+def gateway_down_handler(job):
+    raise ConnectionError('payment gateway unreachable')
+
+
+TEST_HANDLERS = {
+    'pay_bill': 'payment_jobs.tests.paid_handler',
+    'check_bill_status': 'payment_jobs.tests.gateway_down_handler',
+}
+
+
+@override_settings(
+    PAYMENT_JOB_HANDLERS=TEST_HANDLERS,
+    PAYMENT_JOB_RETRY_BACKOFF=10,
+    PAYMENT_JOB_LONG_POLL_INTERVAL=0.01
+)
+class PaymentJobTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='payer', email='payer@example.com', password='password')
+        self.other_user = User.objects.create_user(
+            username='other', email='other@example.com', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def enqueue(self, ref_id='REF0001', kind='pay_bill', payload=None):
+        if payload is None:
+            payload = {'pyd_amnt': '150.00', 'bllr_inf': {'bllr_id': 'b025'}}
+        return self.client.post(
+            reverse('payment-job-list'),
+            {'kind': kind, 'ref_id': ref_id, 'payload': payload},
+            format='json'
+        )
+
+    def test_enqueue_deduplicates_by_ref_id(self):
+        first = self.enqueue()
+        second = self.enqueue()
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['detail']['pk'], second.data['detail']['pk'])
+        self.assertEqual(PaymentJob.objects.count(), 1)
+
+        self.client.force_authenticate(self.other_user)
+        response = self.enqueue()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_payload_is_validated_per_kind(self):
+        response = self.enqueue(payload={'pyd_amnt': '150.00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.enqueue(payload={
+            'pyd_amnt': '150.00', 'bllr_inf': {}, 'ref_id': 'REF0002'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.enqueue(kind='check_bill_status', payload={'bllr_id': 'b025'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(PaymentJob.objects.count(), 1)
+
+    def test_claim_is_exclusive(self):
+        job, _ = PaymentJob.objects.enqueue('pay_bill', 'REF0001', {})
+        stale = PaymentJob.objects.get(pk=job.pk)
+        self.assertEqual(PaymentJob.objects.claim('worker-1'), [job])
+        self.assertEqual(PaymentJob.objects.claim('worker-2'), [])
+        # the outcome of a worker that lost its claim is discarded
+        self.assertFalse(PaymentJob.objects.succeed(stale, {}))
+
+    def test_expired_lease_is_claimed_again(self):
+        job, _ = PaymentJob.objects.enqueue('pay_bill', 'REF0001', {})
+        PaymentJob.objects.claim('worker-1')
+        PaymentJob.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        claimed = PaymentJob.objects.claim('worker-2')
+        self.assertEqual(claimed[0].locked_by, 'worker-2')
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_exhausted_expired_lease_fails(self):
+        job, _ = PaymentJob.objects.enqueue('pay_bill', 'REF0001', {})
+        PaymentJob.objects.filter(pk=job.pk).update(max_attempts=1)
+        PaymentJob.objects.claim('worker-1')
+        PaymentJob.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(PaymentJob.objects.claim('worker-2'), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, PaymentJob.Status.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_pay_bill_retry_reuses_trx_id_and_checks_status(self):
+        job, _ = PaymentJob.objects.enqueue(
+            'pay_bill', 'REF0001', {'pyd_amnt': '150.00', 'bllr_inf': {'bllr_id': 'b025'}})
+        self.assertTrue(job.trx_id)
+        paid = {'bllr_inf': {'is_bll_pd': 'Y'}}
+        manager = SimpleNamespace(
+            PaymentProcessorPayBill=mock.Mock(),
+            PaymentProcessorCheckBillStatus=mock.Mock()
+        )
+        manager.PaymentProcessorCheckBillStatus.check_bill_status.return_value = paid
+        with mock.patch.dict(sys.modules, {'services.payment_processor_manager': manager}):
+            pay_bill(PaymentJob.objects.claim('worker-1')[0])
+            manager.PaymentProcessorCheckBillStatus.check_bill_status.assert_not_called()
+            manager.PaymentProcessorPayBill.pay_bill.assert_called_once_with(
+                ref_id='REF0001', trx_id=job.trx_id, pyd_amnt='150.00',
+                bllr_inf={'bllr_id': 'b025'})
+
+            # the first attempt failed after reaching the processor
+            PaymentJob.objects.filter(pk=job.pk).update(
+                status=PaymentJob.Status.PENDING, run_after=timezone.now())
+            self.assertEqual(pay_bill(PaymentJob.objects.claim('worker-1')[0]), paid)
+        manager.PaymentProcessorCheckBillStatus.check_bill_status.assert_called_once_with(
+            ref_id='REF0001', trx_id=job.trx_id, bllr_id='b025')
+        manager.PaymentProcessorPayBill.pay_bill.assert_called_once()
+
+    def test_worker_runs_due_jobs(self):
+        job, _ = PaymentJob.objects.enqueue('pay_bill', 'REF0001', {'pyd_amnt': '150.00'})
+        out = StringIO()
+        call_command('run_payment_jobs', '--once', stdout=out)
+        self.assertIn('Ran 1 payment jobs.', out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.status, PaymentJob.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'ref_id': 'REF0001', 'pyd_amnt': '150.00'})
+
+    def test_failed_job_backs_off_then_fails(self):
+        job, _ = PaymentJob.objects.enqueue('check_bill_status', 'REF0001', {})
+        PaymentJob.objects.filter(pk=job.pk).update(max_attempts=2)
+
+        run_job(PaymentJob.objects.claim('worker-1')[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, PaymentJob.Status.PENDING)
+        self.assertIn('payment gateway unreachable', job.error)
+        self.assertAlmostEqual(
+            (job.run_after - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertEqual(PaymentJob.objects.claim('worker-1'), [])
+
+        PaymentJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_job(PaymentJob.objects.claim('worker-1')[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, PaymentJob.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_poll(self):
+        job_id = self.enqueue().data['detail']['pk']
+        url = reverse('payment-job-detail', kwargs={'job_id': job_id})
+        response = self.client.get(url)
+        self.assertEqual(response.data['detail']['status'], PaymentJob.Status.PENDING)
+        self.assertIn('Retry-After', response)
+
+        # the sync route does not hold a worker thread to long poll
+        response = self.client.get(url, {'wait': 5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(
+            reverse('async-payment-job-detail', kwargs={'job_id': job_id}),
+            str(response.data['detail']['wait'])
+        )
+
+        call_command('run_payment_jobs', '--once', stdout=StringIO())
+        response = self.client.get(url)
+        self.assertEqual(response.data['detail']['status'], PaymentJob.Status.SUCCEEDED)
+        self.assertNotIn('Retry-After', response)
+
+        self.client.force_authenticate(self.other_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_long_poll(self):
+        job, _ = await PaymentJob.objects.aget_or_create(
+            kind='pay_bill', ref_id='REF0001', user=self.user)
+        await PaymentJob.objects.filter(pk=job.pk).aupdate(
+            status=PaymentJob.Status.SUCCEEDED, result={'ok': True})
+        token, _ = await Token.objects.aget_or_create(user=self.user)
+        response = await self.async_client.get(
+            reverse('async-payment-job-detail', kwargs={'job_id': job.pk}),
+            {'wait': 1},
+            headers={'Authorization': f'Token {token.key}'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['result'], {'ok': True})
@@ -0,0 +1,23 @@
+from django.urls import path, include
+from rest_framework import routers
+from .views import (
+    PaymentJobGenericViewSet,
+    PaymentJobAsyncViewSet
+)
+
+payment_job_router = routers.DefaultRouter()
+payment_job_router.register('', PaymentJobGenericViewSet, 'payment-job')
+
+async_urlpatterns = [
+    path(
+        '<str:job_id>/',
+        PaymentJobAsyncViewSet.as_view({'get': 'retrieve'}),
+        name='async-payment-job-detail'
+    ),
+]
+
+
+urlpatterns = [
+    path('jobs/', include(payment_job_router.urls)),
+    path('async/jobs/', include(async_urlpatterns))
+]
@@ -0,0 +1,2 @@
+from .payment_job_views import *
+from .async_views import *
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from django.http import Http404
+from django.utils.translation import gettext_lazy as _
+
+from services.async_views import AsyncViewSetMixin
+from services.exception_handler import exception_handler
+from services.constants import ErrorTypes
+from .payment_job_views import PaymentJobGenericViewSet
+
+
+class PaymentJobAsyncViewSet(AsyncViewSetMixin, PaymentJobGenericViewSet):
+    """
+    long polling of payment jobs on the event loop, a waiting client holds
+    no worker thread under ASGI
+    """
+
+    async def retrieve(self, request, *args, **kwargs):
+        """
+        retrieve a payment job by job pk, pass wait in query param to wait up to that many seconds for the job to finish
+        """
+        try:
+            job = await self.aget_object()
+        except Http404 as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('payment job retrieval failed'),
+                error_type=ErrorTypes.OBJECT_DOES_NOT_EXIST.value
+            )
+        deadline = time.monotonic() + self.get_wait_seconds()
+        while not job.is_finished and time.monotonic() < deadline:
+            await asyncio.sleep(self.get_poll_delay(deadline))
+            await job.arefresh_from_db()
+        return self.get_job_response(job)
@@ -0,0 +1,137 @@
+import time
+
+from django.conf import settings
+from django.http import Http404
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+from rest_framework import status
+
+from services.customize_response import customize_response
+from services.exception_handler import exception_handler
+from services.constants import ErrorTypes
+from services.pagination import CustomPageNumberPagination
+from ..models import PaymentJob
+from ..permissions import IsPaymentJobOwner
+from ..serializers import (
+    PaymentJobSerializer,
+    PaymentJobCreateSerializer
+)
+
+
+class PaymentJobGenericViewSet(GenericViewSet):
+    """
+    pay bill and check bill status run in the run_payment_jobs workers,
+    a client enqueues a job and polls it. Long polling (wait) would hold a
+    worker thread here, it is served by PaymentJobAsyncViewSet only
+    """
+    queryset = PaymentJob.objects.all()
+    pagination_class = CustomPageNumberPagination
+    lookup_field = 'pk'
+    lookup_url_kwarg = 'job_id'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
+    def get_wait_seconds(self):
+        try:
+            wait = float(self.request.query_params.get('wait', 0))
+        except ValueError:
+            return 0
+        return min(max(wait, 0), settings.PAYMENT_JOB_MAX_WAIT)
+
+    def get_poll_delay(self, deadline):
+        return min(settings.PAYMENT_JOB_LONG_POLL_INTERVAL, deadline - time.monotonic())
+
+    def get_job_response(self, job):
+        response = Response(PaymentJobSerializer(job).data)
+        if not job.is_finished:
+            response['Retry-After'] = str(settings.PAYMENT_JOB_RETRY_AFTER)
+        return customize_response(response, _('payment job details with this pk'))
+
+    def list(self, request, *args, **kwargs):
+        """
+        list of the payment jobs of the authenticated user, all of them for staffs
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            return customize_response(response, _('list of all payment jobs'))
+        serializer = self.get_serializer(queryset, many=True)
+        return customize_response(Response(serializer.data), _('list of all payment jobs'))
+
+    def create(self, request, *args, **kwargs):
+        """
+        enqueue a pay_bill or check_bill_status job, a job with the same kind and ref_id is returned instead of enqueued twice
+        """
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+            job = serializer.save()
+            if not serializer.created and job.user_id != request.user.pk:
+                raise ValidationError({
+                    'ref_id': [_('a payment job with this ref_id already exists')]
+                })
+            response = Response(
+                data=PaymentJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED if serializer.created else status.HTTP_200_OK
+            )
+            return customize_response(
+                response,
+                _('payment job enqueued') if serializer.created
+                else _('payment job already enqueued')
+            )
+        except ValidationError as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('payment job enqueue failed'),
+                error_type=ErrorTypes.FORM_FIELD_ERROR.value
+            )
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        retrieve a payment job by job pk, long poll it (wait in query param) on the async route
+        """
+        if self.get_wait_seconds():
+            return exception_handler(
+                exc=ValidationError({'wait': [_(
+                    'long polling is only served by %(url)s'
+                ) % {'url': reverse(
+                    'async-payment-job-detail',
+                    kwargs={'job_id': self.kwargs[self.lookup_url_kwarg]}
+                )}]}),
+                message=_('payment job retrieval failed'),
+                error_type=ErrorTypes.FORM_FIELD_ERROR.value
+            )
+        try:
+            job = self.get_object()
+        except Http404 as excpt:
+            return exception_handler(
+                exc=excpt,
+                message=_('payment job retrieval failed'),
+                error_type=ErrorTypes.OBJECT_DOES_NOT_EXIST.value
+            )
+        return self.get_job_response(job)
+
+    def get_permissions(self):
+        permission_classes = [IsAuthenticated]
+        if self.action == 'retrieve':
+            permission_classes += [IsPaymentJobOwner]
+        return [permission() for permission in permission_classes]
+
+    def get_serializer_class(self):
+        """
+        Returns the serializer class that this view requires based on
+        different action
+        """
+        if self.action == 'create':
+            return PaymentJobCreateSerializer
+        return PaymentJobSerializer
@@ -0,0 +1,55 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from payment_jobs.models import PaymentJob
+
+
+def get_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def run_job(job):
+    """
+    run the handler of the job kind (PAYMENT_JOB_HANDLERS) and store its
+    result, a failure is retried with backoff until max_attempts
+    """
+    try:
+        handler = import_string(settings.PAYMENT_JOB_HANDLERS[job.kind])
+        result = handler(job)
+    except Exception as excpt:
+        return PaymentJob.objects.retry_or_fail(
+            job,
+            f'{type(excpt).__name__}: {excpt}'
+        )
+    return PaymentJob.objects.succeed(job, result)
+
+
+def run_worker(batch_size=1, poll_interval=None, once=False, stop=None):
+    """
+    claim and run due jobs until stop is set, or until no job is due when
+    once is True. Returns the number of jobs run
+    """
+    worker_id = get_worker_id()
+    if poll_interval is None:
+        poll_interval = settings.PAYMENT_JOB_POLL_INTERVAL
+    processed = 0
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        jobs = PaymentJob.objects.claim(worker_id, limit=batch_size)
+        for job in jobs:
+            run_job(job)
+            processed += 1
+        if not jobs:
+            if once:
+                break
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+    close_old_connections()
+    return processed
@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router, transaction
+from rest_framework import serializers
+from rest_framework.pagination import _positive_int
+
+from services.metrics import TimedDataMixin
+
+
+def get_bulk_batch_size(request):
+    try:
+        return _positive_int(
+            request.query_params['batch_size'],
+            strict=True,
+            cutoff=settings.BULK_CREATE_MAX_BATCH_SIZE
+        )
+    except (KeyError, ValueError):
+        return settings.BULK_CREATE_BATCH_SIZE
+
+
+def get_inserted_pks(connection, count):
+    """
+    the primary keys of the count rows of the last multi row INSERT on
+    connection, for the backends that return no rows from it. MySQL hands
+    out consecutive auto increment values to a multi row INSERT under
+    innodb_autoinc_lock_mode 0 or 1 and LAST_INSERT_ID() is the first
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('SELECT LAST_INSERT_ID(), @@auto_increment_increment')
+            first_pk, increment = cursor.fetchone()
+        else:
+            # sqlite, the rowid of the last row
+            cursor.execute('SELECT last_insert_rowid()')
+            first_pk, increment = cursor.fetchone()[0] - count + 1, 1
+    return [first_pk + offset * increment for offset in range(count)]
+
+
+def bulk_create_with_pks(manager, objs, batch_size=None):
+    """
+    bulk_create that sets the primary key of every object on every
+    backend. MySQL returns no primary keys from a bulk insert and blogs and
+    comments have no unique field to reload them by (as fetch bill requests
+    are by ref_id), so there every batch is one INSERT followed by
+    get_inserted_pks, in one transaction
+    """
+    using = router.db_for_write(manager.model)
+    connection = connections[using]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return manager.bulk_create(objs, batch_size=batch_size)
+    fields = [
+        field for field in manager.model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    # bulk_create must not split a batch further, the pks are read for the
+    # last INSERT only
+    max_batch_size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+    batch_size = min(batch_size or max_batch_size, max_batch_size)
+    with transaction.atomic(using=using, savepoint=False):
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            manager.bulk_create(batch)
+            for obj, pk in zip(batch, get_inserted_pks(connection, len(batch))):
+                obj.pk = pk
+    return objs
+
+
+class PrefetchedObjects:
+    """
+    stands in for the queryset of a PrimaryKeyRelatedField while a list is
+    validated, so every referenced object is fetched with one query instead
+    of one query per item
+    """
+
+    def __init__(self, queryset, pks):
+        self.model = queryset.model
+        self.objects = queryset.in_bulk(pks)
+
+    def get(self, pk):
+        try:
+            pk = self.model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise ValueError(pk)
+        try:
+            return self.objects[pk]
+        except KeyError:
+            raise self.model.DoesNotExist
+
+    @staticmethod
+    def get_pks(field, data):
+        pks = set()
+        model_pk = field.get_queryset().model._meta.pk
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            try:
+                pks.add(model_pk.to_python(item.get(field.field_name)))
+            except (DjangoValidationError, TypeError):
+                continue
+        pks.discard(None)
+        return pks
+
+
+class BulkCreateListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """
+    list serializer of the bulk actions, related objects are validated
+    from one prefetch per field and the validated items are written with
+    the model manager's bulk_create_from_kwargs in batches of
+    context['batch_size']
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        related_fields = [
+            field for field in self.child.fields.values()
+            if isinstance(field, serializers.PrimaryKeyRelatedField)
+            and not field.read_only
+        ]
+        querysets = {field: field.queryset for field in related_fields}
+        try:
+            for field in related_fields:
+                field.queryset = PrefetchedObjects(
+                    field.get_queryset(),
+                    PrefetchedObjects.get_pks(field, data)
+                )
+            return super().to_internal_value(data)
+        finally:
+            for field, queryset in querysets.items():
+                field.queryset = queryset
+
+    def create(self, validated_data):
+        return self.child.Meta.model.objects.bulk_create_from_kwargs(
+            validated_data,
+            batch_size=self.context.get('batch_size')
+        )
@@ -0,0 +1,274 @@
+import logging
+import os
+import threading
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheLock:
+    """
+    a lock shared by every worker using the cache, cache.add succeeds for
+    exactly one caller. The lock expires after timeout so a holder that
+    died does not block the others forever
+    """
+
+    def __init__(self, key, timeout):
+        self.key = key
+        self.timeout = timeout
+        self.owner = None
+
+    def acquire(self):
+        owner = uuid4().hex
+        if cache.add(self.key, owner, timeout=self.timeout):
+            self.owner = owner
+            return True
+        return False
+
+    def release(self):
+        # not atomic, but only deletes a lock that expired and was taken by
+        # someone else if that happens between the get and the delete
+        if self.owner is not None and cache.get(self.key) == self.owner:
+            cache.delete(self.key)
+        self.owner = None
+
+
+class RefreshingCacheValue:
+    """
+    a cached value with a known lifetime (an access token) that is
+    refreshed single flight: once refresh_margin seconds are left one
+    caller takes the cache lock and fetches, the others keep using the
+    still valid value, which is also what the lock holder returns when its
+    fetch fails. Only when there is no valid value at all do they wait for
+    the fetch of the lock holder, up to wait_timeout seconds before
+    fetching themselves.
+
+    fetch returns (value, lifetime in seconds). The value is stored as is
+    under key, so plain cache.get(key) readers keep working, and the time
+    it is due for refresh under key:refresh_at.
+
+    start_background_refresh refreshes the value ahead of refresh_at in a
+    daemon thread of each process, so requests normally never fetch
+    """
+
+    def __init__(
+        self,
+        key,
+        fetch,
+        refresh_margin=60,
+        lock_timeout=30,
+        wait_timeout=10,
+        retry_interval=5
+    ):
+        self.key = key
+        self.refresh_at_key = f'{key}:refresh_at'
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.retry_interval = retry_interval
+        self.fetch_count = 0
+        self._refresher = None
+        self._refresher_pid = None
+        self._refresher_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def get_entry(self):
+        entry = cache.get_many([self.key, self.refresh_at_key])
+        return entry.get(self.key), entry.get(self.refresh_at_key)
+
+    def set(self, value, lifetime):
+        lifetime = max(int(lifetime), 1)
+        refresh_at = time.time() + max(lifetime - self.refresh_margin, lifetime / 2)
+        cache.set_many(
+            {self.key: value, self.refresh_at_key: refresh_at},
+            timeout=lifetime
+        )
+        return value
+
+    def refresh(self):
+        self.fetch_count += 1
+        value, lifetime = self.fetch()
+        return self.set(value, lifetime)
+
+    def get(self):
+        value, refresh_at = self.get_entry()
+        if value is not None and refresh_at is not None and time.time() < refresh_at:
+            return value
+
+        lock = CacheLock(f'{self.key}:lock', self.lock_timeout)
+        if lock.acquire():
+            try:
+                return self.refresh()
+            except Exception:
+                if value is None:
+                    raise
+                # an early refresh failed, the value is valid until it
+                # expires and the next caller past refresh_at tries again
+                logger.exception('refresh of %s failed, using the current value', self.key)
+                return value
+            finally:
+                lock.release()
+        if value is not None:
+            # someone else is refreshing, the current value is still valid
+            return value
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(self.key)
+            if value is not None:
+                return value
+        return self.refresh()
+
+    def refresh_if_due(self):
+        return self.get()
+
+    def seconds_until_refresh(self):
+        _, refresh_at = self.get_entry()
+        if refresh_at is None:
+            return 0
+        return max(refresh_at - time.time(), 0)
+
+    def start_background_refresh(self):
+        """
+        idempotent per process, a forked worker starts its own thread
+        """
+        pid = os.getpid()
+        with self._refresher_lock:
+            if self._refresher is not None and self._refresher_pid == pid:
+                return self._refresher
+            self._refresher = threading.Thread(
+                target=self.run_background_refresh,
+                name=f'refresh {self.key}',
+                daemon=True
+            )
+            self._refresher_pid = pid
+            self._stopped.clear()
+            self._refresher.start()
+            return self._refresher
+
+    def stop_background_refresh(self):
+        with self._refresher_lock:
+            refresher, self._refresher = self._refresher, None
+            self._stopped.set()
+        if refresher is not None and refresher.is_alive():
+            refresher.join()
+
+    def run_background_refresh(self):
+        delay = 0
+        while not self._stopped.wait(delay):
+            try:
+                self.refresh_if_due()
+                # at least a second apart while another worker refreshes
+                delay = max(self.seconds_until_refresh(), 1)
+            except Exception:
+                logger.exception('background refresh of %s failed', self.key)
+                delay = self.retry_interval
+
+
+class StaleWhileRevalidateCacheValue(RefreshingCacheValue):
+    """
+    a RefreshingCacheValue for data that stays usable after its refresh
+    time (a catalogue). The last good value never expires, a caller that
+    finds it stale gets it right away and starts a refresh in a thread,
+    single flight across the workers through the cache lock. Only the very
+    first caller, with nothing cached, waits for the fetch.
+
+    index, when given, builds a lookup (a dict) from the value. It is built
+    once per process and version of the value, see get_index
+    """
+
+    def __init__(self, key, fetch, index=None, **kwargs):
+        super().__init__(key, fetch, **kwargs)
+        self.version_key = f'{key}:version'
+        self.index = index
+        self._index = (None, None)
+        self._index_lock = threading.Lock()
+        self._revalidating = threading.Lock()
+
+    def set(self, value, lifetime):
+        cache.set_many(
+            {
+                self.key: value,
+                self.refresh_at_key: time.time() + lifetime,
+                self.version_key: uuid4().hex
+            },
+            timeout=None
+        )
+        return value
+
+    def get(self):
+        value, refresh_at = self.get_entry()
+        if value is None:
+            return super().get()
+        self.revalidate_if_stale(refresh_at)
+        return value
+
+    def revalidate_if_stale(self, refresh_at):
+        if refresh_at is None or time.time() >= refresh_at:
+            self.revalidate()
+
+    def revalidate(self):
+        # one revalidating thread per process at most
+        if not self._revalidating.acquire(blocking=False):
+            return
+        threading.Thread(
+            target=self.run_revalidate,
+            name=f'revalidate {self.key}',
+            daemon=True
+        ).start()
+
+    def run_revalidate(self):
+        try:
+            self.refresh_if_due()
+        except Exception:
+            logger.exception('revalidation of %s failed', self.key)
+        finally:
+            self._revalidating.release()
+
+    def refresh_if_due(self):
+        value, refresh_at = self.get_entry()
+        if value is not None and refresh_at is not None and time.time() < refresh_at:
+            return value
+        lock = CacheLock(f'{self.key}:lock', self.lock_timeout)
+        if not lock.acquire():
+            return value
+        try:
+            return self.refresh()
+        finally:
+            lock.release()
+
+    def get_index(self):
+        """
+        the index of the current value. While the stored version is the one
+        indexed only the version and refresh time are read, the value is
+        read (and unpickled) and indexed again only for another version
+        """
+        entry = cache.get_many([self.version_key, self.refresh_at_key])
+        version = entry.get(self.version_key)
+        index_version, index = self._index
+        if index is not None and version is not None and version == index_version:
+            self.revalidate_if_stale(entry.get(self.refresh_at_key))
+            return index
+        with self._index_lock:
+            # value and version from the same read, so the index is never
+            # tagged with the version of a newer value
+            keys = [self.key, self.version_key, self.refresh_at_key]
+            entry = cache.get_many(keys)
+            value = entry.get(self.key)
+            if value is None:
+                value = self.get()
+                entry = cache.get_many(keys)
+                value = entry.get(self.key, value)
+            else:
+                self.revalidate_if_stale(entry.get(self.refresh_at_key))
+            version = entry.get(self.version_key)
+            index_version, index = self._index
+            if index is None or version is None or index_version != version:
+                index = self.index(value)
+                self._index = (version, index)
+            return index
@@ -0,0 +1,98 @@
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalResponseMixin:
+    """
+    strong ETag and Last-Modified validators for the list and retrieve
+    responses, a request whose If-None-Match/If-Modified-Since still
+    matches is answered with 304 before anything is serialized.
+
+    list validators come from the rows of the page and the count of the
+    paginator, both fetched to answer the request anyway, so a 304 costs
+    the same queries as the page minus the serialization and there is no
+    whole table aggregate. The object_state_fields of every row are in the
+    ETag, a deletion or insertion moves the count and shifts the rows. A
+    deletion does not move any date, so only the ETag is evaluated for
+    lists, Last-Modified is informational there. keyset (cursor) pages get
+    no validators.
+
+    retrieve validators come from the object state of ObjectCacheMixin,
+    one indexed read of the row that the cached data is keyed by too. They
+    depend on the row only, so every worker hands out the same validators
+    whatever its cache holds, and Last-Modified is the latest date of the
+    row rather than the time a cache entry was made
+    """
+    def use_list_validators(self):
+        # keyset pages exist to avoid whole table aggregates
+        use_cursor_pagination = getattr(self, 'use_cursor_pagination', None)
+        return use_cursor_pagination is None or not use_cursor_pagination()
+
+    def get_list_validators(self, page):
+        if not self.use_list_validators():
+            return None, None
+        states = [
+            (obj.pk, *[getattr(obj, field) for field in self.object_state_fields])
+            for obj in page
+        ]
+        dates = [
+            value for state in states for value in state
+            if hasattr(value, 'utctimetuple')
+        ]
+        last_modified = timegm(max(dates).utctimetuple()) if dates else None
+        etag = self.make_etag(
+            self.request.get_full_path(),
+            f'count={self.paginator.page.paginator.count}',
+            *states
+        )
+        return etag, last_modified
+
+    def get_object_validators(self):
+        return self.build_object_validators(*self.get_object_state())
+
+    async def aget_object_validators(self):
+        return self.build_object_validators(*await self.aget_object_state())
+
+    def build_object_validators(self, pk, state):
+        if state is None:
+            # invalid pk or missing row, the view answers 404
+            return None, None
+        dates = [value for value in state if hasattr(value, 'utctimetuple')]
+        last_modified = timegm(max(dates).utctimetuple()) if dates else None
+        etag = self.make_etag(self.object_cache_prefix, pk, *state)
+        return etag, last_modified
+
+    def make_etag(self, *parts):
+        # the representation also depends on the negotiated renderer
+        parts = (*parts, getattr(self.request, 'accepted_media_type', ''))
+        return quote_etag(
+            hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()[:40]
+        )
+
+    def get_not_modified_response(self, etag, last_modified, evaluate_last_modified=True):
+        """
+        the 304 (or 412 for a failed If-Match) response if the request
+        preconditions say the client copy is current, None otherwise
+        """
+        if etag is None:
+            return None
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=last_modified if evaluate_last_modified else None
+        )
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        if response.status_code in (200, 304):
+            if etag is not None:
+                response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
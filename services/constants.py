@@ -24,3 +24,6 @@ class RequestTypes(Enum):
 class CacheKey(Enum):
     PAYMENT_PROCESSOR_TOKEN = 'payment_processor_token'
     BILLERS_INFO = 'billers_info'
+    BLOG_DETAIL = 'blog_detail'
+    COMMENT_DETAIL = 'comment_detail'
+    AUTH_TOKEN = 'auth_token'
@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import orjson
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def encrypt_payload(payload):
+    from services.encryption_decryption_request_manager import (
+        EncryptionDecryptionBodyMixin
+    )
+    return EncryptionDecryptionBodyMixin.encrypt_payload(payload=payload)
+
+
+def decrypt_payload(payload):
+    from services.encryption_decryption_request_manager import (
+        EncryptionDecryptionBodyMixin
+    )
+    return EncryptionDecryptionBodyMixin.decrypt_payload(payload=payload)
+
+
+@lru_cache(maxsize=None)
+def get_crypto_function(path):
+    # imported once per process, whatever the module builds at import
+    # (keys, cipher contexts) is reused by every call of the process
+    return import_string(path)
+
+
+def call_crypto_function(path, payload):
+    return get_crypto_function(path)(payload)
+
+
+def init_worker(settings_module, paths):
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    if not settings.configured:
+        django.setup()
+    for path in paths:
+        get_crypto_function(path)
+
+
+def get_mp_context():
+    method = settings.CRYPTO_EXECUTOR_START_METHOD
+    if method not in multiprocessing.get_all_start_methods():
+        # forkserver is not available on Windows
+        method = 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def get_payload_size(payload):
+    if isinstance(payload, (bytes, str)):
+        return len(payload)
+    return len(orjson.dumps(payload, default=str))
+
+
+class CryptoExecutor:
+    """
+    runs the CPU bound encryption/decryption of payment processor payloads.
+    Payloads smaller than threshold bytes are handled inline, where the
+    round trip to another process would cost more than it saves, larger
+    ones in a process pool of max_workers processes so the worker thread
+    is not blocked holding the GIL. max_workers=0 keeps everything inline.
+
+    encrypt and decrypt are dotted paths to module level functions taking
+    the payload (they must be importable in the pool processes), the
+    defaults wrap EncryptionDecryptionBodyMixin. Every setting not passed
+    is read from CRYPTO_EXECUTOR_* settings.
+
+    The pool processes are started with CRYPTO_EXECUTOR_START_METHOD
+    (forkserver), a fork of a worker would copy the state of its other
+    threads (held locks, open connections) into the pool processes
+    """
+
+    def __init__(self, encrypt=None, decrypt=None, threshold=None, max_workers=None):
+        self._encrypt = encrypt
+        self._decrypt = decrypt
+        self._threshold = threshold
+        self._max_workers = max_workers
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def encrypt_path(self):
+        return self._encrypt or settings.CRYPTO_EXECUTOR_ENCRYPT
+
+    @property
+    def decrypt_path(self):
+        return self._decrypt or settings.CRYPTO_EXECUTOR_DECRYPT
+
+    @property
+    def threshold(self):
+        if self._threshold is None:
+            return settings.CRYPTO_EXECUTOR_PROCESS_THRESHOLD
+        return self._threshold
+
+    @property
+    def max_workers(self):
+        if self._max_workers is None:
+            return settings.CRYPTO_EXECUTOR_MAX_WORKERS
+        return self._max_workers
+
+    def get_pool(self):
+        """
+        created on first use, a forked worker creates its own
+        """
+        pid = os.getpid()
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != pid:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=get_mp_context(),
+                    initializer=init_worker,
+                    initargs=(
+                        os.environ.get('DJANGO_SETTINGS_MODULE', ''),
+                        (self.encrypt_path, self.decrypt_path)
+                    )
+                )
+                self._pool_pid = pid
+            return self._pool
+
+    def use_pool(self, payload):
+        return self.max_workers > 0 and get_payload_size(payload) >= self.threshold
+
+    def run(self, path, payload):
+        if self.use_pool(payload):
+            return self.get_pool().submit(call_crypto_function, path, payload).result()
+        return call_crypto_function(path, payload)
+
+    def encrypt(self, payload):
+        return self.run(self.encrypt_path, payload)
+
+    def decrypt(self, payload):
+        return self.run(self.decrypt_path, payload)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+            self._pool_pid = None
+
+
+crypto_executor = CryptoExecutor()
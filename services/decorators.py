@@ -0,0 +1,17 @@
+from functools import wraps
+
+
+def check_and_set_payment_processor_token(func):
+    """
+    makes sure a valid payment processor token is cached before func runs
+    and keeps it refreshed in the background from then on
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # payment_processor_manager imports this module
+        from services.payment_processor_manager import PaymentProcessorGetToken
+
+        PaymentProcessorGetToken.get_valid_token()
+        PaymentProcessorGetToken.token_cache.start_background_refresh()
+        return func(*args, **kwargs)
+    return wrapper
@@ -1,31 +1,54 @@
-from requests import Request, Session
-from requests.adapters import HTTPAdapter, Retry
+from concurrent.futures import ThreadPoolExecutor
+
+from services.http_client import amake_request, amake_requests, make_request
 
 
 class RequestMixin:
     @staticmethod
     def make_request(*args, **kwargs):
-        with Session() as s:
-            payload_type = kwargs.get('payload_type', 'json')
-            verify = kwargs.get('verify', True)
-            retries = Retry(
-                total=5,
-                backoff_factor=1,
-                status_forcelist=[502, 503, 504]
-            )
-            s.mount('http://', HTTPAdapter(max_retries=retries))
-            payload_args = {
-                'method': kwargs.get('req_type').value,
-                'url': kwargs.get('url'),
-                payload_type: kwargs.get('payload'),
-                'headers': kwargs.get('headers', {})
-            }
-            req = Request(**payload_args)
-            prepped = req.prepare()
-            res = s.send(
-                prepped,
-                stream=False,
-                verify=verify,
-                timeout=10
-            )
-            return res
+        return make_request(*args, **kwargs)
+
+    @staticmethod
+    async def amake_request(*args, **kwargs):
+        return await amake_request(*args, **kwargs)
+
+    @staticmethod
+    async def amake_requests(requests_kwargs, concurrency=None):
+        return await amake_requests(requests_kwargs, concurrency=concurrency)
+
+
+def index_by_field(payload, field):
+    """
+    every dict with field found anywhere in payload (nested dicts and
+    lists), keyed by its value of field
+    """
+    index = {}
+    stack = [payload]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if item.get(field) is not None:
+                index.setdefault(item[field], item)
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, (list, tuple)):
+            stack.extend(reversed(item))
+    return index
+
+
+def map_concurrently(func, items, max_workers):
+    """
+    func applied to every item by at most max_workers threads. Returns
+    (result, error) pairs in input order, an exception of one item is its
+    error and does not stop the others
+    """
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as excpt:
+            return None, excpt
+
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(call, items))
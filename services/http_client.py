@@ -0,0 +1,120 @@
+import asyncio
+import os
+import threading
+
+from django.conf import settings
+from requests import Request, Session
+from requests.adapters import HTTPAdapter, Retry
+
+_adapter = None
+_adapter_pid = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_retry():
+    """
+    connection errors are retried for every method, read errors and the
+    status_forcelist only for idempotent methods so a payment POST is never
+    sent twice
+    """
+    return Retry(
+        total=settings.HTTP_CLIENT_RETRY_TOTAL,
+        backoff_factor=settings.HTTP_CLIENT_RETRY_BACKOFF_FACTOR,
+        status_forcelist=[502, 503, 504]
+    )
+
+
+def get_http_adapter():
+    """
+    the process wide adapter, its urllib3 pools are thread safe and keep
+    the TCP/TLS connections alive between calls. A forked worker builds its
+    own instead of sharing the sockets of the parent
+    """
+    global _adapter, _adapter_pid
+    pid = os.getpid()
+    if _adapter is None or _adapter_pid != pid:
+        with _adapter_lock:
+            if _adapter is None or _adapter_pid != pid:
+                _adapter = HTTPAdapter(
+                    pool_connections=settings.HTTP_CLIENT_POOL_CONNECTIONS,
+                    pool_maxsize=settings.HTTP_CLIENT_POOL_MAXSIZE,
+                    pool_block=settings.HTTP_CLIENT_POOL_BLOCK,
+                    max_retries=get_retry()
+                )
+                _adapter_pid = pid
+    return _adapter
+
+
+def get_http_session():
+    """
+    a session per thread (sessions hold cookies and are not thread safe)
+    mounting the shared adapter for http:// and https://
+    """
+    adapter = get_http_adapter()
+    session = getattr(_local, 'session', None)
+    if session is None or session.adapters.get('https://') is not adapter:
+        session = Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+    return session
+
+
+def reset_http_client():
+    global _adapter, _adapter_pid
+    with _adapter_lock:
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = None
+        _adapter_pid = None
+    _local.session = None
+
+
+def make_request(*args, **kwargs):
+    """
+    the request is prepared on its own, not through the session, so no
+    cookie of an earlier call of the thread is sent along
+    """
+    payload_type = kwargs.get('payload_type', 'json')
+    payload_args = {
+        'method': kwargs.get('req_type').value,
+        'url': kwargs.get('url'),
+        payload_type: kwargs.get('payload'),
+        'headers': kwargs.get('headers', {})
+    }
+    prepped = Request(**payload_args).prepare()
+    return get_http_session().send(
+        prepped,
+        stream=False,
+        verify=kwargs.get('verify', True),
+        timeout=kwargs.get('timeout', settings.HTTP_CLIENT_TIMEOUT)
+    )
+
+
+async def amake_request(*args, **kwargs):
+    """
+    make_request for asyncio code, the call runs in the default executor so
+    concurrent calls share the same connection pool
+    """
+    return await asyncio.to_thread(make_request, *args, **kwargs)
+
+
+async def amake_requests(requests_kwargs, concurrency=None):
+    """
+    runs make_request for every kwargs dict concurrently, at most
+    concurrency at a time (HTTP_CLIENT_POOL_MAXSIZE by default). Results are
+    in input order, a failed call gives its exception instead of a response
+    """
+    semaphore = asyncio.Semaphore(
+        concurrency or settings.HTTP_CLIENT_POOL_MAXSIZE
+    )
+
+    async def limited(kwargs):
+        async with semaphore:
+            return await amake_request(**kwargs)
+
+    return await asyncio.gather(
+        *[limited(kwargs) for kwargs in requests_kwargs],
+        return_exceptions=True
+    )
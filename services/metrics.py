@@ -0,0 +1,338 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_request_metrics = ContextVar('request_metrics', default=None)
+
+_histograms = {}
+_counters = {}
+_registry_lock = Lock()
+
+
+class Histogram:
+    """
+    cumulative bucket counts, sum and count in the shape of a Prometheus
+    histogram
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def observe(name, value, buckets=DURATION_BUCKETS, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def increment(name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def reset_metrics():
+    with _registry_lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.query_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+        self.renderer_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def get_request_metrics():
+    return _request_metrics.get()
+
+
+def record_cache_lookup(cache_name, hit):
+    """
+    count a lookup of cache_name, per request and in total
+    """
+    increment(
+        'wordweaver_cache_requests_total',
+        cache=cache_name,
+        result='hit' if hit else 'miss'
+    )
+    metrics = _request_metrics.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def time_queries(execute, sql, params, many, context):
+    metrics = _request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_time += time.perf_counter() - started
+
+
+def install_query_timer(connection):
+    """
+    time_queries is the execute_wrapper of every connection, it only times
+    queries made while a request is measured. It is installed on the
+    connections rather than around the request so the queries of async
+    views, which run in sync_to_async threads with their own connections,
+    are counted too
+    """
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def install_query_timer_on_connect(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+def install_query_timers(**kwargs):
+    # connections of this thread opened before this module was imported
+    for connection in connections.all(initialized_only=True):
+        install_query_timer(connection)
+
+
+connection_created.connect(install_query_timer_on_connect)
+request_started.connect(install_query_timers)
+
+
+@contextmanager
+def time_serializer():
+    # nested serializers are part of the time of the outermost one
+    metrics = _request_metrics.get()
+    if metrics is None:
+        yield
+        return
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+def timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        metrics = _request_metrics.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.renderer_time += time.perf_counter() - started
+    return wrapper
+
+
+class TimedDataMixin:
+    """
+    serializer (or list serializer) mixin that adds the time spent
+    building data to the serializer time of the request
+    """
+
+    @property
+    def data(self):
+        with time_serializer():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class TimedSerializerMixin(TimedDataMixin):
+    """
+    TimedDataMixin for a serializer, many=True instances are timed too
+    unless Meta.list_serializer_class is set
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is serializers.ListSerializer:
+            serializer.__class__ = TimedListSerializer
+        return serializer
+
+
+def get_view_label(request, view_func):
+    cls = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None) or {}
+    if cls is not None:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f'{cls.__name__}.{action}'
+    match = request.resolver_match
+    if match is not None and match.view_name:
+        return f'{match.view_name}.{request.method.lower()}'
+    return getattr(view_func, '__name__', 'unknown')
+
+
+class RequestMetricsMiddleware:
+    """
+    records wall time, database queries and query time, serializer time,
+    renderer time and cache hits/misses of every request into histograms
+    per view action (ViewSet.action), exposed by services.metrics_view.MetricsView
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        self.record(metrics, time.perf_counter() - started, response)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        self.record(metrics, time.perf_counter() - started, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            metrics.view = get_view_label(request, view_func)
+        return None
+
+    @staticmethod
+    def record(metrics, duration, response):
+        view = metrics.view or 'unmatched'
+        observe('wordweaver_request_duration_seconds', duration, view=view)
+        observe('wordweaver_request_db_queries', metrics.queries,
+                buckets=QUERY_COUNT_BUCKETS, view=view)
+        observe('wordweaver_request_db_duration_seconds', metrics.query_time, view=view)
+        observe('wordweaver_request_serializer_duration_seconds',
+                metrics.serializer_time, view=view)
+        observe('wordweaver_request_renderer_duration_seconds',
+                metrics.renderer_time, view=view)
+        increment('wordweaver_requests_total', view=view,
+                  status=str(response.status_code))
+        if metrics.cache_hits:
+            increment('wordweaver_request_cache_lookups_total',
+                      metrics.cache_hits, view=view, result='hit')
+        if metrics.cache_misses:
+            increment('wordweaver_request_cache_lookups_total',
+                      metrics.cache_misses, view=view, result='miss')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def get_connection_counters():
+    from WordWeaver.db_backends.connection_limit import get_connection_metrics
+
+    counters = {}
+    for alias, metrics in get_connection_metrics().items():
+        for name in ('checkouts', 'reused', 'opened', 'closed', 'wait_timeouts'):
+            key = (f'wordweaver_db_connection_{name}_total', (('alias', alias),))
+            counters[key] = metrics.get(name, 0)
+    return counters
+
+
+def render_metrics():
+    """
+    the metrics of this process in the Prometheus text exposition format
+    """
+    with _registry_lock:
+        histograms = {
+            key: (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count)
+            for key, histogram in _histograms.items()
+        }
+        counters = dict(_counters)
+    counters.update(get_connection_counters())
+
+    lines = []
+    for metric in sorted({name for name, _ in histograms}):
+        lines.append(f'# TYPE {metric} histogram')
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip((*buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                le = bound if bound == '+Inf' else format_value(float(bound))
+                lines.append(
+                    f'{name}_bucket{format_labels((*labels, ("le", le)))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(float(total))}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+    for metric in sorted({name for name, _ in counters}):
+        lines.append(f'# TYPE {metric} counter')
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,35 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from services.metrics import render_metrics
+from users.permissions import CustomIsAdminUser
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # error responses (not authenticated, not authorized)
+        return orjson.dumps(data, default=str)
+
+
+class MetricsView(APIView):
+    """
+    request, cache and database connection metrics of the worker process
+    that serves the request, for a Prometheus scraper with a staff token
+    """
+    permission_classes = [CustomIsAdminUser]
+    renderer_classes = [PrometheusTextRenderer]
+    throttle_classes = []
+
+    def get(self, request, *args, **kwargs):
+        return Response(
+            render_metrics(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,168 @@
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+from WordWeaver.db_routers import primary_reads
+from services.metrics import record_cache_lookup
+
+
+def get_object_version_key(prefix, pk):
+    return f'{prefix}:{pk}:version'
+
+
+def new_object_version():
+    return uuid4().hex
+
+
+def get_object_state_token(state):
+    return hashlib.sha256('|'.join(map(str, state)).encode()).hexdigest()[:16]
+
+
+def get_object_data_key(prefix, pk, version, state=None):
+    """
+    the data of an object is keyed by its cache version and, when given,
+    its state (see ObjectCacheMixin.object_state_fields). The state is read
+    from the row, so a worker whose per-process cache still holds an old
+    version does not serve data of an older state of the row
+    """
+    key = f'{prefix}:{pk}:{version}'
+    if state is not None:
+        key = f'{key}:{get_object_state_token(state)}'
+    return key
+
+
+def get_object_version(prefix, pk):
+    """
+    every object has its own cache key version, invalidation replaces the
+    version so a value computed before the invalidation is written under a
+    key nobody reads anymore
+    """
+    version_key = get_object_version_key(prefix, pk)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, new_object_version(), timeout=None)
+        version = cache.get(version_key)
+    return version
+
+
+def get_or_set_object_data(prefix, pk, fetch, state=None):
+    key = get_object_data_key(prefix, pk, get_object_version(prefix, pk), state)
+    data = cache.get(key)
+    record_cache_lookup('object', data is not None)
+    if data is None:
+        data = fetch()
+        cache.set(key, data, timeout=settings.OBJECT_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_object_version(prefix, pk):
+    version_key = get_object_version_key(prefix, pk)
+    version = await cache.aget(version_key)
+    if version is None:
+        await cache.aadd(version_key, new_object_version(), timeout=None)
+        version = await cache.aget(version_key)
+    return version
+
+
+async def aget_or_set_object_data(prefix, pk, fetch, state=None):
+    """
+    async version of get_or_set_object_data, fetch is a coroutine function
+    """
+    key = get_object_data_key(prefix, pk, await aget_object_version(prefix, pk), state)
+    data = await cache.aget(key)
+    record_cache_lookup('object', data is not None)
+    if data is None:
+        data = await fetch()
+        await cache.aset(key, data, timeout=settings.OBJECT_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_object_data(prefix, pk):
+    cache.set(
+        get_object_version_key(prefix, pk),
+        new_object_version(),
+        timeout=None
+    )
+
+
+class ObjectCacheMixin:
+    """
+    read-through cache of the serialized object for the retrieve action,
+    a cache hit skips the serializer and everything but the one indexed
+    read of object_state_fields.
+
+    The state read keeps the cache correct across workers that do not
+    share a cache backend: invalidate_object_data only replaces the
+    version in the cache of the process that saved the object, the state
+    changes for every worker. Every save of a Blog or Comment moves
+    last_update_date, the denormalized counters of a blog are part of its
+    state
+    """
+    object_cache_prefix = None
+    object_state_fields = ['creation_date', 'last_update_date']
+
+    def get_object_cache_pk(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return self.get_queryset().model._meta.pk.to_python(
+                self.kwargs[lookup_url_kwarg]
+            )
+        except ValidationError:
+            return None
+
+    def get_object_state_queryset(self, pk):
+        # from the primary, like the data it validates
+        return self.get_queryset().order_by().filter(pk=pk).values_list(
+            *self.object_state_fields
+        )
+
+    def get_object_state(self):
+        """
+        (pk, object_state_fields of the row), the state is None when the
+        pk is invalid or the row does not exist. Read once per request
+        """
+        if not hasattr(self, '_object_state'):
+            pk = self.get_object_cache_pk()
+            state = None
+            if pk is not None:
+                with primary_reads():
+                    state = self.get_object_state_queryset(pk).first()
+            self._object_state = pk, state
+        return self._object_state
+
+    async def aget_object_state(self):
+        if not hasattr(self, '_object_state'):
+            pk = self.get_object_cache_pk()
+            state = None
+            if pk is not None:
+                with primary_reads():
+                    state = await self.get_object_state_queryset(pk).afirst()
+            self._object_state = pk, state
+        return self._object_state
+
+    def get_cached_object_data(self):
+        pk, state = self.get_object_state()
+        if state is None:
+            # raises the 404
+            return self.get_serializer(self.get_object()).data
+
+        def fetch():
+            # a replica may lag behind the write that replaced the version
+            with primary_reads():
+                return dict(self.get_serializer(self.get_object()).data)
+
+        return get_or_set_object_data(self.object_cache_prefix, pk, fetch, state)
+
+    async def aget_cached_object_data(self):
+        pk, state = await self.aget_object_state()
+        if state is None:
+            return self.get_serializer(await self.aget_object()).data
+
+        async def fetch():
+            with primary_reads():
+                return dict(self.get_serializer(await self.aget_object()).data)
+
+        return await aget_or_set_object_data(self.object_cache_prefix, pk, fetch, state)
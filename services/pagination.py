@@ -1,7 +1,264 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from collections import OrderedDict, namedtuple
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    PageNumberPagination,
+    _positive_int
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+KeysetCursor = namedtuple('KeysetCursor', ['reverse', 'creation_date', 'pk'])
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        async version of paginate_queryset, the count and the page are
+        fetched with the async ORM
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+        self.page.object_list = [obj async for obj in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Cursor pagination keyed on (creation_date, id). Every page is a range
+    scan starting right after the last row of the previous page, so the
+    page latency does not depend on the page depth and no COUNT query is
+    issued.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page(
+            [obj async for obj in self.get_page_queryset(queryset, request)]
+        )
+
+    def get_page_queryset(self, queryset, request):
+        """
+        the rows of the requested page plus one to tell whether there is
+        more in the walking direction
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor is not None else False
+        return self.order_queryset(
+            self.filter_by_cursor(queryset, self.cursor),
+            reverse
+        )[:self.page_size + 1]
+
+    def set_page(self, results):
+        reverse = self.cursor.reverse if self.cursor is not None else False
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = self.cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    @staticmethod
+    def order_queryset(queryset, reverse=False):
+        if reverse:
+            return queryset.order_by('creation_date', 'pk')
+        return queryset.order_by('-creation_date', '-pk')
+
+    @staticmethod
+    def filter_by_cursor(queryset, cursor):
+        if cursor is None:
+            return queryset
+        if cursor.reverse:
+            return queryset.filter(
+                Q(creation_date__gt=cursor.creation_date) |
+                Q(creation_date=cursor.creation_date, pk__gt=cursor.pk)
+            )
+        return queryset.filter(
+            Q(creation_date__lt=cursor.creation_date) |
+            Q(creation_date=cursor.creation_date, pk__lt=cursor.pk)
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            reverse, creation_date, pk = b64decode(
+                encoded.encode('ascii')
+            ).decode('ascii').split('|')
+            creation_date = parse_datetime(creation_date)
+            if creation_date is None:
+                raise ValueError
+            return KeysetCursor(
+                reverse=reverse == '1',
+                creation_date=creation_date,
+                pk=int(pk)
+            )
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        encoded = b64encode('|'.join([
+            '1' if cursor.reverse else '0',
+            cursor.creation_date.isoformat(),
+            str(cursor.pk)
+        ]).encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            last = self.page[-1]
+            return self.encode_cursor(
+                KeysetCursor(False, last.creation_date, last.pk)
+            )
+        return self.encode_cursor(self.cursor._replace(reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            first = self.page[0]
+            return self.encode_cursor(
+                KeysetCursor(True, first.creation_date, first.pk)
+            )
+        if self.cursor is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.cursor._replace(reverse=True))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'previous': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class PaginationModeMixin:
+    """
+    Lets a client pick the pagination mode per request, pass
+    pagination=cursor in query param (or a cursor) to get keyset pages,
+    page number pagination stays the default. cursor_pagination_actions
+    limits keyset pages to the actions listed there
+    """
+    pagination_mode_query_param = 'pagination'
+    cursor_pagination_class = KeysetCursorPagination
+    cursor_pagination_actions = None
+
+    def use_cursor_pagination(self):
+        if (
+            self.cursor_pagination_actions is not None
+            and getattr(self, 'action', None) not in self.cursor_pagination_actions
+        ):
+            return False
+        query_params = getattr(
+            getattr(self, 'request', None), 'query_params', {}
+        )
+        if query_params.get(self.pagination_mode_query_param) == 'cursor':
+            return True
+        return self.cursor_pagination_class.cursor_query_param in query_params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.pagination_class is None:
+                self._paginator = None
+            elif self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -12,7 +12,6 @@ from services.payment_processor_config import (
     PAYMENT_PROCESSOR_BILLERS_INFORMATION_SYNC_FREQUENCY
 )
 from services.constants import RequestTypes
-from django.core.cache import cache
 from django.conf import settings
 from services.decorators import (
     check_and_set_payment_processor_token
@@ -22,11 +21,20 @@ from services.helper_functions import (
     get_current_time,
     generate_unique_reference_id
 )
-from services.helper_functions import RequestMixin
+from services.helper_functions import (
+    RequestMixin,
+    index_by_field,
+    map_concurrently
+)
 from services.encryption_decryption_request_manager import (
     EncryptionDecryptionBodyMixin
 )
 from services.constants import CacheKey
+from services.crypto_executor import crypto_executor
+from services.cache_refresh import (
+    RefreshingCacheValue,
+    StaleWhileRevalidateCacheValue
+)
 from billing.models import (
     FetchBillRequest,
     FetchBillResponse
@@ -45,7 +53,7 @@ class PaymentProcessorGetToken(RequestMixin):
             raise ValueError(f"Unsupported duration format: {duration_str}")
 
     @staticmethod
-    def get_payment_processor_token(*args, **kwargs):
+    def request_payment_processor_token(*args, **kwargs):
         url = PAYMENT_PROCESSOR_URL+GET_TOKEN_ACCESS_URI
         payload = {
             'user_id': kwargs.get('user_id', settings.PAYMENT_PROCESSOR_USER_ID),
@@ -57,25 +65,59 @@ class PaymentProcessorGetToken(RequestMixin):
             'payload': payload
         }
         res = RequestMixin.make_request(**req_context)
-        res = res.json()
+        return res.json()
+
+    @staticmethod
+    def fetch_token():
+        res = PaymentProcessorGetToken.request_payment_processor_token()
+        if not res.get('security_token') or not res.get('token_exp_time'):
+            raise ValueError(f"No token in payment processor response: {res}")
+        return (
+            res.get('security_token'),
+            PaymentProcessorGetToken.convert_duration_to_seconds(
+                res.get('token_exp_time')
+            )
+        )
+
+    @staticmethod
+    def get_payment_processor_token(*args, **kwargs):
+        res = PaymentProcessorGetToken.request_payment_processor_token(
+            *args, **kwargs
+        )
         if res.get('token_exp_time') and res.get('token_exp_time') is not None:
-            cache.set(
-                key=CacheKey.PAYMENT_PROCESSOR_TOKEN.value,
-                value=res.get('security_token'),
-                timeout=PaymentProcessorGetToken.convert_duration_to_seconds(
+            PaymentProcessorGetToken.token_cache.set(
+                res.get('security_token'),
+                PaymentProcessorGetToken.convert_duration_to_seconds(
                     res.get('token_exp_time')
                 )
             )
         return res
 
+    @staticmethod
+    def get_valid_token():
+        """
+        the cached token, refreshed single flight across the workers once
+        it is close to token_exp_time
+        """
+        return PaymentProcessorGetToken.token_cache.get()
+
+
+PaymentProcessorGetToken.token_cache = RefreshingCacheValue(
+    key=CacheKey.PAYMENT_PROCESSOR_TOKEN.value,
+    fetch=PaymentProcessorGetToken.fetch_token,
+    refresh_margin=settings.PAYMENT_PROCESSOR_TOKEN_REFRESH_MARGIN,
+    lock_timeout=settings.PAYMENT_PROCESSOR_TOKEN_LOCK_TIMEOUT,
+    wait_timeout=settings.PAYMENT_PROCESSOR_TOKEN_WAIT_TIMEOUT
+)
+
 
 class PaymentProcessorFetchMdmBillersInformation(EncryptionDecryptionBodyMixin):
     @staticmethod
     @check_and_set_payment_processor_token
-    def fetch_mdm_billers_information(*args, **kwargs):
+    def request_mdm_billers_information(*args, **kwargs):
         headers = {
             'Content-Type': 'text/plain',
-            'Authorization': 'Bearer '+cache.get('payment_processor_token')
+            'Authorization': 'Bearer '+PaymentProcessorGetToken.get_valid_token()
         }
         url = PAYMENT_PROCESSOR_URL+FETCH_MDM_V2_ACCESS_URI
         payload = {
@@ -90,9 +132,7 @@ class PaymentProcessorFetchMdmBillersInformation(EncryptionDecryptionBodyMixin):
                 "trx_tms": get_current_time()
             }
         }
-        encrypted_payload = EncryptionDecryptionBodyMixin.encrypt_payload(
-            payload=payload
-        )
+        encrypted_payload = crypto_executor.encrypt(payload)
         req_context = {
             'req_type': RequestTypes.POST,
             'url': url,
@@ -101,36 +141,58 @@ class PaymentProcessorFetchMdmBillersInformation(EncryptionDecryptionBodyMixin):
             'payload_type': 'data'
         }
         res = RequestMixin.make_request(**req_context)
-        decrypted_payload = EncryptionDecryptionBodyMixin.decrypt_payload(
-            payload=res.content.decode('utf-8')
+        decrypted_payload = crypto_executor.decrypt(
+            res.content.decode('utf-8')
         )
+        return decrypted_payload
 
-        cache.set(
-            key=CacheKey.BILLERS_INFO.value,
-            value=decrypted_payload,
-            timeout=int(PAYMENT_PROCESSOR_BILLERS_INFORMATION_SYNC_FREQUENCY)
+    @staticmethod
+    def fetch_billers():
+        return (
+            PaymentProcessorFetchMdmBillersInformation.request_mdm_billers_information(),
+            int(PAYMENT_PROCESSOR_BILLERS_INFORMATION_SYNC_FREQUENCY)
+        )
+
+    @staticmethod
+    def fetch_mdm_billers_information(*args, **kwargs):
+        decrypted_payload = PaymentProcessorFetchMdmBillersInformation.request_mdm_billers_information(
+            *args, **kwargs)
+        PaymentProcessorFetchMdmBillersInformation.billers_cache.set(
+            decrypted_payload,
+            int(PAYMENT_PROCESSOR_BILLERS_INFORMATION_SYNC_FREQUENCY)
         )
         return decrypted_payload
 
     @staticmethod
     def fetch_mdm_billers_information_from_cache(*args, **kwargs):
-        billers_info = cache.get(CacheKey.BILLERS_INFO.value)
-        if not billers_info:
-            billers_info = PaymentProcessorFetchMdmBillersInformation.fetch_mdm_billers_information(
-                *args, **kwargs)
-            return billers_info
-        return billers_info
+        """
+        the last good billers information, refreshed in the background every
+        PAYMENT_PROCESSOR_BILLERS_INFORMATION_SYNC_FREQUENCY seconds. Only
+        the first call of a fresh cache waits for the payment processor
+        """
+        billers_cache = PaymentProcessorFetchMdmBillersInformation.billers_cache
+        billers_cache.start_background_refresh()
+        return billers_cache.get()
+
+    @staticmethod
+    def get_biller_information(bllr_id):
+        billers_cache = PaymentProcessorFetchMdmBillersInformation.billers_cache
+        billers_cache.start_background_refresh()
+        return billers_cache.get_index().get(bllr_id)
+
+
+PaymentProcessorFetchMdmBillersInformation.billers_cache = StaleWhileRevalidateCacheValue(
+    key=CacheKey.BILLERS_INFO.value,
+    fetch=PaymentProcessorFetchMdmBillersInformation.fetch_billers,
+    index=lambda billers_info: index_by_field(billers_info, 'bllr_id'),
+    lock_timeout=settings.PAYMENT_PROCESSOR_BILLERS_LOCK_TIMEOUT,
+    wait_timeout=settings.PAYMENT_PROCESSOR_BILLERS_WAIT_TIMEOUT
+)
 
 
 class PaymentProcessorFetchCustomerBillInformation(EncryptionDecryptionBodyMixin):
     @staticmethod
-    @check_and_set_payment_processor_token
-    def fetch_customer_bill_information(*args, **kwargs):
-        headers = {
-            'Content-Type': 'text/plain',
-            'Authorization': 'Bearer '+cache.get('payment_processor_token')
-        }
-        url = PAYMENT_PROCESSOR_URL+FETCH_BILL_ACCESS_URI
+    def build_fetch_bill_payload(**kwargs):
         payload = {
             "hdrs": {
                 "nm": "FETCH_BLL_REQ",
@@ -151,14 +213,35 @@ class PaymentProcessorFetchCustomerBillInformation(EncryptionDecryptionBodyMixin
             }
         }
         payload['bll_inf'].update(kwargs)
-        req = FetchBillRequest.objects.create(
+        return payload
+
+    @staticmethod
+    def build_fetch_bill_request(payload):
+        return FetchBillRequest(
             payload=payload,
             ref_id=payload.get('hdrs').get('ref_id', ""),
             bllr_id=payload.get('bll_inf').get('bllr_id')
         )
-        encrypted_payload = EncryptionDecryptionBodyMixin.encrypt_payload(
-            payload=payload
+
+    @staticmethod
+    def build_fetch_bill_response(req, decrypted_payload):
+        return FetchBillResponse(
+            fetch_bill_request=req,
+            response=decrypted_payload,
+            ref_id=decrypted_payload.get('hdrs').get('ref_id', ""),
+            trx_id=decrypted_payload.get('trx').get('trx_id'),
+            bllr_inf=decrypted_payload.get('bllr_inf'),
+            refno_ack=decrypted_payload.get('resp_status').get('refno_ack'),
         )
+
+    @staticmethod
+    def send_fetch_bill(payload, token):
+        headers = {
+            'Content-Type': 'text/plain',
+            'Authorization': 'Bearer '+token
+        }
+        url = PAYMENT_PROCESSOR_URL+FETCH_BILL_ACCESS_URI
+        encrypted_payload = crypto_executor.encrypt(payload)
         req_context = {
             'req_type': RequestTypes.POST,
             'url': url,
@@ -167,21 +250,92 @@ class PaymentProcessorFetchCustomerBillInformation(EncryptionDecryptionBodyMixin
             'payload_type': 'data'
         }
         res = RequestMixin.make_request(**req_context)
-        decrypted_payload = EncryptionDecryptionBodyMixin.decrypt_payload(
-            payload=res.content.decode('utf-8')
-        )
-        FetchBillResponse.objects.create(
-            fetch_bill_request=req,
-            response=decrypted_payload,
-            ref_id=decrypted_payload.get('hdrs').get('ref_id', ""),
-            trx_id=decrypted_payload.get('trx').get('trx_id'),
-            bllr_inf=decrypted_payload.get('bllr_inf'),
-            refno_ack=decrypted_payload.get('resp_status').get('refno_ack'),
+        return crypto_executor.decrypt(
+            res.content.decode('utf-8')
         )
+
+    @staticmethod
+    def get_fetch_bill_result(decrypted_payload):
         if decrypted_payload.get('bllr_inf').get('is_bll_pd') == 'Y':
             return _("bill is already paid")
         return decrypted_payload
 
+    @staticmethod
+    @check_and_set_payment_processor_token
+    def fetch_customer_bill_information(*args, **kwargs):
+        manager = PaymentProcessorFetchCustomerBillInformation
+        payload = manager.build_fetch_bill_payload(**kwargs)
+        req = manager.build_fetch_bill_request(payload)
+        req.save()
+        decrypted_payload = manager.send_fetch_bill(
+            payload,
+            PaymentProcessorGetToken.get_valid_token()
+        )
+        manager.build_fetch_bill_response(req, decrypted_payload).save()
+        return manager.get_fetch_bill_result(decrypted_payload)
+
+    @staticmethod
+    @check_and_set_payment_processor_token
+    def fetch_customer_bills_information(bills, max_workers=None):
+        """
+        fetch_customer_bill_information for a list of bll_inf dicts. The
+        request rows are written with one bulk_create before dispatching,
+        the bills are fetched by at most max_workers threads
+        (PAYMENT_PROCESSOR_BATCH_MAX_WORKERS by default, never more than the
+        HTTP pool size) and the response rows are written with one
+        bulk_create at the end. Returns one
+        {'ref_id', 'result', 'error'} dict per bill in input order, a bill
+        that failed has its error instead of a result
+        """
+        manager = PaymentProcessorFetchCustomerBillInformation
+        payloads = [manager.build_fetch_bill_payload(**bill) for bill in bills]
+        reqs = FetchBillRequest.objects.bulk_create(
+            [manager.build_fetch_bill_request(payload) for payload in payloads],
+            batch_size=settings.BULK_CREATE_BATCH_SIZE
+        )
+        if reqs and reqs[0].pk is None:
+            # MySQL returns no primary keys from a bulk insert
+            saved = {
+                req.ref_id: req for req in FetchBillRequest.objects.filter(
+                    ref_id__in=[req.ref_id for req in reqs]
+                )
+            }
+            reqs = [saved[req.ref_id] for req in reqs]
+
+        token = PaymentProcessorGetToken.get_valid_token()
+        max_workers = min(
+            max_workers or settings.PAYMENT_PROCESSOR_BATCH_MAX_WORKERS,
+            settings.HTTP_CLIENT_POOL_MAXSIZE
+        )
+        dispatched = map_concurrently(
+            lambda payload: manager.send_fetch_bill(payload, token),
+            payloads,
+            max_workers
+        )
+
+        results = []
+        responses = []
+        for req, (decrypted_payload, error) in zip(reqs, dispatched):
+            result = None
+            if error is None:
+                try:
+                    responses.append(
+                        manager.build_fetch_bill_response(req, decrypted_payload)
+                    )
+                    result = manager.get_fetch_bill_result(decrypted_payload)
+                except (AttributeError, TypeError) as excpt:
+                    error = excpt
+            results.append({
+                'ref_id': req.ref_id,
+                'result': result,
+                'error': None if error is None else str(error)
+            })
+        FetchBillResponse.objects.bulk_create(
+            responses,
+            batch_size=settings.BULK_CREATE_BATCH_SIZE
+        )
+        return results
+
 
 class PaymentProcessorPayBill(EncryptionDecryptionBodyMixin):
     @staticmethod
@@ -189,7 +343,7 @@ class PaymentProcessorPayBill(EncryptionDecryptionBodyMixin):
     def pay_bill(*args, **kwargs):
         headers = {
             'Content-Type': 'text/plain',
-            'Authorization': 'Bearer '+cache.get('payment_processor_token')
+            'Authorization': 'Bearer '+PaymentProcessorGetToken.get_valid_token()
         }
         url = PAYMENT_PROCESSOR_URL+PAY_BILL_ACCESS_URI
         payload = {
@@ -201,7 +355,8 @@ class PaymentProcessorPayBill(EncryptionDecryptionBodyMixin):
                 "ref_id": kwargs.get('ref_id')
             },
             "trx": {
-                "trx_id": generate_unique_transaction_id(),
+                # the same for every attempt of a payment job
+                "trx_id": kwargs.get('trx_id') or generate_unique_transaction_id(),
                 "trx_tms": get_current_time(),
                 "refno_ack": kwargs.get('refno_ack')
             },
@@ -216,9 +371,7 @@ class PaymentProcessorPayBill(EncryptionDecryptionBodyMixin):
             }
         }
         payload['bllr_inf'].update({"mode": "SAPI"})
-        encrypted_payload = EncryptionDecryptionBodyMixin.encrypt_payload(
-            payload=payload
-        )
+        encrypted_payload = crypto_executor.encrypt(payload)
         req_context = {
             'req_type': RequestTypes.POST,
             'url': url,
@@ -227,8 +380,8 @@ class PaymentProcessorPayBill(EncryptionDecryptionBodyMixin):
             'payload_type': 'data'
         }
         res = RequestMixin.make_request(**req_context)
-        decrypted_payload = EncryptionDecryptionBodyMixin.decrypt_payload(
-            payload=res.content.decode('utf-8')
+        decrypted_payload = crypto_executor.decrypt(
+            res.content.decode('utf-8')
         )
         return decrypted_payload
 
@@ -239,33 +392,31 @@ class PaymentProcessorCheckBillStatus(EncryptionDecryptionBodyMixin):
     def check_bill_status(*args, **kwargs):
         headers = {
             'Content-Type': 'text/plain',
-            'Authorization': 'Bearer '+cache.get('payment_processor_token')
+            'Authorization': 'Bearer '+PaymentProcessorGetToken.get_valid_token()
         }
         url = PAYMENT_PROCESSOR_URL+CHECK_BILL_STATUS_ACCESS_URI
         payload = {
             "hdrs": {
                 "nm": "CHCK_BLL_STTS_REQ",
                 "ver": "v1.3.0",
-                "tms": "2023-11-29T16:38:00+06:00",
-                "nd_id": "NS5981",
-                "ref_id": "DRAAKF0RPYFWXZXXUET4CY"
+                "tms": get_current_time(),
+                "nd_id": PAYMENT_PROCESSOR_ND_ID,
+                "ref_id": kwargs.get('ref_id')
             },
             "trx": {
-                "trx_id": "2VAFKAXEQJIIYHJVHZZIBI",
-                "trx_tms": "2023-11-29T16:38:00+06:00"
+                "trx_id": kwargs.get('trx_id') or generate_unique_transaction_id(),
+                "trx_tms": get_current_time()
             },
             "bll_inf": {
                 "mode": "SAPI",
-                "bllr_id": "b025"
+                "bllr_id": kwargs.get('bllr_id')
             },
             "usr_inf": {
-                "syndct_id": "s572"
+                "syndct_id": PAYMENT_PROCESSOR_SYNDCT_ID
             }
         }
 
-        encrypted_payload = EncryptionDecryptionBodyMixin.encrypt_payload(
-            payload=payload
-        )
+        encrypted_payload = crypto_executor.encrypt(payload)
         req_context = {
             'req_type': RequestTypes.POST,
             'url': url,
@@ -274,7 +425,7 @@ class PaymentProcessorCheckBillStatus(EncryptionDecryptionBodyMixin):
             'payload_type': 'data'
         }
         res = RequestMixin.make_request(**req_context)
-        decrypted_payload = EncryptionDecryptionBodyMixin.decrypt_payload(
-            payload=res.content.decode('utf-8')
+        decrypted_payload = crypto_executor.decrypt(
+            res.content.decode('utf-8')
         )
         return decrypted_payload
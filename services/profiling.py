@@ -0,0 +1,237 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import time
+import uuid
+
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async
+)
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+# ?profile=text answers with the report instead of the response of the view
+RETURN_REPORT = 'text'
+
+
+def get_profile_mode(request):
+    return request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_PARAM)
+
+
+def get_staff_user(request):
+    """
+    the staff user of the request, authenticated by the session or by the
+    DRF authentication classes, None for anyone else. The token lookups are
+    cached (users/authentication.py) so the view authenticates again for
+    next to nothing
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+    drf_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(drf_request)
+        except APIException:
+            return None
+        if result is not None:
+            return result[0] if result[0].is_staff else None
+    return None
+
+
+def get_profile_name(request):
+    path = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    return '{}-{}-{}-{}-{}'.format(
+        timezone.now().strftime('%Y%m%dT%H%M%S'),
+        os.getpid(),
+        request.method.lower(),
+        path[:80],
+        uuid.uuid4().hex[:8]
+    )
+
+
+def get_module_path(filename):
+    # blog/views/comment_views.py rather than /srv/app/blog/views/...
+    prefixes = [path for path in sys.path if path and filename.startswith(path + os.sep)]
+    if not prefixes:
+        return filename
+    return filename[len(max(prefixes, key=len)) + 1:]
+
+
+def format_function(function):
+    filename, line, name = function
+    if filename == '~':
+        # built in functions
+        return name
+    return f'{get_module_path(filename)}:{line}({name})'
+
+
+def get_hottest_functions(stats, include, sort, limit):
+    """
+    the limit functions of the profile with the highest tottime or cumtime
+    (sort) whose file path contains one of include
+    """
+    index = {'tottime': 2, 'cumtime': 3}[sort]
+    rows = [
+        (function, *timings[:4])
+        for function, timings in stats.stats.items()
+        if any(part in function[0] for part in include)
+    ]
+    rows.sort(key=lambda row: row[index + 1], reverse=True)
+    return rows[:limit]
+
+
+def build_report(profiler, request, response, duration):
+    """
+    a top-N summary of the hottest functions of the project and DRF
+    (PROFILING_INCLUDE) followed by the pstats listing of the whole profile
+    """
+    top_n = settings.PROFILING_TOP_N
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stream.write(
+        f'{request.method} {request.get_full_path()} -> {response.status_code} '
+        f'in {duration * 1000:.1f} ms, {stats.total_calls} calls\n'
+    )
+
+    for sort in ('tottime', 'cumtime'):
+        stream.write(
+            f'\nTop {top_n} by {sort} in {", ".join(settings.PROFILING_INCLUDE)}\n'
+            f'{"ncalls":>12} {"tottime":>10} {"cumtime":>10}  function\n'
+        )
+        rows = get_hottest_functions(stats, settings.PROFILING_INCLUDE, sort, top_n)
+        for function, primitive_calls, calls, tottime, cumtime in rows:
+            ncalls = str(calls) if calls == primitive_calls else f'{calls}/{primitive_calls}'
+            stream.write(
+                f'{ncalls:>12} {tottime:>10.6f} {cumtime:>10.6f}  '
+                f'{format_function(function)}\n'
+            )
+
+    stream.write('\nAll functions\n')
+    stats.sort_stats('cumulative').print_stats(top_n)
+    return stream.getvalue()
+
+
+def save_profile(profiler, report, name):
+    """
+    writes name.prof (pstats, for snakeviz or pstats.Stats) and name.txt
+    (the report) to PROFILING_DIR, then drops the oldest profiles beyond
+    PROFILING_MAX_PROFILES
+    """
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, f'{name}.prof'))
+    with open(os.path.join(directory, f'{name}.txt'), 'w') as report_file:
+        report_file.write(report)
+    prune_profiles(directory, settings.PROFILING_MAX_PROFILES)
+
+
+def prune_profiles(directory, keep):
+    """
+    delete the .prof and .txt of all but the keep newest profiles
+    """
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.prof'):
+            try:
+                profiles.append((entry.stat().st_mtime, entry.name[:-len('.prof')]))
+            except FileNotFoundError:
+                pass
+    profiles.sort()
+    for _, name in profiles[:max(len(profiles) - keep, 0)]:
+        for extension in ('prof', 'txt'):
+            try:
+                os.remove(os.path.join(directory, f'{name}.{extension}'))
+            except FileNotFoundError:
+                # pruned by another worker
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    runs a request under cProfile when
+
+    - a staff user asks for it with an X-Profile header or a profile query
+      param, the profile is stored in PROFILING_DIR and its name returned in
+      the X-Profile-Id header, or with the value text the report replaces
+      the response
+    - it is picked at random, PROFILING_SAMPLE_RATE of all requests (0 by
+      default) are profiled and stored for offline analysis
+
+    The middleware is async capable so it keeps the ASGI middleware chain
+    async, a request that is not profiled is awaited straight through.
+    cProfile only sees the thread it is enabled in, so under ASGI a
+    profiled request runs in a thread (sync_to_async) that awaits the rest
+    of the chain with async_to_sync, the sync views below it then run in
+    that same thread. Async views run on the event loop and show up as the
+    wait in async_to_sync
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        mode = get_profile_mode(request)
+        if mode and get_staff_user(request) is None:
+            mode = None
+        if not self.is_profiled(mode):
+            return self.get_response(request)
+        return self.profile(request, mode, self.get_response)
+
+    async def __acall__(self, request):
+        mode = get_profile_mode(request)
+        if mode and await sync_to_async(get_staff_user)(request) is None:
+            mode = None
+        if not self.is_profiled(mode):
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(
+            request, mode, async_to_sync(self.get_response))
+
+    @staticmethod
+    def is_profiled(mode):
+        return bool(mode) or random.random() < settings.PROFILING_SAMPLE_RATE
+
+    @staticmethod
+    def profile(request, mode, get_response):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active in this process (Python 3.12+)
+            return get_response(request)
+        started = time.perf_counter()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+
+        report = build_report(profiler, request, response, duration)
+        if mode == RETURN_REPORT:
+            return HttpResponse(report, content_type='text/plain; charset=utf-8')
+        name = get_profile_name(request)
+        save_profile(profiler, report, name)
+        if mode:
+            response[PROFILE_ID_HEADER] = name
+        return response
@@ -0,0 +1,116 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class QuerySetOptimization:
+    """
+    select_related/prefetch_related/only lookups needed to render a
+    serializer without a query per row
+    """
+
+    def __init__(self):
+        self.select_related = []
+        self.prefetch_related = []
+        self.only = []
+        self.unknown_sources = []
+        self.can_defer = True
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        unknown_sources = set(self.unknown_sources) - set(queryset.query.annotations)
+        if self.can_defer and not unknown_sources:
+            queryset = queryset.only(
+                *self.only,
+                *[field.lstrip('-') for field in queryset.model._meta.ordering]
+            )
+        return queryset
+
+
+def analyze_serializer(serializer, model, prefix=''):
+    optimization = QuerySetOptimization()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+            optimization.can_defer = False
+            continue
+        name = field.source_attrs[0]
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            optimization.unknown_sources.append(prefix + name)
+            continue
+
+        path = prefix + name
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if not model_field.is_relation:
+            optimization.only.append(path)
+        elif model_field.many_to_many or model_field.one_to_many:
+            if isinstance(nested, serializers.BaseSerializer):
+                related = analyze_serializer(nested, model_field.related_model)
+                if model_field.one_to_many:
+                    related.only.append(model_field.field.name)
+                optimization.prefetch_related.append(Prefetch(
+                    path,
+                    queryset=related.apply(
+                        model_field.related_model._default_manager.all()
+                    )
+                ))
+            else:
+                optimization.prefetch_related.append(path)
+        elif (
+            isinstance(field, serializers.PrimaryKeyRelatedField)
+            and len(field.source_attrs) == 1
+            and model_field.concrete
+        ):
+            # the primary key comes from the local column, no join needed
+            optimization.only.append(path)
+        else:
+            optimization.select_related.append(path)
+            if model_field.concrete:
+                optimization.only.append(path)
+            if isinstance(nested, serializers.BaseSerializer):
+                related = analyze_serializer(
+                    nested, model_field.related_model, prefix=path + '__'
+                )
+                optimization.select_related += related.select_related
+                optimization.prefetch_related += [
+                    Prefetch(path + '__' + lookup.prefetch_to, queryset=lookup.queryset)
+                    if isinstance(lookup, Prefetch) else path + '__' + lookup
+                    for lookup in related.prefetch_related
+                ]
+                if related.can_defer and not related.unknown_sources:
+                    optimization.only += related.only
+    return optimization
+
+
+@lru_cache(maxsize=None)
+def get_queryset_optimization(serializer_class, model):
+    return analyze_serializer(serializer_class(), model)
+
+
+def optimize_queryset(queryset, serializer_class):
+    return get_queryset_optimization(
+        serializer_class, queryset.model
+    ).apply(queryset)
+
+
+class QuerySetOptimizationMixin:
+    """
+    applies the select_related/prefetch_related/only lookups derived from
+    the declared fields of the active serializer to the queryset of the
+    read actions listed in optimized_actions
+    """
+    optimized_actions = ['list', 'retrieve']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) in self.optimized_actions:
+            queryset = optimize_queryset(queryset, self.get_serializer_class())
+        return queryset
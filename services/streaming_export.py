@@ -0,0 +1,113 @@
+import csv
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils import encoders
+
+from services.pagination import KeysetCursor, KeysetCursorPagination
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """
+    file-like object for csv.writer that hands the written line back
+    instead of buffering it
+    """
+
+    def write(self, value):
+        return value
+
+
+def iterate_in_chunks(queryset, chunk_size):
+    """
+    yield the rows of queryset as lists of at most chunk_size objects, in
+    the (creation_date, id) order of the list views. Every chunk is its own
+    keyset query, so only one chunk is held in memory even with database
+    drivers that buffer a whole result set client side, like mysqlclient
+    """
+    cursor = None
+    while True:
+        chunk = list(
+            KeysetCursorPagination.order_queryset(
+                KeysetCursorPagination.filter_by_cursor(queryset, cursor)
+            )[:chunk_size].iterator(chunk_size=chunk_size)
+        )
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        cursor = KeysetCursor(False, chunk[-1].creation_date, chunk[-1].pk)
+
+
+def stream_ndjson(queryset, serializer_class, chunk_size):
+    default = encoders.JSONEncoder().default
+    for chunk in iterate_in_chunks(queryset, chunk_size):
+        yield b''.join(
+            orjson.dumps(
+                row,
+                default=default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            )
+            for row in serializer_class(chunk, many=True).data
+        )
+
+
+def stream_csv(queryset, serializer_class, chunk_size):
+    fieldnames = list(serializer_class().fields.keys())
+    writer = csv.DictWriter(Echo(), fieldnames=fieldnames)
+    yield writer.writeheader()
+    for chunk in iterate_in_chunks(queryset, chunk_size):
+        yield ''.join(
+            writer.writerow(row)
+            for row in serializer_class(chunk, many=True).data
+        )
+
+
+async def aiterate(iterator):
+    """
+    async counterpart of a sync stream for ASGI, every item (a keyset query
+    and the serialization of its chunk) is produced in a thread with
+    sync_to_async. Django buffers a sync streaming_content whole before
+    sending it under ASGI, this one is sent chunk by chunk
+    """
+    iterator = iter(iterator)
+    done = object()
+    while True:
+        item = await sync_to_async(next)(iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def is_asgi_request(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def streaming_export_response(request, queryset, serializer_class, export_format, filename):
+    if export_format not in EXPORT_CONTENT_TYPES:
+        raise ValidationError({
+            'export_format': _('export format must be one of %(formats)s') % {
+                'formats': ', '.join(EXPORT_CONTENT_TYPES)
+            }
+        })
+    stream = stream_ndjson if export_format == 'ndjson' else stream_csv
+    content = stream(queryset, serializer_class, settings.EXPORT_CHUNK_SIZE)
+    if is_asgi_request(request):
+        content = aiterate(content)
+    response = StreamingHttpResponse(
+        content,
+        content_type=EXPORT_CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
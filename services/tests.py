@@ -0,0 +1,821 @@
+import importlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from copy import copy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType, SimpleNamespace
+from unittest import mock
+
+import orjson
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from services import helper_functions, http_client
+from services.cache_refresh import (
+    CacheLock,
+    RefreshingCacheValue,
+    StaleWhileRevalidateCacheValue
+)
+from services.constants import CacheKey, RequestTypes
+from services.crypto_executor import CryptoExecutor, crypto_executor, get_mp_context
+from services.metrics import render_metrics, reset_metrics
+from services.profiling import PROFILE_ID_HEADER
+from users.tokens import get_or_create_token
+from services.helper_functions import (
+    RequestMixin,
+    index_by_field,
+    map_concurrently
+)
+
+
+def tag_with_pid(payload):
+    return {'pid': os.getpid(), 'payload': payload}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def respond(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, self.client_address))
+            status = server.statuses.pop(0) if server.statuses else 200
+        length = int(self.headers.get('Content-Length') or 0)
+        received = json.loads(self.rfile.read(length)) if length else None
+        body = json.dumps({'path': self.path, 'received': received}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(
+    HTTP_CLIENT_RETRY_TOTAL=2,
+    HTTP_CLIENT_RETRY_BACKOFF_FACTOR=0,
+    HTTP_CLIENT_TIMEOUT=5
+)
+class HttpClientTestCase(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.statuses = []
+        http_client.reset_http_client()
+        self.addCleanup(http_client.reset_http_client)
+
+    def test_connection_is_reused(self):
+        for index in range(3):
+            response = RequestMixin.make_request(
+                req_type=RequestTypes.POST,
+                url=f'{self.url}/bill/{index}',
+                payload={'index': index}
+            )
+            self.assertEqual(response.json()['received'], {'index': index})
+        client_addresses = {address for _, _, address in self.server.requests}
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(client_addresses), 1)
+
+    def test_http_and_https_share_the_adapter(self):
+        session = http_client.get_http_session()
+        self.assertIs(session.get_adapter('https://example.com'), session.get_adapter(self.url))
+        self.assertEqual(session.get_adapter(self.url).max_retries.total, 2)
+
+    def test_adapter_is_rebuilt_after_fork(self):
+        adapter = http_client.get_http_adapter()
+        self.assertIs(http_client.get_http_adapter(), adapter)
+        with mock.patch('services.http_client.os.getpid', return_value=-1):
+            self.assertIsNot(http_client.get_http_session().get_adapter(self.url), adapter)
+
+    def test_idempotent_requests_are_retried(self):
+        self.server.statuses = [503, 502]
+        response = RequestMixin.make_request(req_type=RequestTypes.GET, url=f'{self.url}/billers')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_post_is_not_retried_on_status(self):
+        self.server.statuses = [503]
+        response = RequestMixin.make_request(
+            req_type=RequestTypes.POST,
+            url=f'{self.url}/pay',
+            payload={}
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_concurrent_requests_keep_input_order(self):
+        requests_kwargs = [
+            {'req_type': RequestTypes.GET, 'url': f'{self.url}/bill/{index}'}
+            for index in range(6)
+        ] + [{'req_type': RequestTypes.GET, 'url': 'http://127.0.0.1:1/closed'}]
+        responses = async_to_sync(RequestMixin.amake_requests)(requests_kwargs, concurrency=3)
+        self.assertEqual(
+            [response.json()['path'] for response in responses[:6]],
+            [f'/bill/{index}' for index in range(6)]
+        )
+        self.assertIsInstance(responses[6], Exception)
+
+
+class RefreshingCacheValueTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tokens = iter(f'token-{index}' for index in range(100))
+        self.token_cache = RefreshingCacheValue(
+            key='test_token',
+            fetch=self.fetch,
+            refresh_margin=60,
+            wait_timeout=5
+        )
+        self.addCleanup(self.token_cache.stop_background_refresh)
+        self.addCleanup(cache.clear)
+
+    def fetch(self):
+        time.sleep(0.2)
+        return next(self.tokens), 3600
+
+    def test_concurrent_callers_fetch_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.token_cache.get()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.token_cache.fetch_count, 1)
+        self.assertEqual(results, ['token-0'] * 8)
+        self.assertEqual(cache.get('test_token'), 'token-0')
+
+    def test_valid_token_served_while_another_caller_refreshes(self):
+        self.token_cache.set('old', 3600)
+        cache.set('test_token:refresh_at', time.time() - 1)
+        lock = CacheLock('test_token:lock', 30)
+        self.assertTrue(lock.acquire())
+        self.assertEqual(self.token_cache.get(), 'old')
+        self.assertEqual(self.token_cache.fetch_count, 0)
+        lock.release()
+        self.assertEqual(self.token_cache.get(), 'token-0')
+
+    def test_failed_early_refresh_serves_valid_token(self):
+        self.token_cache.set('old', 3600)
+        cache.set('test_token:refresh_at', time.time() - 1)
+        self.token_cache.fetch = mock.Mock(side_effect=ConnectionError('token endpoint down'))
+        with self.assertLogs('services.cache_refresh', 'ERROR'):
+            self.assertEqual(self.token_cache.get(), 'old')
+        self.assertIsNone(cache.get('test_token:lock'))
+
+        cache.delete('test_token')
+        with self.assertRaises(ConnectionError):
+            self.token_cache.get()
+
+    def test_refresh_before_expiry(self):
+        self.token_cache.set('old', 300)
+        self.assertAlmostEqual(self.token_cache.seconds_until_refresh(), 240, delta=1)
+        self.assertEqual(self.token_cache.get(), 'old')
+        self.assertEqual(self.token_cache.fetch_count, 0)
+
+    def test_background_refresh(self):
+        self.token_cache.set('old', 3600)
+        cache.set('test_token:refresh_at', time.time() - 1)
+        self.token_cache.start_background_refresh()
+        self.assertIs(
+            self.token_cache.start_background_refresh(),
+            self.token_cache.start_background_refresh()
+        )
+        deadline = time.monotonic() + 5
+        while cache.get('test_token') == 'old' and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(cache.get('test_token'), 'token-0')
+        self.assertEqual(self.token_cache.fetch_count, 1)
+
+
+class StaleWhileRevalidateCacheValueTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.fetched = threading.Event()
+        self.versions = iter(range(100))
+        self.billers_cache = StaleWhileRevalidateCacheValue(
+            key='test_billers',
+            fetch=self.fetch,
+            index=lambda billers: index_by_field(billers, 'bllr_id')
+        )
+        self.addCleanup(self.billers_cache.stop_background_refresh)
+        self.addCleanup(cache.clear)
+
+    def fetch(self):
+        version = next(self.versions)
+        time.sleep(0.1)
+        self.fetched.set()
+        return {'billers': [{'bllr_id': 'b001', 'version': version}]}, 60
+
+    def test_first_call_waits_for_fetch(self):
+        self.assertEqual(self.billers_cache.get()['billers'][0]['version'], 0)
+        self.assertEqual(self.billers_cache.fetch_count, 1)
+
+    def test_stale_value_served_and_revalidated_in_background(self):
+        self.billers_cache.set({'billers': [{'bllr_id': 'b001', 'version': 'stale'}]}, 60)
+        cache.set('test_billers:refresh_at', time.time() - 1, timeout=None)
+        started = time.monotonic()
+        self.assertEqual(self.billers_cache.get()['billers'][0]['version'], 'stale')
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertTrue(self.fetched.wait(5))
+        deadline = time.monotonic() + 5
+        while cache.get('test_billers:refresh_at') < time.time() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.billers_cache.get()['billers'][0]['version'], 0)
+        self.assertEqual(self.billers_cache.fetch_count, 1)
+
+    def test_index_rebuilt_per_version(self):
+        index = self.billers_cache.get_index()
+        self.assertEqual(index['b001']['version'], 0)
+        self.assertIs(self.billers_cache.get_index(), index)
+        self.billers_cache.set({'billers': [{'bllr_id': 'b002'}]}, 60)
+        self.assertEqual(list(self.billers_cache.get_index()), ['b002'])
+
+    def test_index_hit_reads_only_the_version(self):
+        index = self.billers_cache.get_index()
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'get', wraps=cache.get) as get:
+            self.assertIs(self.billers_cache.get_index(), index)
+        # the biller list itself is not read
+        self.assertNotIn('test_billers', [call.args[0] for call in get.call_args_list])
+        get_many.assert_called_once_with(['test_billers:version', 'test_billers:refresh_at'])
+
+    def test_index_by_field(self):
+        payload = {
+            'hdrs': {'nm': 'FETCH_MDM_DATA_RESP'},
+            'bllrs': [
+                {'bllr_id': 'b001', 'nm': 'Electricity'},
+                {'category': {'items': [{'bllr_id': 'b002', 'nm': 'Water'}]}}
+            ]
+        }
+        index = index_by_field(payload, 'bllr_id')
+        self.assertEqual(list(index), ['b001', 'b002'])
+        self.assertEqual(index['b002']['nm'], 'Water')
+
+
+class MapConcurrentlyTestCase(SimpleTestCase):
+    def test_results_in_input_order_with_bounded_parallelism(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def fetch_bill(index):
+            with lock:
+                running.append(index)
+                peak.append(len(running))
+            time.sleep(0.05 * (5 - index % 5))
+            with lock:
+                running.remove(index)
+            if index == 3:
+                raise ValueError('bllr_id missing')
+            return f'bill-{index}'
+
+        results = map_concurrently(fetch_bill, range(10), max_workers=4)
+        self.assertLessEqual(max(peak), 4)
+        self.assertEqual(
+            [result for result, _ in results],
+            [None if index == 3 else f'bill-{index}' for index in range(10)]
+        )
+        self.assertIsInstance(results[3][1], ValueError)
+        self.assertEqual([error for _, error in results].count(None), 9)
+
+    def test_empty_input(self):
+        self.assertEqual(map_concurrently(str, [], max_workers=4), [])
+
+
+class CryptoExecutorTestCase(SimpleTestCase):
+    def setUp(self):
+        self.executor = CryptoExecutor(
+            encrypt='services.tests.tag_with_pid',
+            decrypt='services.tests.tag_with_pid',
+            threshold=1024,
+            max_workers=1
+        )
+        self.addCleanup(self.executor.shutdown)
+
+    def test_small_payloads_run_inline(self):
+        result = self.executor.encrypt({'bllr_id': 'b001'})
+        self.assertEqual(result, {'pid': os.getpid(), 'payload': {'bllr_id': 'b001'}})
+
+    def test_large_payloads_run_in_the_pool(self):
+        payload = 'x' * 2048
+        first = self.executor.decrypt(payload)
+        second = self.executor.encrypt({'bllrs': [payload]})
+        self.assertEqual(first['payload'], payload)
+        self.assertNotEqual(first['pid'], os.getpid())
+        self.assertEqual(first['pid'], second['pid'])
+
+    def test_pool_processes_are_not_forked(self):
+        self.assertEqual(get_mp_context().get_start_method(), 'forkserver')
+        with override_settings(CRYPTO_EXECUTOR_START_METHOD='not-available'):
+            self.assertEqual(get_mp_context().get_start_method(), 'spawn')
+
+    def test_pool_disabled(self):
+        executor = CryptoExecutor(
+            encrypt='services.tests.tag_with_pid',
+            threshold=0,
+            max_workers=0
+        )
+        self.assertEqual(executor.encrypt('x' * 2048)['pid'], os.getpid())
+
+
+class FakeRows:
+    """
+    the part of a model manager the payment processor manager uses, rows
+    live in memory. With return_pks=False bulk_create returns its objects
+    without primary keys, as on MySQL
+    """
+
+    def __init__(self, return_pks=True):
+        self.rows = []
+        self.return_pks = return_pks
+
+    def insert(self, instance):
+        self.rows.append(instance)
+        instance.pk = len(self.rows)
+
+    def bulk_create(self, instances, batch_size=None):
+        for instance in instances:
+            self.insert(copy(instance))
+        if self.return_pks:
+            return self.rows[-len(instances):] if instances else []
+        return instances
+
+    def filter(self, ref_id__in):
+        return [row for row in self.rows if row.ref_id in ref_id__in]
+
+
+class FakeRow:
+    objects = None
+
+    def __init__(self, **fields):
+        self.pk = None
+        self.__dict__.update(fields)
+
+    def save(self):
+        self.objects.insert(self)
+
+
+class FakeFetchBillRequest(FakeRow):
+    pass
+
+
+class FakeFetchBillResponse(FakeRow):
+    pass
+
+
+class FakePaymentProcessor:
+    """
+    the payment processor behind RequestMixin.make_request, payloads are
+    "encrypted" as plain JSON by the stub encryption module
+    """
+    url = 'https://processor.test'
+
+    def __init__(self):
+        self.requests = []
+        self.tokens = (f'token-{index}' for index in itertools.count())
+        self.unreachable_billers = set()
+        self.billers = [{'bllr_id': 'b025', 'bllr_nm': 'Power'},
+                        {'bllr_id': 'b031', 'bllr_nm': 'Water'}]
+
+    def make_request(self, req_type, url, payload, headers=None, payload_type=None):
+        path = url[len(self.url):]
+        self.requests.append((path, headers))
+        if path == '/token':
+            token = next(self.tokens)
+            return SimpleNamespace(
+                json=lambda: {'security_token': token, 'token_exp_time': '1h'})
+        body = orjson.loads(payload)
+        response = getattr(self, path.strip('/').replace('-', '_'))(body)
+        return SimpleNamespace(content=orjson.dumps(response))
+
+    def get_paths(self):
+        return [path for path, headers in self.requests]
+
+    def mdm(self, body):
+        return {'hdrs': body['hdrs'], 'bllrs': self.billers}
+
+    def fetch_bill(self, body):
+        bllr_id = body['bll_inf']['bllr_id']
+        if bllr_id in self.unreachable_billers:
+            raise ConnectionError(f'{bllr_id} unreachable')
+        return {
+            'hdrs': {'ref_id': body['hdrs']['ref_id']},
+            'trx': body['trx'],
+            'bllr_inf': {'bllr_id': bllr_id, 'is_bll_pd': 'N', 'bll_amnt': '150.00'},
+            'resp_status': {'refno_ack': f'ACK-{bllr_id}'},
+        }
+
+    def pay_bill(self, body):
+        return {key: body[key] for key in ('hdrs', 'trx', 'pyd_inf', 'bllr_inf')}
+
+    def check_bill_status(self, body):
+        return {'hdrs': body['hdrs'], 'trx': body['trx'], 'bll_inf': body['bll_inf']}
+
+
+def get_payment_processor_stubs():
+    """
+    stand-ins for the modules services/payment_processor_manager.py imports
+    that are not part of this repository: the processor configuration, the
+    payload encryption and the billing models
+    """
+    config = ModuleType('services.payment_processor_config')
+    config.__dict__.update(
+        PAYMENT_PROCESSOR_SYNDCT_ID='s572',
+        PAYMENT_PROCESSOR_BILL_FETCH_MODE='SAPI',
+        PAYMENT_PROCESSOR_URL=FakePaymentProcessor.url,
+        PAYMENT_PROCESSOR_ND_ID='NS5981',
+        GET_TOKEN_ACCESS_URI='/token',
+        FETCH_MDM_V2_ACCESS_URI='/mdm',
+        FETCH_BILL_ACCESS_URI='/fetch-bill',
+        PAY_BILL_ACCESS_URI='/pay-bill',
+        CHECK_BILL_STATUS_ACCESS_URI='/check-bill-status',
+        PAYMENT_PROCESSOR_BILLERS_INFORMATION_SYNC_FREQUENCY='3600'
+    )
+    encryption = ModuleType('services.encryption_decryption_request_manager')
+    encryption.EncryptionDecryptionBodyMixin = type(
+        'EncryptionDecryptionBodyMixin',
+        (),
+        {
+            'encrypt_payload': staticmethod(lambda payload: orjson.dumps(payload)),
+            'decrypt_payload': staticmethod(lambda payload: orjson.loads(payload)),
+        }
+    )
+    billing = ModuleType('billing')
+    billing.models = ModuleType('billing.models')
+    billing.models.FetchBillRequest = FakeFetchBillRequest
+    billing.models.FetchBillResponse = FakeFetchBillResponse
+    return {
+        'services.payment_processor_config': config,
+        'services.encryption_decryption_request_manager': encryption,
+        'billing': billing,
+        'billing.models': billing.models,
+    }
+
+
+@override_settings(
+    PAYMENT_PROCESSOR_USER_ID='user',
+    PAYMENT_PROCESSOR_PASS_KEY='pass-key',
+    CRYPTO_EXECUTOR_MAX_WORKERS=0
+)
+class PaymentProcessorManagerTestCase(SimpleTestCase):
+    """
+    services/payment_processor_manager.py against FakePaymentProcessor,
+    imported afresh for every test with the stubs of the modules it needs
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.processor = FakePaymentProcessor()
+        ids = itertools.count()
+        patches = [
+            mock.patch.dict(sys.modules, get_payment_processor_stubs()),
+            mock.patch.object(
+                RequestMixin, 'make_request', side_effect=self.processor.make_request),
+            mock.patch.object(
+                helper_functions, 'get_current_time', create=True,
+                new=lambda: '2024-06-01T00:00:00+06:00'),
+            mock.patch.object(
+                helper_functions, 'generate_unique_transaction_id', create=True,
+                new=lambda: f'TRX{next(ids):019}'),
+            mock.patch.object(
+                helper_functions, 'generate_unique_reference_id', create=True,
+                new=lambda: f'REF{next(ids):019}'),
+            mock.patch.object(FakeFetchBillRequest, 'objects', FakeRows()),
+            mock.patch.object(FakeFetchBillResponse, 'objects', FakeRows()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        # restored with the rest of sys.modules by the first patch
+        sys.modules.pop('services.payment_processor_manager', None)
+        self.manager = importlib.import_module('services.payment_processor_manager')
+        for refreshing in (
+            self.manager.PaymentProcessorGetToken.token_cache,
+            self.manager.PaymentProcessorFetchMdmBillersInformation.billers_cache,
+        ):
+            self.addCleanup(refreshing.stop_background_refresh)
+
+    def pay_bill(self, **kwargs):
+        return self.manager.PaymentProcessorPayBill.pay_bill(
+            ref_id='REF0001', pyd_amnt='150.00', bllr_inf={'bllr_id': 'b025'}, **kwargs)
+
+    def test_token_is_fetched_once_and_cached(self):
+        self.pay_bill()
+        self.pay_bill()
+        self.assertEqual(self.processor.get_paths(), ['/token', '/pay-bill', '/pay-bill'])
+        headers = self.processor.requests[-1][1]
+        self.assertEqual(headers['Authorization'], 'Bearer token-0')
+        self.assertEqual(cache.get(CacheKey.PAYMENT_PROCESSOR_TOKEN.value), 'token-0')
+        token_cache = self.manager.PaymentProcessorGetToken.token_cache
+        self.assertAlmostEqual(token_cache.seconds_until_refresh(), 3600 - 60, delta=2)
+
+    def test_token_is_refreshed_once_due(self):
+        self.pay_bill()
+        # the request refreshes, not the background thread
+        self.manager.PaymentProcessorGetToken.token_cache.stop_background_refresh()
+        cache.set(f'{CacheKey.PAYMENT_PROCESSOR_TOKEN.value}:refresh_at', time.time() - 1)
+        self.pay_bill()
+        self.assertEqual(self.processor.requests[-1][1]['Authorization'], 'Bearer token-1')
+        self.assertEqual(self.processor.get_paths().count('/token'), 2)
+
+    def test_biller_information_from_the_cached_catalogue(self):
+        billers = self.manager.PaymentProcessorFetchMdmBillersInformation
+        self.assertEqual(
+            billers.get_biller_information('b025'), {'bllr_id': 'b025', 'bllr_nm': 'Power'})
+        self.assertEqual(billers.get_biller_information('b031')['bllr_nm'], 'Water')
+        self.assertIsNone(billers.get_biller_information('b999'))
+        self.assertEqual(
+            billers.fetch_mdm_billers_information_from_cache()['bllrs'], self.processor.billers)
+        self.assertEqual(self.processor.get_paths(), ['/token', '/mdm'])
+
+    def test_stale_catalogue_is_served_while_revalidating(self):
+        billers = self.manager.PaymentProcessorFetchMdmBillersInformation
+        # the request revalidates, not the background thread
+        patch = mock.patch.object(billers.billers_cache, 'start_background_refresh')
+        patch.start()
+        self.addCleanup(patch.stop)
+        billers.get_biller_information('b025')
+        self.processor.billers = [{'bllr_id': 'b025', 'bllr_nm': 'Power and Light'}]
+        cache.set(f'{CacheKey.BILLERS_INFO.value}:refresh_at', time.time() - 1)
+        released = threading.Event()
+        mdm = self.processor.mdm
+        self.processor.mdm = lambda body: released.wait(5) and mdm(body)
+
+        self.assertEqual(billers.get_biller_information('b025')['bllr_nm'], 'Power')
+        released.set()
+        deadline = time.monotonic() + 5
+        while billers.billers_cache._revalidating.locked() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(billers.get_biller_information('b025')['bllr_nm'], 'Power and Light')
+        self.assertIsNone(billers.get_biller_information('b031'))
+
+    def fetch_bills(self):
+        self.processor.unreachable_billers.add('b031')
+        return self.manager.PaymentProcessorFetchCustomerBillInformation.fetch_customer_bills_information(
+            [{'bllr_id': 'b025'}, {'bllr_id': 'b031'}, {'bllr_id': 'b044'}],
+            max_workers=2
+        )
+
+    def test_fetch_customer_bills_information(self):
+        results = self.fetch_bills()
+        self.assertEqual(
+            [result['result']['bllr_inf']['bllr_id'] if result['result'] else None
+             for result in results],
+            ['b025', None, 'b044']
+        )
+        self.assertEqual(results[1]['error'], 'b031 unreachable')
+        self.assertEqual(self.processor.get_paths().count('/fetch-bill'), 3)
+
+        requests = FakeFetchBillRequest.objects.rows
+        self.assertEqual([result['ref_id'] for result in results],
+                         [request.ref_id for request in requests])
+        responses = FakeFetchBillResponse.objects.rows
+        self.assertEqual(
+            [response.fetch_bill_request.pk for response in responses],
+            [requests[0].pk, requests[2].pk]
+        )
+        self.assertEqual(responses[1].refno_ack, 'ACK-b044')
+
+    def test_fetch_customer_bills_information_reloads_mysql_pks(self):
+        FakeFetchBillRequest.objects.return_pks = False
+        self.fetch_bills()
+        requests = FakeFetchBillRequest.objects.rows
+        self.assertEqual([request.pk for request in requests], [1, 2, 3])
+        self.assertEqual(
+            [response.fetch_bill_request for response in FakeFetchBillResponse.objects.rows],
+            [requests[0], requests[2]]
+        )
+
+    def test_fetch_customer_bill_information(self):
+        result = self.manager.PaymentProcessorFetchCustomerBillInformation.fetch_customer_bill_information(
+            bllr_id='b025')
+        self.assertEqual(result['bllr_inf']['bll_amnt'], '150.00')
+        self.assertEqual(len(FakeFetchBillRequest.objects.rows), 1)
+        self.assertIs(
+            FakeFetchBillResponse.objects.rows[0].fetch_bill_request,
+            FakeFetchBillRequest.objects.rows[0]
+        )
+
+    @override_settings(CRYPTO_EXECUTOR_MAX_WORKERS=1, CRYPTO_EXECUTOR_PROCESS_THRESHOLD=1024)
+    def test_payloads_are_encrypted_by_the_crypto_executor(self):
+        submitted = []
+
+        def submit(function, path, payload):
+            # the pool, run inline: the stubs only exist in this process
+            submitted.append((path, payload))
+            future = Future()
+            future.set_result(function(path, payload))
+            return future
+
+        pool = SimpleNamespace(submit=submit)
+        with mock.patch.object(crypto_executor, 'get_pool', return_value=pool):
+            self.pay_bill(pyd_trxn_refid='P' * 1100)
+        self.assertEqual(
+            [path for path, payload in submitted],
+            ['services.crypto_executor.encrypt_payload', 'services.crypto_executor.decrypt_payload']
+        )
+        self.assertEqual(submitted[0][1]['pyd_inf']['pyd_trxn_refid'], 'P' * 1100)
+
+        submitted.clear()
+        with mock.patch.object(crypto_executor, 'get_pool', return_value=pool):
+            self.pay_bill()
+        # small payloads are encrypted inline
+        self.assertEqual(submitted, [])
+
+    def test_pay_bill_sends_the_given_trx_id(self):
+        response = self.pay_bill(trx_id='TRX-OF-THE-JOB')
+        self.assertEqual(response['trx']['trx_id'], 'TRX-OF-THE-JOB')
+        self.assertEqual(response['bllr_inf'], {'bllr_id': 'b025', 'mode': 'SAPI'})
+
+
+class RequestMetricsTestCase(TestCase):
+    def setUp(self):
+        from blog.models import Blog
+
+        cache.clear()
+        reset_metrics()
+        self.staff = get_user_model().objects.create_user(
+            username='staff', email='staff@example.com', password='password', is_staff=True)
+        self.blog = Blog.objects.create(user=self.staff, title='Blog', content='Content')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {get_or_create_token(self.staff).key}')
+
+    def get_metric(self, text, line_start):
+        for line in text.splitlines():
+            if line.startswith(line_start + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        self.fail(f'{line_start} not in metrics')
+
+    def test_request_metrics_per_action(self):
+        self.client.get(reverse('blog-list'))
+        detail_url = reverse('blog-detail', kwargs={'blog_id': self.blog.pk})
+        self.client.get(detail_url)
+        self.client.get(detail_url)
+        text = render_metrics()
+
+        view = '{view="BlogGenericViewSet.list"}'
+        self.assertEqual(self.get_metric(text, f'wordweaver_request_duration_seconds_count{view}'), 1)
+        self.assertGreater(self.get_metric(text, f'wordweaver_request_db_queries_sum{view}'), 0)
+        self.assertGreater(self.get_metric(text, f'wordweaver_request_db_duration_seconds_sum{view}'), 0)
+        self.assertGreater(
+            self.get_metric(text, f'wordweaver_request_serializer_duration_seconds_sum{view}'), 0)
+        self.assertGreater(
+            self.get_metric(text, f'wordweaver_request_renderer_duration_seconds_sum{view}'), 0)
+        self.assertEqual(self.get_metric(
+            text, 'wordweaver_request_db_queries_bucket{view="BlogGenericViewSet.list",le="+Inf"}'), 1)
+        self.assertEqual(self.get_metric(
+            text, 'wordweaver_cache_requests_total{cache="object",result="hit"}'), 1)
+        self.assertEqual(self.get_metric(
+            text, 'wordweaver_cache_requests_total{cache="object",result="miss"}'), 1)
+        # the second object lookup and both local auth token lookups
+        self.assertEqual(self.get_metric(
+            text,
+            'wordweaver_request_cache_lookups_total{result="hit",view="BlogGenericViewSet.retrieve"}'
+        ), 3)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('blog-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'# TYPE wordweaver_request_duration_seconds histogram', response.content)
+
+        user = get_user_model().objects.create_user(
+            username='user', email='user@example.com', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {get_or_create_token(user).key}')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+
+class ProfilingMiddlewareTestCase(TestCase):
+    def setUp(self):
+        from blog.models import Blog
+
+        self.profiling_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profiling_dir.cleanup)
+        override = override_settings(PROFILING_DIR=self.profiling_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.staff = get_user_model().objects.create_user(
+            username='staff', email='staff@example.com', password='password', is_staff=True)
+        self.user = get_user_model().objects.create_user(
+            username='user', email='user@example.com', password='password')
+        Blog.objects.create(user=self.staff, title='Blog', content='Content')
+        self.client = APIClient()
+        self.authenticate(self.staff)
+
+    def authenticate(self, user):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {get_or_create_token(user).key}')
+
+    def get_profiles(self):
+        return sorted(os.listdir(self.profiling_dir.name))
+
+    def test_staff_gets_report(self):
+        response = self.client.get(reverse('blog-list'), {'profile': 'text'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        report = response.content.decode()
+        self.assertIn('GET /blog-management/blogs/?profile=text -> 200', report)
+        self.assertIn('Top 30 by tottime', report)
+        self.assertIn('blog/views/blog_views.py', report)
+        self.assertEqual(self.get_profiles(), [])
+
+    def test_staff_profile_is_stored(self):
+        response = self.client.get(reverse('blog-list'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['count'], 1)
+        name = response[PROFILE_ID_HEADER]
+        self.assertEqual(self.get_profiles(), [f'{name}.prof', f'{name}.txt'])
+
+    def test_other_users_are_not_profiled(self):
+        self.authenticate(self.user)
+        response = self.client.get(reverse('blog-auth-user-blogs'), {'profile': 'text'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/json'))
+        self.assertNotIn(PROFILE_ID_HEADER, response)
+        self.assertEqual(self.get_profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_stored(self):
+        self.authenticate(self.user)
+        response = self.client.get(reverse('blog-auth-user-blogs'))
+        self.assertNotIn(PROFILE_ID_HEADER, response)
+        self.assertEqual(len(self.get_profiles()), 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MAX_PROFILES=2)
+    def test_oldest_profiles_are_pruned(self):
+        self.authenticate(self.user)
+        for _ in range(3):
+            self.client.get(reverse('blog-auth-user-blogs'))
+        self.assertEqual(len(self.get_profiles()), 4)
+
+    async def test_profiles_under_asgi(self):
+        from asgiref.sync import sync_to_async
+
+        token = await sync_to_async(get_or_create_token)(self.staff)
+        response = await self.async_client.get(
+            reverse('blog-list'),
+            {'profile': 'text'},
+            headers={'Authorization': f'Token {token.key}'}
+        )
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('blog/views/blog_views.py', response.content.decode())
+
+    async def test_asgi_profile_is_stored(self):
+        from asgiref.sync import sync_to_async
+
+        token = await sync_to_async(get_or_create_token)(self.staff)
+        response = await self.async_client.get(
+            reverse('blog-list'),
+            headers={'Authorization': f'Token {token.key}', 'X-Profile': '1'}
+        )
+        self.assertEqual(response.status_code, 200)
+        name = response[PROFILE_ID_HEADER]
+        self.assertEqual(self.get_profiles(), [f'{name}.prof', f'{name}.txt'])
+
+    def test_asgi_middleware_chain_stays_async(self):
+        from asgiref.sync import SyncToAsync, iscoroutinefunction
+        from django.core.handlers.asgi import ASGIHandler
+
+        chain = ASGIHandler()._middleware_chain
+        self.assertNotIsInstance(chain, SyncToAsync)
+        self.assertTrue(iscoroutinefunction(chain))
@@ -0,0 +1,196 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header
+)
+
+from services.constants import CacheKey
+from services.metrics import record_cache_lookup
+
+# the fields of the user kept in the token caches, what authentication
+# and the permission classes read. The password hash and the other fields
+# are never cached, they are deferred and loaded on first access
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+_local_tokens = OrderedDict()
+_local_tokens_lock = Lock()
+
+
+def get_token_cache_key(key):
+    return f'{CacheKey.AUTH_TOKEN.value}:{key}:user'
+
+
+def get_token_entry(token):
+    return tuple(getattr(token.user, field) for field in CACHED_USER_FIELDS)
+
+
+def build_token(model, key, entry):
+    """
+    the token of a cache entry with its user, a fresh instance per request
+    """
+    user_model = get_user_model()
+    values = dict(zip(CACHED_USER_FIELDS, entry))
+    # from_db takes the values in the order of the model fields
+    field_names = [
+        field.attname for field in user_model._meta.concrete_fields
+        if field.attname in values
+    ]
+    user = user_model.from_db(
+        DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+    token = model.from_db(DEFAULT_DB_ALIAS, ['key', 'user_id'], [key, user.pk])
+    token.user = user
+    return token
+
+
+def invalidate_cached_token(key):
+    with _local_tokens_lock:
+        _local_tokens.pop(key, None)
+    cache.delete(get_token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that memoizes token -> user in the shared cache,
+    so most requests skip the authtoken_token/users_customuser join. Only
+    CACHED_USER_FIELDS are cached, the user is rebuilt from them with its
+    other fields deferred. Entries are dropped by the signals in
+    users/signals.py when a token is deleted (logout, user deletion) or its
+    user is saved (deactivation).
+
+    TOKEN_AUTH_LOCAL_CACHE_TIMEOUT adds an in process memo in front of the
+    shared cache. It is off by default, the signals can only clear the memo
+    of their own process so the other workers would accept a revoked token
+    until their memo expires
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        entry = self.get_cached_entry(key)
+        if entry is None:
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            self.set_cached_entry(key, get_token_entry(token))
+        else:
+            token = build_token(model, key, entry)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+    async def aauthenticate(self, request):
+        """
+        async counterpart of authenticate for the async views, the token
+        lookup goes through the async cache and ORM APIs
+        """
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        model = self.get_model()
+        entry = await self.aget_cached_entry(key)
+        if entry is None:
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            entry = get_token_entry(token)
+            await cache.aset(
+                get_token_cache_key(key),
+                entry,
+                timeout=settings.TOKEN_AUTH_CACHE_TIMEOUT
+            )
+            self.set_local_entry(key, entry)
+        else:
+            token = build_token(model, key, entry)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+    def get_key(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            msg = _('Invalid token header. No credentials provided.')
+            raise exceptions.AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _('Invalid token header. Token string should not contain spaces.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. Token string should not contain invalid characters.')
+            raise exceptions.AuthenticationFailed(msg)
+
+    @staticmethod
+    def get_local_entry(key):
+        with _local_tokens_lock:
+            entry = _local_tokens.get(key)
+        if entry is not None:
+            expires_at, token_entry = entry
+            if expires_at > time.monotonic():
+                record_cache_lookup('auth_token_local', True)
+                return token_entry
+        record_cache_lookup('auth_token_local', False)
+        return None
+
+    @staticmethod
+    def get_cached_entry(key):
+        entry = CachedTokenAuthentication.get_local_entry(key)
+        if entry is not None:
+            return entry
+        entry = cache.get(get_token_cache_key(key))
+        record_cache_lookup('auth_token', entry is not None)
+        if entry is not None:
+            CachedTokenAuthentication.set_local_entry(key, entry)
+        return entry
+
+    @staticmethod
+    async def aget_cached_entry(key):
+        entry = CachedTokenAuthentication.get_local_entry(key)
+        if entry is not None:
+            return entry
+        entry = await cache.aget(get_token_cache_key(key))
+        record_cache_lookup('auth_token', entry is not None)
+        if entry is not None:
+            CachedTokenAuthentication.set_local_entry(key, entry)
+        return entry
+
+    @staticmethod
+    def set_cached_entry(key, entry):
+        cache.set(
+            get_token_cache_key(key),
+            entry,
+            timeout=settings.TOKEN_AUTH_CACHE_TIMEOUT
+        )
+        CachedTokenAuthentication.set_local_entry(key, entry)
+
+    @staticmethod
+    def set_local_entry(key, entry):
+        timeout = settings.TOKEN_AUTH_LOCAL_CACHE_TIMEOUT
+        if not timeout:
+            return
+        with _local_tokens_lock:
+            _local_tokens[key] = (time.monotonic() + timeout, entry)
+            _local_tokens.move_to_end(key)
+            while len(_local_tokens) > settings.TOKEN_AUTH_LOCAL_CACHE_MAX_ENTRIES:
+                _local_tokens.popitem(last=False)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from users.tokens import provision_missing_tokens
+
+
+class Command(BaseCommand):
+    help = 'Bulk create the auth tokens of users without one, e.g. after an import.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='number of users provisioned per query, BULK_CREATE_BATCH_SIZE by default'
+        )
+
+    def handle(self, *args, **kwargs):
+        created = provision_missing_tokens(kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Provisioned {created} auth tokens.'))
@@ -1,11 +1,12 @@
 import django.contrib.auth.password_validation as validators
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from services.metrics import TimedSerializerMixin
 
 User = get_user_model()
 
 
-class BaseUserSerializer(serializers.ModelSerializer):
+class BaseUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
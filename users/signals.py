@@ -1,12 +1,31 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
+from users.authentication import CACHED_USER_FIELDS, invalidate_cached_token
 
 User = get_user_model()
 
 
 @receiver(post_save, sender=User)
-def create_auth_token(sender, instance=None, created=False, **kwargs):
+def invalidate_user_auth_tokens(sender, instance=None, created=False, update_fields=None, **kwargs):
+    """
+    drop the cached token -> user entries of a changed user, so that a
+    deactivation takes effect on the next request. Saves of other fields
+    only (last_login on every login) skip the token lookup
+    """
     if created:
-        Token.objects.create(user=instance)
+        return
+    if update_fields is not None and not {'password', *CACHED_USER_FIELDS} & set(update_fields):
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        invalidate_cached_token(key)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_auth_token(sender, instance=None, **kwargs):
+    """
+    covers logout through InvalidateToken and user deletion, which
+    cascades to the token
+    """
+    invalidate_cached_token(instance.key)
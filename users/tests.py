@@ -1,11 +1,25 @@
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
 from users.views import UserGenericViewSet
 from rest_framework.authtoken.models import Token
 from django.urls import reverse
 from rest_framework.test import APITestCase
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import (
+    CACHED_USER_FIELDS,
+    CachedTokenAuthentication,
+    get_token_cache_key,
+    invalidate_cached_token
+)
+from users.tokens import get_or_create_token, provision_tokens
 
 User = get_user_model()
 
@@ -90,3 +104,150 @@ class CustomAuthTokenTestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertFalse(Token.objects.filter(user=user).exists())
+
+
+class TokenProvisioningTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpassword')
+
+    def test_token_created_on_first_login(self):
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        url = reverse('custom-auth-token')
+        data = {'username': 'testuser', 'password': 'testpassword'}
+        first = self.client.post(url, data, format='json')
+        second = self.client.post(url, data, format='json')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['detail'], Token.objects.get(user=self.user).key)
+        self.assertEqual(second.data['detail'], first.data['detail'])
+
+    def test_provision_tokens_in_bulk(self):
+        users = User.objects.bulk_create(
+            [User(username=f'imported{index}') for index in range(5)])
+        token = get_or_create_token(self.user)
+        user_pks = [self.user.pk] + [user.pk for user in users]
+        with self.assertNumQueries(6):
+            created = provision_tokens(user_pks, batch_size=3)
+        self.assertEqual(created, 5)
+        self.assertEqual(Token.objects.filter(user_id__in=user_pks).count(), 6)
+        self.assertEqual(Token.objects.get(user=self.user), token)
+
+    def test_provision_tokens_does_not_count_conflicts(self):
+        users = User.objects.bulk_create(
+            [User(username=f'imported{index}') for index in range(2)])
+        existing = get_or_create_token(self.user)
+        keys = iter([existing.key, 'f' * 40])
+        with mock.patch.object(Token, 'generate_key', side_effect=lambda: next(keys)):
+            created = provision_tokens([user.pk for user in users])
+        self.assertEqual(created, 1)
+        self.assertEqual(Token.objects.filter(user__in=users).count(), 1)
+
+    def test_last_login_update_skips_token_invalidation(self):
+        get_or_create_token(self.user)
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(2):
+            self.user.save(update_fields=['is_active'])
+
+    def test_provision_auth_tokens_command(self):
+        User.objects.bulk_create(
+            [User(username=f'imported{index}') for index in range(3)])
+        out = StringIO()
+        call_command('provision_auth_tokens', '--batch-size', '2', stdout=out)
+        self.assertIn('Provisioned 4 auth tokens.', out.getvalue())
+        self.assertFalse(User.objects.filter(auth_token__isnull=True).exists())
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser', password='testpassword')
+        self.token = get_or_create_token(self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def test_cached_lookup_skips_database(self):
+        with self.assertNumQueries(1):
+            self.authentication.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(
+                self.token.key)
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_cache_holds_no_password(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        entry = cache.get(get_token_cache_key(self.token.key))
+        self.assertNotIn(self.user.password, entry)
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(self.token.key)
+        self.assertTrue(user.is_authenticated)
+        self.assertEqual(
+            user.get_deferred_fields(),
+            {field.attname for field in User._meta.concrete_fields} - set(CACHED_USER_FIELDS)
+        )
+        # a save of the cached user only writes the loaded fields
+        user.is_staff = True
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_staff)
+        self.assertTrue(self.user.check_password('testpassword'))
+
+    def test_async_lookup_shares_cache(self):
+        aauthenticate_credentials = async_to_sync(
+            self.authentication.aauthenticate_credentials)
+        aauthenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(
+                self.token.key)
+        self.assertEqual(user, self.user)
+        with self.assertRaises(AuthenticationFailed):
+            aauthenticate_credentials('invalid')
+
+    def test_invalidation_by_another_worker_is_seen_at_once(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        # another worker deactivated the user, it only cleared the shared
+        # cache (and its own memo)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.delete(get_token_cache_key(self.token.key))
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    @override_settings(TOKEN_AUTH_LOCAL_CACHE_TIMEOUT=5)
+    def test_local_memo_skips_shared_cache(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        cache.delete(get_token_cache_key(self.token.key))
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+        invalidate_cached_token(self.token.key)
+
+    def test_token_deletion_invalidates_cache(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_user_deactivation_invalidates_cache(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_user_deletion_invalidates_cache(self):
+        self.authentication.authenticate_credentials(self.token.key)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_logout_invalidates_cache(self):
+        response = self.client.get(
+            reverse('invalidate-token'),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(
+            reverse('invalidate-token'),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
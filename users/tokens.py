@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+def get_or_create_token(user):
+    """
+    the auth token of user, created on first use (login) rather than when
+    the user is created
+    """
+    token, created = Token.objects.get_or_create(user=user)
+    return token
+
+
+def provision_tokens(user_pks, batch_size=None):
+    """
+    bulk create the missing tokens of user_pks, two SELECTs and one INSERT
+    per batch_size users. A token created meanwhile by a login is left as
+    it is (ignore_conflicts). Returns the number of tokens inserted, the
+    rows dropped by ignore_conflicts are not counted
+    """
+    batch_size = batch_size or settings.BULK_CREATE_BATCH_SIZE
+    user_pks = list(user_pks)
+    created = 0
+    for start in range(0, len(user_pks), batch_size):
+        batch = user_pks[start:start + batch_size]
+        with_token = set(
+            Token.objects.filter(user_id__in=batch).values_list('user_id', flat=True)
+        )
+        tokens = [
+            Token(key=Token.generate_key(), user_id=pk)
+            for pk in batch if pk not in with_token
+        ]
+        if not tokens:
+            continue
+        Token.objects.bulk_create(tokens, ignore_conflicts=True)
+        created += Token.objects.filter(
+            key__in=[token.key for token in tokens],
+            user_id__in=[token.user_id for token in tokens]
+        ).count()
+    return created
+
+
+def provision_missing_tokens(batch_size=None):
+    """
+    provision_tokens for every user without a token, in pk order
+    """
+    batch_size = batch_size or settings.BULK_CREATE_BATCH_SIZE
+    without_token = User.objects.filter(auth_token__isnull=True).order_by('pk')
+    last_pk = 0
+    created = 0
+    while True:
+        user_pks = list(
+            without_token.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_pks:
+            return created
+        created += provision_tokens(user_pks, batch_size)
+        last_pk = user_pks[-1]
@@ -12,6 +12,8 @@ user_router.register('', UserGenericViewSet, 'user')
 
 urlpatterns = [
     path('users/', include(user_router.urls)),
-    path('api-token-auth/', CustomAuthToken.as_view()),
-    path('api-invalidate-token/', InvalidateToken.as_view()),
+    path('api-token-auth/', CustomAuthToken.as_view(),
+         name='custom-auth-token'),
+    path('api-invalidate-token/', InvalidateToken.as_view(),
+         name='invalidate-token'),
 ]
@@ -5,6 +5,7 @@ from WordWeaver.renderers import CustomJSONRenderer
 from services.customize_response import customize_response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
+from users.tokens import get_or_create_token
 
 
 class CustomAuthToken(ObtainAuthToken):
@@ -16,7 +17,7 @@ class CustomAuthToken(ObtainAuthToken):
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
+        token = get_or_create_token(user)
         response = Response(token.key)
         return customize_response(
             response,
@@ -27,7 +28,7 @@ class CustomAuthToken(ObtainAuthToken):
 class InvalidateToken(APIView):
 
     def get(self, request, format=None):
-        request.user.auth_token.delete()
+        Token.objects.filter(user=request.user).delete()
         response = Response("User token is successfully invalidated")
         return customize_response(
             response,